@@ -0,0 +1,47 @@
+from dotenv import load_dotenv
+from pydantic_settings import BaseSettings
+
+# O .env continua valendo para quem ainda lê os.getenv direto
+load_dotenv()
+
+
+class Settings(BaseSettings):
+    """
+    Configuração do banco, lida das variáveis de ambiente (ou do .env) pelo
+    nome do campo em maiúsculas: DATABASE_URL, DB_POOL_SIZE, ...
+
+    Os limites do pool valem por worker do uvicorn: o total de conexões no
+    Postgres é workers × (DB_POOL_SIZE + DB_MAX_OVERFLOW + DB_SYNC_POOL_SIZE +
+    DB_SYNC_MAX_OVERFLOW), e deve caber no limite do banco gerenciado.
+    """
+
+    database_url: str
+
+    # Pool do engine async (rotas da API)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    # Segundos esperando uma conexão livre antes de desistir (erro 500)
+    db_pool_timeout: float = 30
+    # Testa a conexão antes de usar (o banco gerenciado derruba conexões ociosas)
+    db_pool_pre_ping: bool = True
+    # Recria conexões mais velhas que isso, em segundos (-1 = nunca)
+    db_pool_recycle: int = 1800
+
+    # Pool do engine síncrono (create_all, /guias/ e scripts)
+    db_sync_pool_size: int = 2
+    db_sync_max_overflow: int = 0
+
+    # statement_timeout do Postgres em ms (0 = sem limite; ignorado no SQLite)
+    db_statement_timeout_ms: int = 0
+    db_echo: bool = False
+
+    # Contagem de SQL por requisição: com DB_DEBUG as respostas levam
+    # X-DB-Queries/X-DB-Rows/X-DB-Rows-Written/X-DB-Time-ms e cada requisição vai para o log
+    db_debug: bool = False
+    # Avisa no log quando uma requisição repete o mesmo SQL (mesmo formato,
+    # parâmetros à parte) tantas vezes: sinal de N+1 (0 = não avisa). Um
+    # INSERT em lote conta uma vez; as rotas de escrita ficam abaixo disso
+    db_alerta_repeticoes: int = 10
+
+
+settings = Settings()
@@ -1,22 +1,5 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-import os
-from dotenv import load_dotenv
+# Mantido para os imports antigos (ex.: scripts de migração). Engine, sessão e
+# Base são os de app.db.database: importar os dois módulos não abre um segundo pool.
+from app.db.database import Base, SessionLocal, SQLALCHEMY_DATABASE_URL, engine, get_db
 
-load_dotenv()
-
-# Pega a URL do .env. Se der erro, verifique se o arquivo .env existe na pasta backend
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
-
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# Essa é a classe mágica que todos os models vão herdar
-Base = declarative_base()
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
\ No newline at end of file
+__all__ = ["Base", "SessionLocal", "SQLALCHEMY_DATABASE_URL", "engine", "get_db"]
@@ -1,17 +1,176 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.core.config import Settings, settings
 
 # Se der erro de string vazia, verifique seu .env
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
+SQLALCHEMY_DATABASE_URL = settings.database_url
+
+# Driver assíncrono de cada banco (o do .env continua sendo o síncrono)
+DRIVERS_ASYNC = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def url_async(url: str) -> str:
+    """
+    Mesma URL do .env com o driver assíncrono: postgresql(+psycopg2) vira
+    postgresql+asyncpg e sqlite vira sqlite+aiosqlite.
+    """
+    u = make_url(url)
+    backend = u.get_backend_name()
+    driver = DRIVERS_ASYNC.get(backend)
+    if driver is None:
+        raise ValueError(f"Banco sem driver assíncrono configurado: {backend}")
+    u = u.set(drivername=f"{backend}+{driver}")
+    if driver == "asyncpg" and "sslmode" in u.query:
+        # O asyncpg não conhece sslmode (libpq); o equivalente é ssl=require etc.
+        query = dict(u.query)
+        query["ssl"] = query.pop("sslmode")
+        u = u.set(query=query)
+    return u.render_as_string(hide_password=False)
+
+
+# ----- pool com medição de espera -----
+
+class MetricasPool:
+    """Contadores de checkout de um pool: quantos, quanto tempo esperando e quantos timeouts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+
+    def registrar(self, espera: float, timeout: bool = False) -> None:
+        with self._lock:
+            if timeout:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.espera_total += espera
+            self.espera_max = max(self.espera_max, espera)
+
+    def estatisticas(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "espera_total_ms": round(self.espera_total * 1000, 3),
+            "espera_media_ms": round(self.espera_total * 1000 / (self.checkouts + self.timeouts), 3) if self.checkouts + self.timeouts else None,
+            "espera_max_ms": round(self.espera_max * 1000, 3),
+        }
+
+
+class _MedirEspera:
+    # Mede quanto cada checkout levou: fila por uma conexão livre + eventual
+    # abertura de conexão nova (overflow). O contador fica no pool e passa para
+    # o pool novo quando o SQLAlchemy o recria (dispose/recreate).
+    metricas: MetricasPool
+
+    def __init__(self, *args, metricas: MetricasPool = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metricas = metricas or MetricasPool()
+
+    def recreate(self):
+        novo = super().recreate()
+        novo.metricas = self.metricas
+        return novo
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexao = super()._do_get()
+        except exc.TimeoutError:
+            self.metricas.registrar(time.perf_counter() - inicio, timeout=True)
+            raise
+        self.metricas.registrar(time.perf_counter() - inicio)
+        return conexao
+
+
+class PoolMedido(_MedirEspera, QueuePool):
+    pass
+
+
+class PoolAsyncMedido(_MedirEspera, AsyncAdaptedQueuePool):
+    pass
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+
+# ----- fábrica de engines -----
+
+def _em_memoria(url: str) -> bool:
+    u = make_url(url)
+    return u.get_backend_name() == "sqlite" and u.database in (None, "", ":memory:")
+
+
+def _opcoes_engine(url: str, config: Settings, assincrono: bool) -> dict:
+    opcoes = {"echo": config.db_echo}
+    backend = make_url(url).get_backend_name()
+
+    if not _em_memoria(url):
+        # SQLite em memória usa um pool próprio de conexão única: sem ajuste
+        opcoes.update(
+            poolclass=PoolAsyncMedido if assincrono else PoolMedido,
+            pool_size=config.db_pool_size if assincrono else config.db_sync_pool_size,
+            max_overflow=config.db_max_overflow if assincrono else config.db_sync_max_overflow,
+            pool_timeout=config.db_pool_timeout,
+            pool_pre_ping=config.db_pool_pre_ping,
+            pool_recycle=config.db_pool_recycle,
+        )
+
+    if backend == "postgresql" and config.db_statement_timeout_ms:
+        timeout = str(config.db_statement_timeout_ms)
+        if assincrono:
+            opcoes["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            opcoes["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return opcoes
+
+
+def criar_engine(config: Settings = settings) -> Engine:
+    """Engine síncrono com pool e timeouts da configuração."""
+    return create_engine(config.database_url, **_opcoes_engine(config.database_url, config, assincrono=False))
+
+
+def criar_engine_async(config: Settings = settings) -> AsyncEngine:
+    """Engine async (mesma URL com o driver assíncrono) com pool e timeouts da configuração."""
+    url = url_async(config.database_url)
+    return create_async_engine(url, **_opcoes_engine(url, config, assincrono=True))
+
+
+def estatisticas_pool(engine) -> dict:
+    """Conexões em uso, overflow e tempo de espera por conexão do pool do engine."""
+    pool = engine.pool
+    dados = {"classe": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        dados.update(
+            tamanho=pool.size(),
+            em_uso=pool.checkedout(),
+            livres=pool.checkedin(),
+            # Negativo enquanto o pool base ainda não abriu todas as conexões
+            overflow=pool.overflow(),
+            max_overflow=pool._max_overflow,
+        )
+    metricas = getattr(pool, "metricas", None)
+    if metricas is not None:
+        dados.update(metricas.estatisticas())
+    return dados
+
+
+# Um engine de cada tipo por processo: app.db.base reaproveita estes
+engine = criar_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Rotas async: cada requisição só ocupa uma conexão do pool enquanto espera o
+# banco, então quem limita a concorrência é o pool, não o threadpool
+async_engine = criar_engine_async()
+# expire_on_commit=False: o objeto devolvido pela rota é serializado depois do
+# commit, e no modo async um atributo expirado não pode ser recarregado ali
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base() # <--- O "Base" mora aqui agora!
 
 def get_db():
@@ -19,4 +178,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,246 @@
+import logging
+import os
+from typing import Callable, NamedTuple, Optional
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+# Uma linha por migração aplicada: a maior versão é a versão do schema
+TABELA_VERSOES = "schema_migracoes"
+
+# A API aplica as migrações pendentes ao subir; com 0 ela só confere e se
+# recusa a subir se faltar alguma (para quem migra num passo à parte do deploy)
+MIGRAR_AO_INICIAR = os.getenv("MIGRAR_AO_INICIAR", "1") != "0"
+
+# Chave do pg_advisory_lock: dois deploys ao mesmo tempo não migram juntos
+_TRAVA_POSTGRES = 0x636F7461  # "cota"
+
+
+class Migracao(NamedTuple):
+    versao: int
+    nome: str
+    aplicar: Callable[[Connection], None]
+    # False: roda em autocommit, fora de transação (CREATE INDEX CONCURRENTLY no Postgres)
+    transacional: bool = True
+
+
+MIGRACOES: list[Migracao] = []
+
+
+def migracao(versao: int, nome: str, transacional: bool = True):
+    """Registra a função como a migração `versao`; as versões são aplicadas em ordem crescente."""
+    def registrar(funcao):
+        if any(m.versao == versao for m in MIGRACOES):
+            raise ValueError(f"Migração {versao} registrada duas vezes")
+        MIGRACOES.append(Migracao(versao, nome, funcao, transacional))
+        MIGRACOES.sort(key=lambda m: m.versao)
+        return funcao
+    return registrar
+
+
+# ----- auxiliares -----
+
+def _postgres(conn: Connection) -> bool:
+    return conn.dialect.name == "postgresql"
+
+
+def _adicionar_coluna(conn: Connection, tabela: str, coluna: str, tipo: str) -> None:
+    # Via inspector e não ADD COLUMN IF NOT EXISTS, que o SQLite não tem
+    if coluna not in {c["name"] for c in inspect(conn).get_columns(tabela)}:
+        logger.info("Adicionando %s.%s", tabela, coluna)
+        conn.execute(text(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {tipo}"))
+
+
+def _criar_indice(conn: Connection, nome: str, tabela: str, colunas: str, metodo: Optional[str] = None) -> None:
+    """
+    CREATE INDEX IF NOT EXISTS; no Postgres com CONCURRENTLY, sem bloquear
+    escritas na tabela. Um CONCURRENTLY interrompido deixa o índice
+    inválido: ele é removido e construído de novo.
+    """
+    if not _postgres(conn):
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {nome} ON {tabela} ({colunas})"))
+        return
+    valido = conn.execute(text(
+        "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :nome"
+    ), {"nome": nome}).scalar()
+    if valido is False:
+        logger.warning("Índice %s ficou inválido numa execução anterior: recriando", nome)
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {nome}"))
+    using = f" USING {metodo}" if metodo else ""
+    logger.info("Criando índice %s", nome)
+    conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nome} ON {tabela}{using} ({colunas})"))
+
+
+# ----- migrações -----
+
+@migracao(1, "colunas_legadas")
+def _colunas_legadas(conn: Connection) -> None:
+    # O que os antigos scripts migrate_*.py faziam à mão em bancos anteriores
+    # aos modelos atuais; em banco novo o create_all já deixa tudo pronto
+    _adicionar_coluna(conn, "operadoras", "rede_credenciada_url", "VARCHAR")
+    _adicionar_coluna(conn, "planos", "elegibilidade", "BOOLEAN")
+    _adicionar_coluna(conn, "planos", "imagem_coparticipacao_url", "VARCHAR(255)")
+    for coluna, tipo in (
+        ("nome", "VARCHAR"),
+        ("tipo_plano", "VARCHAR(100)"),
+        ("imagem_url", "VARCHAR(255)"),
+        ("tipo_servico", "VARCHAR(100)"),
+        ("percentual", "FLOAT"),
+        ("valor_minimo", "FLOAT"),
+        ("valor_maximo", "FLOAT"),
+    ):
+        _adicionar_coluna(conn, "coparticipacoes", coluna, tipo)
+
+
+@migracao(2, "indices_chaves_estrangeiras", transacional=False)
+def _indices_chaves_estrangeiras(conn: Connection) -> None:
+    # Carregamento das coleções (plano_id IN (...)) e os DELETE ... WHERE
+    # plano_id = ? de atualizar_plano/excluir_plano; mesmos nomes do index=True
+    for tabela in ("faixas_preco", "hospitais", "carencias", "coparticipacoes", "municipios_abrangidos"):
+        _criar_indice(conn, f"ix_{tabela}_plano_id", tabela, "plano_id")
+    _criar_indice(conn, "ix_planos_operadora_id", "planos", "operadora_id")
+
+
+@migracao(3, "indices_busca", transacional=False)
+def _indices_busca(conn: Connection) -> None:
+    # Nome de operadora duplicado: lower(nome) = lower(:nome)
+    _criar_indice(conn, "ix_operadoras_nome_lower", "operadoras", "lower(nome)")
+    if not _postgres(conn):
+        # O ilike vira lower(coluna) LIKE lower(?) no SQLite, que não usa índice
+        # para LIKE sobre expressão: lá os filtros da cotação ficam com o catálogo em memória
+        logger.info("Índices trigram só existem no Postgres: pulando no %s", conn.dialect.name)
+        return
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    # GIN com várias colunas serve qualquer subconjunto delas: a cotação filtra
+    # por tipo_contratacao/acomodacao/abrangencia (ilike 'valor%'), todos opcionais
+    _criar_indice(
+        conn, "ix_planos_filtros_cotacao", "planos",
+        "tipo_contratacao gin_trgm_ops, acomodacao gin_trgm_ops, abrangencia gin_trgm_ops", metodo="gin",
+    )
+    # Buscas por trecho do nome (ilike '%nome%') na listagem de planos e operadoras
+    _criar_indice(conn, "ix_planos_nome_trgm", "planos", "nome gin_trgm_ops", metodo="gin")
+    _criar_indice(conn, "ix_operadoras_nome_trgm", "operadoras", "nome gin_trgm_ops", metodo="gin")
+
+
+@migracao(4, "faixas_idade")
+def _faixas_idade(conn: Connection) -> None:
+    from app.services.price_index import parse_faixa
+
+    _adicionar_coluna(conn, "faixas_preco", "idade_min", "INTEGER")
+    _adicionar_coluna(conn, "faixas_preco", "idade_max", "INTEGER")
+    # Um UPDATE por texto de faixa distinto (são poucos: "0-18", "59+", ...),
+    # interpretado pela mesma parse_faixa da cotação; o que não for faixa fica nulo
+    rotulos = conn.execute(text("SELECT DISTINCT faixa_etaria FROM faixas_preco WHERE idade_min IS NULL")).scalars().all()
+    valores = []
+    for rotulo in rotulos:
+        limites = parse_faixa(rotulo) if rotulo is not None else None
+        if limites is None:
+            logger.warning("Faixa %r não interpretada: idade_min/idade_max ficam nulos", rotulo)
+            continue
+        valores.append({"rotulo": rotulo, "idade_min": limites[0], "idade_max": limites[1]})
+    if valores:
+        conn.execute(text(
+            "UPDATE faixas_preco SET idade_min = :idade_min, idade_max = :idade_max "
+            "WHERE faixa_etaria = :rotulo AND idade_min IS NULL"
+        ), valores)
+
+
+@migracao(5, "indice_faixas_idade", transacional=False)
+def _indice_faixas_idade(conn: Connection) -> None:
+    # Preço de uma idade como predicado de intervalo indexado
+    _criar_indice(conn, "ix_faixas_preco_plano_idade", "faixas_preco", "plano_id, idade_min, idade_max")
+
+
+@migracao(6, "versao_catalogo")
+def _versao_catalogo(conn: Connection) -> None:
+    # A versão do catálogo passa do maior id de catalogo_alteracoes para um
+    # contador (catalogo_versao); as alterações antigas ficam com versão = id
+    _adicionar_coluna(conn, "catalogo_alteracoes", "versao", "INTEGER")
+    conn.execute(text("UPDATE catalogo_alteracoes SET versao = id WHERE versao IS NULL"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_catalogo_alteracoes_versao ON catalogo_alteracoes (versao)"))
+    conn.execute(text(
+        "INSERT INTO catalogo_versao (id, versao) SELECT 1, 0 WHERE NOT EXISTS (SELECT 1 FROM catalogo_versao WHERE id = 1)"
+    ))
+    conn.execute(text(
+        "UPDATE catalogo_versao SET versao = (SELECT COALESCE(MAX(versao), 0) FROM catalogo_alteracoes) "
+        "WHERE id = 1 AND versao < (SELECT COALESCE(MAX(versao), 0) FROM catalogo_alteracoes)"
+    ))
+
+
+# ----- execução -----
+
+def _criar_tabela_versoes(conn: Connection) -> None:
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {TABELA_VERSOES} ("
+        "versao INTEGER PRIMARY KEY, nome VARCHAR NOT NULL, aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    ))
+
+
+def versoes_aplicadas(engine: Engine) -> dict[int, str]:
+    """Versão -> nome das migrações já aplicadas nesse banco."""
+    with engine.begin() as conn:
+        _criar_tabela_versoes(conn)
+        return dict(conn.execute(text(f"SELECT versao, nome FROM {TABELA_VERSOES}")).all())
+
+
+def pendentes(engine: Engine) -> list[Migracao]:
+    aplicadas = versoes_aplicadas(engine)
+    return [m for m in MIGRACOES if m.versao not in aplicadas]
+
+
+def _registrar(conn: Connection, m: Migracao) -> None:
+    conn.execute(text(f"INSERT INTO {TABELA_VERSOES} (versao, nome) VALUES (:versao, :nome)"), {"versao": m.versao, "nome": m.nome})
+
+
+def aplicar_migracoes(engine: Engine) -> list[Migracao]:
+    """
+    Cria as tabelas que faltam (create_all) e aplica, em ordem, as migrações
+    ainda não registradas em schema_migracoes. Cada migração é registrada
+    assim que termina: se uma falhar, as anteriores ficam e a próxima
+    execução recomeça dela. Devolve as migrações aplicadas.
+    """
+    from app.db.database import Base
+    import app.models  # noqa: F401  (registra todas as tabelas no metadata)
+
+    with engine.connect() as trava:
+        if trava.dialect.name == "postgresql":
+            trava.execute(text("SELECT pg_advisory_lock(:chave)"), {"chave": _TRAVA_POSTGRES})
+            trava.commit()
+        try:
+            Base.metadata.create_all(bind=engine)
+            aplicadas = []
+            for m in pendentes(engine):
+                logger.info("Aplicando migração %s (%s)", m.versao, m.nome)
+                if m.transacional:
+                    with engine.begin() as conn:
+                        m.aplicar(conn)
+                        _registrar(conn, m)
+                else:
+                    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                        m.aplicar(conn)
+                        _registrar(conn, m)
+                aplicadas.append(m)
+            return aplicadas
+        finally:
+            if trava.dialect.name == "postgresql":
+                trava.execute(text("SELECT pg_advisory_unlock(:chave)"), {"chave": _TRAVA_POSTGRES})
+                trava.commit()
+
+
+def preparar_banco(engine: Engine) -> None:
+    """
+    Chamada na subida da API, antes de atender: os modelos já mapeiam as
+    colunas das migrações, então um banco atrasado quebraria toda listagem
+    e cotação. Aplica o que falta (a trava do Postgres serializa os workers)
+    ou, com MIGRAR_AO_INICIAR=0, levanta erro se houver migração pendente.
+    """
+    if MIGRAR_AO_INICIAR:
+        aplicar_migracoes(engine)
+        return
+    faltando = pendentes(engine)
+    if faltando:
+        raise RuntimeError(
+            "Banco com migrações pendentes (" + ", ".join(f"{m.versao} {m.nome}" for m in faltando)
+            + "): rode scripts/migrar.py ou suba com MIGRAR_AO_INICIAR=1"
+        )
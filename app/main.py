@@ -1,6 +1,7 @@
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Response
 from sqlalchemy.orm import Session
 from app.db import database
+from app.db.migracoes import preparar_banco
 
 # ----------------- NOVOS IMPORTS -----------------
 from app.models import guia_model
@@ -9,16 +10,22 @@ from app.models import plano_model
 from app.models import faixa_preco_model
 from app.models import hospital_model
 from app.models import carencia_model
+from app.models import catalogo_model
 from app.routers.v1 import cotacao
 from app.routers.v1.cotacao import calcular_cotacao as calcular_cotacao_v1
 from app.schemas import cotacao_schema as cotacao_schema_module
-from sqlalchemy.orm import Session as SQLAlchemySession
+from app.services.pdf_pool import pool_pdf
+from app.services.metricas import METRICAS_ATIVAS, MiddlewareMetricas, registro, serie
+from app.services.consultas_sql import CONTAGEM_ATIVA, MiddlewareConsultasSQL
+from app.services.compressao import COMPRESSAO_ATIVA, MiddlewareCompressao
+from sqlalchemy.ext.asyncio import AsyncSession
 # -------------------------------------------------
 
 from fastapi.middleware.cors import CORSMiddleware
 
-# Esta linha vai criar TODAS as tabelas se elas não existirem
-database.Base.metadata.create_all(bind=database.engine)
+# Cria as tabelas que faltam e aplica as migrações pendentes (ou recusa subir
+# com o banco atrasado, se MIGRAR_AO_INICIAR=0)
+preparar_banco(database.engine)
 
 app = FastAPI(title="Cotador Assistente API")
 # Configuração do CORS (Permitir que o Frontend converse com o Backend)
@@ -28,7 +35,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Cotacao-Id", "Content-Disposition", "ETag", "X-DB-Queries", "X-DB-Rows", "X-DB-Rows-Written", "X-DB-Time-ms", "X-Next-After-Id"],
 )
+if COMPRESSAO_ATIVA:
+    # br/gzip negociado para JSON, NDJSON e CSV acima de COMPRESSAO_MIN_BYTES
+    app.add_middleware(MiddlewareCompressao)
+if CONTAGEM_ATIVA:
+    # SQL por requisição: cabeçalhos X-DB-* (DB_DEBUG) e aviso de N+1 no log
+    app.add_middleware(MiddlewareConsultasSQL)
+if METRICAS_ATIVAS:
+    # Por fora do CORS: a latência medida inclui todo o processamento da app
+    app.add_middleware(MiddlewareMetricas)
 
 # --- AQUI CONECTAMOS SUA ROTA ---
 # O "router" é a variável que você criou dentro do arquivo cotacao.py
@@ -38,6 +55,34 @@ app.add_middleware(
 
 app.include_router(cotacao.router, prefix="/api/v1", tags=["Cotação"])
 
+@app.on_event("shutdown")
+async def encerrar_recursos():
+    # Finaliza os processos de geração de PDF e o pool async junto com o worker
+    pool_pdf.encerrar()
+    await database.async_engine.dispose()
+
+@registro.coletor
+def _metricas_pool_db():
+    pools = {"async": database.estatisticas_pool(database.async_engine.sync_engine),
+             "sync": database.estatisticas_pool(database.engine)}
+    return (
+        serie("db_pool_conexoes", "gauge", "Conexões do pool por estado.",
+              [({"engine": e, "estado": estado}, p.get(estado)) for e, p in pools.items() for estado in ("em_uso", "livres")])
+        + serie("db_pool_overflow", "gauge", "Conexões abertas além de DB_POOL_SIZE (negativo: pool base incompleto).",
+                [({"engine": e}, p.get("overflow")) for e, p in pools.items()])
+        + serie("db_pool_checkouts_total", "counter", "Conexões obtidas do pool.",
+                [({"engine": e}, p.get("checkouts")) for e, p in pools.items()])
+        + serie("db_pool_timeouts_total", "counter", "Esperas por conexão que estouraram DB_POOL_TIMEOUT.",
+                [({"engine": e}, p.get("timeouts")) for e, p in pools.items()])
+        + serie("db_pool_espera_segundos_total", "counter", "Tempo total esperando por conexão do pool.",
+                [({"engine": e}, p["espera_total_ms"] / 1000 if "espera_total_ms" in p else None) for e, p in pools.items()])
+    )
+
+@app.get("/metrics", include_in_schema=False)
+def metricas():
+    # Formato texto do Prometheus; os valores são deste worker
+    return Response(registro.renderizar(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 def read_root():
     return {"message": "API do Cotador online e Profissional! 🚀"}
@@ -59,7 +104,7 @@ def criar_guia_teste(db: Session = Depends(database.get_db)):
 
 # Rota legacy sem /v1 para compatibilidade com versões antigas do frontend
 @app.post("/api/cotacao/", response_model=list[cotacao_schema_module.CotacaoResultado])
-def calcular_cotacao_alias(dados: cotacao_schema_module.CotacaoRequest, db: SQLAlchemySession = Depends(database.get_db)):
-    return calcular_cotacao_v1(dados, db)
+async def calcular_cotacao_alias(dados: cotacao_schema_module.CotacaoRequest, response: Response, db: AsyncSession = Depends(database.get_async_db)):
+    return await calcular_cotacao_v1(dados, response, db)
 
 # Remove model definitions from main.py; models must live under app/models
\ No newline at end of file
@@ -6,6 +6,7 @@ from app.models.hospital_model import Hospital, Municipio
 from app.models.carencia_model import Carencia
 from app.models.coparticipacao_model import Coparticipacao
 from app.models.guia_model import GuiaProposta
+from app.models.catalogo_model import CatalogoAlteracao, CatalogoVersao
 
 __all__ = [
     "Operadora",
@@ -16,4 +17,6 @@ __all__ = [
     "Carencia",
     "Coparticipacao",
     "GuiaProposta",
+    "CatalogoAlteracao",
+    "CatalogoVersao",
 ]
@@ -6,7 +6,7 @@ class Carencia(Base):
     __tablename__ = "carencias"
 
     id = Column(Integer, primary_key=True, index=True)
-    plano_id = Column(Integer, ForeignKey("planos.id"))
+    plano_id = Column(Integer, ForeignKey("planos.id"), index=True)
     
     descricao = Column(String) # Ex: Urgência e Emergência
     dias = Column(Integer)     # Ex: 24h, 30, 180
@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, DateTime, DDL, event
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+class CatalogoAlteracao(Base):
+    __tablename__ = "catalogo_alteracoes"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Versão do catálogo que a alteração criou (CatalogoVersao no flush). O id
+    # não serve: a sequência entrega ids no INSERT, fora da ordem dos commits
+    versao = Column(Integer, nullable=True, index=True)
+
+    # Escopo da alteração: um plano, os planos de uma operadora ou (ambos nulos) tudo
+    plano_id = Column(Integer, nullable=True)
+    operadora_id = Column(Integer, nullable=True)
+
+    criado_em = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class CatalogoVersao(Base):
+    """
+    Contador de linha única (id 1) com a versão atual do catálogo. Quem
+    registra uma alteração incrementa o contador na própria transação; o
+    lock da linha faz as escritas concorrentes terminarem na ordem das versões.
+    """
+
+    __tablename__ = "catalogo_versao"
+
+    id = Column(Integer, primary_key=True)
+    versao = Column(Integer, nullable=False, default=0)
+
+
+# Banco novo (create_all): a linha do contador já nasce com a tabela
+event.listen(CatalogoVersao.__table__, "after_create", DDL("INSERT INTO catalogo_versao (id, versao) VALUES (1, 0)"))
@@ -6,7 +6,7 @@ class Coparticipacao(Base):
     __tablename__ = "coparticipacoes"
 
     id = Column(Integer, primary_key=True, index=True)
-    plano_id = Column(Integer, ForeignKey("planos.id"), nullable=False)
+    plano_id = Column(Integer, ForeignKey("planos.id"), nullable=False, index=True)
     
     # Nome/descrição da coparticipação (Ex: Consulta, Internação, Exame, etc)
     nome = Column(String, nullable=True)  # Nome descritivo
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
 from app.db.database import Base
 from sqlalchemy.orm import relationship
 
@@ -6,9 +6,17 @@ class FaixaPreco(Base):
     __tablename__ = "faixas_preco"
 
     id = Column(Integer, primary_key=True, index=True)
-    plano_id = Column(Integer, ForeignKey("planos.id"))
+    plano_id = Column(Integer, ForeignKey("planos.id"), index=True)
     
     faixa_etaria = Column(String, index=True) # Ex: 00-18, 19-23
     valor = Column(Float)
+
+    # Limites da faixa_etaria, gravados junto com ela ("59+" -> 59, 999).
+    # Nulos só em linhas antigas que a migração não conseguiu interpretar
+    idade_min = Column(Integer, nullable=True)
+    idade_max = Column(Integer, nullable=True)
     
-    plano_rel = relationship("Plano", back_populates="faixas")
\ No newline at end of file
+    plano_rel = relationship("Plano", back_populates="faixas")
+
+    # Preço de uma idade num plano: plano_id = ? AND idade_min <= idade AND idade <= idade_max
+    __table_args__ = (Index("ix_faixas_preco_plano_idade", "plano_id", "idade_min", "idade_max"),)
@@ -6,7 +6,7 @@ class Hospital(Base):
     __tablename__ = "hospitais"
 
     id = Column(Integer, primary_key=True, index=True)
-    plano_id = Column(Integer, ForeignKey("planos.id"))
+    plano_id = Column(Integer, ForeignKey("planos.id"), index=True)
     nome = Column(String)
     endereco = Column(String, nullable=True)
     
@@ -16,7 +16,7 @@ class Municipio(Base):
     __tablename__ = "municipios_abrangidos"
 
     id = Column(Integer, primary_key=True, index=True)
-    plano_id = Column(Integer, ForeignKey("planos.id"))
+    plano_id = Column(Integer, ForeignKey("planos.id"), index=True)
     nome = Column(String, index=True)
     
     plano_rel = relationship("Plano", back_populates="municipios")
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Index, Integer, String, func
 from app.db.database import Base  # <--- Importando do lugar certo agora!
 from sqlalchemy.orm import relationship
 
@@ -10,4 +10,7 @@ class Operadora(Base):
     rede_credenciada_url = Column(String, nullable=True)
     
     #Relacionamento: uma operadora pode ter muitos planos
-    planos = relationship("Plano", back_populates="operadora_rel")
\ No newline at end of file
+    planos = relationship("Plano", back_populates="operadora_rel")
+
+    # Checagem de nome duplicado sem diferenciar maiúsculas (lower(nome) = lower(:nome))
+    __table_args__ = (Index("ix_operadoras_nome_lower", func.lower(nome)),)
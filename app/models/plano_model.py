@@ -9,7 +9,7 @@ class Plano(Base):
     nome = Column(String, index=True) # Ex: Essencial, Master PJ
     
     # RELACIONAMENTOS (FKs)
-    operadora_id = Column(Integer, ForeignKey("operadoras.id")) 
+    operadora_id = Column(Integer, ForeignKey("operadoras.id"), index=True)
     
     # FILTROS PRINCIPAIS (DO SEU EXCEL)
     tipo_contratacao = Column(String, index=True) # Ex: PF, PJ, Adesão
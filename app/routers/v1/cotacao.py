@@ -1,178 +1,275 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import Optional
+from sqlalchemy import delete, func, select
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db import database
 from app.models import operadora_model, plano_model, faixa_preco_model, hospital_model, carencia_model, coparticipacao_model
 from app.schemas import cotacao_schema
-from app.services.pdf_generator import gerar_pdf_cotacao
+from app.services.pdf_pool import PDF_STREAM_CHUNK, PDF_STREAM_MIN_PLANOS, FilaPdfCheia, TempoPdfEsgotado, pool_pdf, remover_temporario
+from app.services.pdf_cache import cache_pdf, chave_pdf, digesto_resultado, etag, etag_confere
+from app.services.catalog_cache import catalogo, registrar_alteracao
+from app.services.cotacao_sql import COTACAO_SQL, cotar_sql
+from app.services.catalog_loader import (
+    CAMPOS_LISTAGEM, COLECOES_LISTAGEM, INCLUIR_OPERADORA,
+    carregar_plano_async, carregar_planos_campos_async, carregar_resumo_planos_async, carregar_planos_listagem_async, carregar_planos_por_ids_async,
+)
+from app.services.price_index import parse_faixa, invalidar_indice
+from app.services.quote_store import cotacoes
+from app.services.metricas import pdf_bytes, pdf_segundos
+from app.services.resposta_json import plano_json, responder
+from app.services import importacao_planos
+from app.services.escrita_planos import atualizar_colecoes, criar_planos
+from app.services.lote_cotacao import RespostaNDJSON, blocos, cotar_bloco, familias_csv, familias_json, familias_ndjson
 from datetime import datetime
+import hashlib
+import json
+import os
+import time
 
 router = APIRouter()
 
+# Máximo de planos num POST /planos/lote
+PLANOS_LOTE_MAX = int(os.getenv("PLANOS_LOTE_MAX", "500"))
+
+# Maior página aceita em GET /planos/?limit=
+PLANOS_PAGINA_MAX = int(os.getenv("PLANOS_PAGINA_MAX", "1000"))
+
+# Leituras do catálogo (operadoras e planos): o navegador guarda a resposta e
+# revalida com If-None-Match, que vira 304 enquanto o catálogo não mudar
+CATALOGO_CACHE_CONTROL = os.getenv("CATALOGO_CACHE_CONTROL", "private, no-cache")
+
+
+async def _primeiro(db: AsyncSession, stmt):
+    return (await db.scalars(stmt)).first()
+
+
+async def _plano_ou_404(db: AsyncSession, plano_id: int) -> plano_model.Plano:
+    pl = await _primeiro(db, select(plano_model.Plano).where(plano_model.Plano.id == plano_id))
+    if not pl:
+        raise HTTPException(status_code=404, detail="Plano não encontrado")
+    return pl
+
+
+def _cabecalhos_catalogo(chave: str) -> dict:
+    return {"ETag": etag(chave), "Cache-Control": CATALOGO_CACHE_CONTROL}
+
+
+async def _catalogo_condicional(request: Request, response: Response, db: AsyncSession) -> Optional[Response]:
+    """
+    ETag forte da leitura = versão do catálogo + URL (rota e parâmetros).
+    Devolve um 304 se o cliente já tem essa versão; senão põe ETag e
+    Cache-Control em `response` e devolve None. A versão é lida antes dos
+    dados: a resposta nunca é mais velha que o ETag que ela leva.
+    """
+    versao = await catalogo.versao_async(db)
+    url = f"{request.url.path}?{request.url.query}"
+    chave = f"catalogo-{versao}-{hashlib.sha1(url.encode()).hexdigest()[:16]}"
+    if etag_confere(request.headers.get("if-none-match"), chave):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_cabecalhos_catalogo(chave))
+    response.headers.update(_cabecalhos_catalogo(chave))
+    return None
+
+
 # --- OPERADORAS ---
 @router.post("/operadoras/", response_model=cotacao_schema.OperadoraResponse, status_code=status.HTTP_201_CREATED)
-def criar_operadora(
+async def criar_operadora(
     operadora: cotacao_schema.OperadoraCreate, 
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     # Evitar duplicação por nome
-    existente = db.query(operadora_model.Operadora).filter(operadora_model.Operadora.nome.ilike(operadora.nome)).first()
+    existente = await _primeiro(db, select(operadora_model.Operadora).where(func.lower(operadora_model.Operadora.nome) == func.lower(operadora.nome)))
     if existente:
         raise HTTPException(status_code=409, detail="Operadora já existe")
 
     nova_op = operadora_model.Operadora(nome=operadora.nome, rede_credenciada_url=getattr(operadora, 'rede_credenciada_url', None))
     db.add(nova_op)
     try:
-        db.commit()
-        db.refresh(nova_op)
+        await db.flush()
+        registrar_alteracao(db, operadora_id=nova_op.id)
+        await db.commit()
+        await db.refresh(nova_op)
+        catalogo.marcar_alterado()
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=409, detail="Operadora já existe")
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
     return nova_op
 
 @router.get("/operadoras/", response_model=list[cotacao_schema.OperadoraResponse])
-def listar_operadoras(db: Session = Depends(database.get_db), nome: Optional[str] = None):
-    query = db.query(operadora_model.Operadora)
+async def listar_operadoras(request: Request, response: Response, db: AsyncSession = Depends(database.get_async_db), nome: Optional[str] = None):
+    nao_modificado = await _catalogo_condicional(request, response, db)
+    if nao_modificado is not None:
+        return nao_modificado
+    stmt = select(operadora_model.Operadora)
     if nome:
-        query = query.filter(operadora_model.Operadora.nome.ilike(f"%{nome}%"))
-    return query.all()
+        stmt = stmt.where(operadora_model.Operadora.nome.ilike(f"%{nome}%"))
+    return (await db.scalars(stmt)).all()
 
 
 @router.get("/operadoras/{operadora_id}", response_model=cotacao_schema.OperadoraResponse)
-def buscar_operadora(operadora_id: int, db: Session = Depends(database.get_db)):
-    op = db.query(operadora_model.Operadora).filter(operadora_model.Operadora.id == operadora_id).first()
+async def buscar_operadora(operadora_id: int, request: Request, response: Response, db: AsyncSession = Depends(database.get_async_db)):
+    nao_modificado = await _catalogo_condicional(request, response, db)
+    if nao_modificado is not None:
+        return nao_modificado
+    op = await db.get(operadora_model.Operadora, operadora_id)
     if not op:
         raise HTTPException(status_code=404, detail="Operadora não encontrada")
     return op
 
 
 @router.put("/operadoras/{operadora_id}", response_model=cotacao_schema.OperadoraResponse)
-def atualizar_operadora(operadora_id: int, operadora: cotacao_schema.OperadoraCreate, db: Session = Depends(database.get_db)):
-    op = db.query(operadora_model.Operadora).filter(operadora_model.Operadora.id == operadora_id).first()
+async def atualizar_operadora(operadora_id: int, operadora: cotacao_schema.OperadoraCreate, db: AsyncSession = Depends(database.get_async_db)):
+    op = await db.get(operadora_model.Operadora, operadora_id)
     if not op:
         raise HTTPException(status_code=404, detail="Operadora não encontrada")
     
     # Verificar se o novo nome já existe em outra operadora
     if op.nome != operadora.nome:
-        existente = db.query(operadora_model.Operadora).filter(
-            operadora_model.Operadora.nome.ilike(operadora.nome),
+        existente = await _primeiro(db, select(operadora_model.Operadora).where(
+            func.lower(operadora_model.Operadora.nome) == func.lower(operadora.nome),
             operadora_model.Operadora.id != operadora_id
-        ).first()
+        ))
         if existente:
             raise HTTPException(status_code=409, detail="Operadora com esse nome já existe")
     
     op.nome = operadora.nome
     op.rede_credenciada_url = getattr(operadora, 'rede_credenciada_url', op.rede_credenciada_url)
     try:
-        db.commit()
-        db.refresh(op)
+        registrar_alteracao(db, operadora_id=op.id)
+        await db.commit()
+        await db.refresh(op)
+        catalogo.marcar_alterado()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
     return op
 
 
 @router.delete("/operadoras/{operadora_id}", status_code=status.HTTP_200_OK)
-def deletar_operadora(operadora_id: int, db: Session = Depends(database.get_db)):
-    op = db.query(operadora_model.Operadora).filter(operadora_model.Operadora.id == operadora_id).first()
+async def deletar_operadora(operadora_id: int, db: AsyncSession = Depends(database.get_async_db)):
+    op = await db.get(operadora_model.Operadora, operadora_id)
     if not op:
         raise HTTPException(status_code=404, detail="Operadora não encontrada")
-    db.delete(op)
-    db.commit()
+    await db.delete(op)
+    registrar_alteracao(db, operadora_id=operadora_id)
+    await db.commit()
+    catalogo.marcar_alterado()
     return {"mensagem": "Operadora removida"}
 
 # --- PLANOS ---
 @router.post("/planos/", response_model=cotacao_schema.PlanoResponse, status_code=status.HTTP_201_CREATED)
-def criar_plano(plano: cotacao_schema.PlanoCreate, db: Session = Depends(database.get_db)):
+async def criar_plano(plano: cotacao_schema.PlanoCreate, db: AsyncSession = Depends(database.get_async_db)):
     
     # 1. Verificar se a Operadora existe
-    op = db.query(operadora_model.Operadora).filter(operadora_model.Operadora.id == plano.operadora_id).first()
+    op = await db.get(operadora_model.Operadora, plano.operadora_id)
     if not op:
         raise HTTPException(status_code=404, detail="Operadora não encontrada")
 
-    # 2. Separar as faixas de preço do resto dos dados do plano
-    # O .dict() ou .model_dump() transforma o schema em dicionário
-    # Use .model_dump() for Pydantic v2 compatibility (or .dict() on v1)
+    # 2. Plano e coleções pelo mesmo caminho do POST /planos/lote: um INSERT
+    # por tabela e um único commit (faixas já validadas pelo PlanoCreate)
     try:
-        plano_dados = plano.model_dump()
-    except Exception:
-        plano_dados = plano.dict()
-    faixas_dados = plano_dados.pop("faixas_preco") # Remove a lista de preços para não dar erro na tabela de planos
-    # Remover listas aninhadas para evitar passar dicts para SQLAlchemy
-    hosp_dados = plano_dados.pop('hospitais', [])
-    carencias_dados = plano_dados.pop('carencias', [])
-    municipios_dados = plano_dados.pop('municipios', [])
-    coparticipacoes_dados = plano_dados.pop('coparticipacoes', [])
-
-    # 3. Criar o Plano (sem as faixas por enquanto)
-    novo_plano = plano_model.Plano(**plano_dados)
-    
-    db.add(novo_plano)
-    db.commit()
-    db.refresh(novo_plano) # Aqui ganhamos o novo_plano.id
-
-    # 4. Agora sim, criar as Faixas de Preço vinculadas ao ID do plano criado
-    for faixa in faixas_dados:
-        nova_faixa = faixa_preco_model.FaixaPreco(
-            plano_id=novo_plano.id,  # Vinculando ao pai
-            faixa_etaria=faixa['faixa_etaria'],
-            valor=faixa['valor']
-        )
-        db.add(nova_faixa)
-    # Hospitais (opcional)
-    for hosp in hosp_dados:
-        nova_h = hospital_model.Hospital(
-            plano_id=novo_plano.id,
-            nome=hosp.get('nome'),
-            endereco=hosp.get('endereco')
-        )
-        db.add(nova_h)
-    # Carencias (opcional)
-    for car in carencias_dados:
-        nova_c = carencia_model.Carencia(
-            plano_id=novo_plano.id,
-            descricao=car.get('descricao'),
-            dias=car.get('dias')
-        )
-        db.add(nova_c)
-    # Coparticipações (opcional)
-    for coprt in coparticipacoes_dados:
-        nova_coprt = coparticipacao_model.Coparticipacao(
-            plano_id=novo_plano.id,
-            nome=coprt.get('nome'),
-            tipo_plano=coprt.get('tipo_plano'),
-            imagem_url=coprt.get('imagem_url'),
-            tipo_servico=coprt.get('tipo_servico'),
-            percentual=coprt.get('percentual'),
-            valor_minimo=coprt.get('valor_minimo'),
-            valor_maximo=coprt.get('valor_maximo')
-        )
-        db.add(nova_coprt)
-    # Municipios (opcional)
-    for m in municipios_dados:
-        novo_m = hospital_model.Municipio(
-            plano_id=novo_plano.id,
-            nome=m.get('nome')
+        [plano_id] = await criar_planos(db, [plano])
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Erro ao criar plano: {str(e)}")
+    catalogo.marcar_alterado()
+
+    # Recarrega o plano com as faixas dentro (sem lazy load na serialização)
+    return await carregar_plano_async(db, plano_id)
+
+
+@router.post("/planos/lote", response_model=list[cotacao_schema.PlanoResponse], status_code=status.HTTP_201_CREATED)
+async def criar_planos_lote(planos: list[cotacao_schema.PlanoCreate], db: AsyncSession = Depends(database.get_async_db)):
+    """
+    Cria vários planos (ex.: uma linha de produtos nova) numa única
+    transação: um INSERT para os planos e um por tabela filha, em vez de
+    dois commits e um flush por linha para cada plano.
+    """
+    if not planos:
+        raise HTTPException(status_code=400, detail="Lista de planos vazia")
+    if len(planos) > PLANOS_LOTE_MAX:
+        raise HTTPException(status_code=413, detail=f"Envie no máximo {PLANOS_LOTE_MAX} planos por lote")
+
+    operadora_ids = {p.operadora_id for p in planos}
+    encontradas = set((await db.scalars(
+        select(operadora_model.Operadora.id).where(operadora_model.Operadora.id.in_(operadora_ids))
+    )).all())
+    faltando = sorted(operadora_ids - encontradas)
+    if faltando:
+        raise HTTPException(status_code=404, detail=f"Operadora não encontrada: {', '.join(map(str, faltando))}")
+
+    try:
+        ids = await criar_planos(db, planos)
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Erro ao criar planos: {str(e)}")
+    catalogo.marcar_alterado()
+
+    planos_criados = await carregar_planos_por_ids_async(db, ids)
+    await db.close()
+    return planos_criados
+
+
+@router.post("/planos/importar", status_code=status.HTTP_201_CREATED)
+async def importar_planos(request: Request, parcial: bool = False, db: AsyncSession = Depends(database.get_async_db)):
+    """
+    Importa uma tabela de planos (CSV ou XLSX, uma linha por plano) numa
+    única transação. Colunas: operadora (nome) ou operadora_id, nome,
+    tipo_contratacao, acomodacao, abrangencia, coparticipacao, elegibilidade,
+    uma coluna por faixa etária ("0-18", ..., "59+") com o valor, e as
+    coleções hospitais ("Nome:Endereço|..."), carencias ("Consultas:30|..."),
+    coparticipacoes ("Consulta:20:50:200|...", percentual/mínimo/máximo) e
+    municipios ("Cidade|..."). Com erro em alguma linha nada é gravado
+    (422), a não ser com ?parcial=true, que grava as linhas válidas.
+    """
+    tipo = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if tipo not in importacao_planos.CONTENT_TYPES_CSV and tipo != importacao_planos.CONTENT_TYPE_XLSX:
+        raise HTTPException(status_code=415, detail="Envie text/csv ou uma planilha .xlsx")
+
+    # O arquivo é lido inteiro antes da primeira consulta: a transação (e a
+    # conexão do pool) só é aberta quando as linhas já estão prontas
+    try:
+        if tipo == importacao_planos.CONTENT_TYPE_XLSX:
+            arquivo = await importacao_planos.guardar_corpo(request.stream())
+            try:
+                # openpyxl é síncrono: a leitura da planilha vai para o threadpool
+                brutas = await run_in_threadpool(lambda: list(importacao_planos.linhas_xlsx(arquivo)))
+            finally:
+                arquivo.close()
+        else:
+            brutas = [linha async for linha in importacao_planos.linhas_csv(request.stream())]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    operadoras, existentes = await importacao_planos.referencias(db)
+    linhas = [importacao_planos.plano_da_linha(n, campos, operadoras) for n, campos in brutas]
+    importacao_planos.marcar_duplicados(linhas, existentes)
+    erros = [linha.relatorio() for linha in linhas if linha.plano is None]
+    if erros and not parcial:
+        await db.rollback()
+        return JSONResponse(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            content={"importados": 0, "plano_ids": [], "linhas": len(linhas), "erros": erros},
         )
-        db.add(novo_m)
-    
-    db.commit() # Salva todas as faixas
-    db.refresh(novo_plano) # Atualiza o plano para retornar com as faixas dentro
 
-    return novo_plano
+    try:
+        ids = await importacao_planos.gravar(db, linhas)
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Erro ao importar planos: {str(e)}")
+    catalogo.marcar_alterado()
+    return {"importados": len(ids), "plano_ids": ids, "linhas": len(linhas), "erros": erros}
 
 
 @router.put("/planos/{plano_id}", response_model=cotacao_schema.PlanoResponse)
-def atualizar_plano(plano_id: int, plano: cotacao_schema.PlanoCreate, db: Session = Depends(database.get_db)):
-    pl = db.query(plano_model.Plano).filter(plano_model.Plano.id == plano_id).first()
-    if not pl:
-        raise HTTPException(status_code=404, detail="Plano não encontrado")
+async def atualizar_plano(plano_id: int, plano: cotacao_schema.PlanoCreate, db: AsyncSession = Depends(database.get_async_db)):
+    pl = await _plano_ou_404(db, plano_id)
     pl.nome = plano.nome
     pl.tipo_contratacao = plano.tipo_contratacao
     pl.acomodacao = plano.acomodacao
@@ -181,146 +278,100 @@ def atualizar_plano(plano_id: int, plano: cotacao_schema.PlanoCreate, db: Sessio
     pl.elegibilidade = plano.elegibilidade
     pl.imagem_coparticipacao_url = plano.imagem_coparticipacao_url
     try:
-        # Remove existing child records and recreate (EXCETO coparticipações)
-        db.query(faixa_preco_model.FaixaPreco).filter(faixa_preco_model.FaixaPreco.plano_id == pl.id).delete()
-        db.query(hospital_model.Hospital).filter(hospital_model.Hospital.plano_id == pl.id).delete()
-        db.query(carencia_model.Carencia).filter(carencia_model.Carencia.plano_id == pl.id).delete()
-        db.query(hospital_model.Municipio).filter(hospital_model.Municipio.plano_id == pl.id).delete()
-        db.commit()
-        for faixa in plano.faixas_preco:
-            nova_faixa = faixa_preco_model.FaixaPreco(plano_id=pl.id, faixa_etaria=faixa.faixa_etaria, valor=faixa.valor)
-            db.add(nova_faixa)
-        for hosp in getattr(plano, 'hospitais', []):
-            nova_h = hospital_model.Hospital(plano_id=pl.id, nome=getattr(hosp, 'nome', None), endereco=getattr(hosp, 'endereco', None))
-            db.add(nova_h)
-        for car in getattr(plano, 'carencias', []):
-            nova_c = carencia_model.Carencia(plano_id=pl.id, descricao=getattr(car, 'descricao', None), dias=getattr(car, 'dias', None))
-            db.add(nova_c)
-        
-        # Processar coparticipações: atualizar as com ID, criar as sem ID
-        # Primeiramente, obter IDs das coparticipações enviadas no request
-        coparticipacoes_request = getattr(plano, 'coparticipacoes', [])
-        ids_request = [getattr(c, 'id', None) for c in coparticipacoes_request if getattr(c, 'id', None)]
-        
-        # Deletar coparticipações que não estão mais no request
-        coprt_banco = db.query(coparticipacao_model.Coparticipacao).filter(
-            coparticipacao_model.Coparticipacao.plano_id == pl.id
-        ).all()
-        
-        ids_banco = [c.id for c in coprt_banco]
-        ids_para_deletar = [id_banco for id_banco in ids_banco if id_banco not in ids_request]
-        
-        for id_deletar in ids_para_deletar:
-            db.query(coparticipacao_model.Coparticipacao).filter(
-                coparticipacao_model.Coparticipacao.id == id_deletar
-            ).delete()
-        
-        db.commit()  # Confirma os deletes antes de processar as novas/atualizações
-        
-        # Processar cada coparticipação do request
-        for coprt in coparticipacoes_request:
-            coprt_id = getattr(coprt, 'id', None)
-            
-            if coprt_id:
-                # Atualizar coparticipação existente
-                coprt_existente = db.query(coparticipacao_model.Coparticipacao).filter(
-                    coparticipacao_model.Coparticipacao.id == coprt_id,
-                    coparticipacao_model.Coparticipacao.plano_id == pl.id
-                ).first()
-                
-                if coprt_existente:
-                    coprt_existente.nome = getattr(coprt, 'nome', None)
-                    coprt_existente.tipo_servico = getattr(coprt, 'tipo_servico', None)
-                    coprt_existente.percentual = getattr(coprt, 'percentual', None)
-                    coprt_existente.valor_minimo = getattr(coprt, 'valor_minimo', None)
-                    coprt_existente.valor_maximo = getattr(coprt, 'valor_maximo', None)
-            else:
-                # Criar nova coparticipação
-                nova_coprt = coparticipacao_model.Coparticipacao(
-                    plano_id=pl.id,
-                    nome=getattr(coprt, 'nome', None),
-                    tipo_plano=getattr(coprt, 'tipo_plano', None),
-                    imagem_url=getattr(coprt, 'imagem_url', None),
-                    tipo_servico=getattr(coprt, 'tipo_servico', None),
-                    percentual=getattr(coprt, 'percentual', None),
-                    valor_minimo=getattr(coprt, 'valor_minimo', None),
-                    valor_maximo=getattr(coprt, 'valor_maximo', None)
-                )
-                db.add(nova_coprt)
-        
-        for m in getattr(plano, 'municipios', []):
-            novo_m = hospital_model.Municipio(plano_id=pl.id, nome=getattr(m, 'nome', None))
-            db.add(novo_m)
-        db.commit()
-        db.refresh(pl)
+        registrar_alteracao(db, plano_id=pl.id)
+        # Só as linhas filhas que mudaram, e tudo num commit só: se algo
+        # falhar o plano continua como estava
+        await atualizar_colecoes(db, pl.id, plano)
+        await db.commit()
+        invalidar_indice(pl.id)
+        catalogo.marcar_alterado()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    return pl
+    return await carregar_plano_async(db, pl.id)
 
 @router.delete("/planos/{plano_id}")
-def excluir_plano(plano_id: int, db: Session = Depends(database.get_db)):
-    pl = db.query(plano_model.Plano).filter(plano_model.Plano.id == plano_id).first()
-    if not pl:
-        raise HTTPException(status_code=404, detail="Plano não encontrado")
+async def excluir_plano(plano_id: int, db: AsyncSession = Depends(database.get_async_db)):
+    pl = await _plano_ou_404(db, plano_id)
     
     try:
         # Excluir relacionamentos primeiro (ordem importa!)
-        db.query(faixa_preco_model.FaixaPreco).filter(faixa_preco_model.FaixaPreco.plano_id == plano_id).delete()
-        db.query(hospital_model.Hospital).filter(hospital_model.Hospital.plano_id == plano_id).delete()
-        db.query(carencia_model.Carencia).filter(carencia_model.Carencia.plano_id == plano_id).delete()
-        db.query(coparticipacao_model.Coparticipacao).filter(coparticipacao_model.Coparticipacao.plano_id == plano_id).delete()
-        db.query(hospital_model.Municipio).filter(hospital_model.Municipio.plano_id == plano_id).delete()
+        await db.execute(delete(faixa_preco_model.FaixaPreco).where(faixa_preco_model.FaixaPreco.plano_id == plano_id))
+        await db.execute(delete(hospital_model.Hospital).where(hospital_model.Hospital.plano_id == plano_id))
+        await db.execute(delete(carencia_model.Carencia).where(carencia_model.Carencia.plano_id == plano_id))
+        await db.execute(delete(coparticipacao_model.Coparticipacao).where(coparticipacao_model.Coparticipacao.plano_id == plano_id))
+        await db.execute(delete(hospital_model.Municipio).where(hospital_model.Municipio.plano_id == plano_id))
         # Nota: guias_proposta não tem coluna plano_id no banco, então não deletamos
         
         # Excluir o plano
-        db.delete(pl)
-        db.commit()
+        await db.delete(pl)
+        registrar_alteracao(db, plano_id=plano_id)
+        await db.commit()
+        invalidar_indice(plano_id)
+        catalogo.marcar_alterado()
         
         return {"message": "Plano excluído com sucesso"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Erro ao excluir plano: {str(e)}")
 
 @router.delete("/planos/{plano_id}/coparticipacoes/{coparticipacao_id}")
-def excluir_coparticipacao(plano_id: int, coparticipacao_id: int, db: Session = Depends(database.get_db)):
+async def excluir_coparticipacao(plano_id: int, coparticipacao_id: int, db: AsyncSession = Depends(database.get_async_db)):
     """Exclui apenas uma coparticipação sem recriar todas as outras"""
     try:
-        coprt = db.query(coparticipacao_model.Coparticipacao).filter(
+        coprt = await _primeiro(db, select(coparticipacao_model.Coparticipacao).where(
             coparticipacao_model.Coparticipacao.id == coparticipacao_id,
             coparticipacao_model.Coparticipacao.plano_id == plano_id
-        ).first()
+        ))
         
         if not coprt:
             raise HTTPException(status_code=404, detail="Coparticipação não encontrada")
         
-        db.delete(coprt)
-        db.commit()
+        await db.delete(coprt)
+        registrar_alteracao(db, plano_id=plano_id)
+        await db.commit()
+        catalogo.marcar_alterado()
         
         return {"message": "Coparticipação excluída com sucesso"}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Erro ao excluir: {str(e)}")
 
 @router.get("/planos/", response_model=list[cotacao_schema.PlanoResponse])
-def listar_planos(db: Session = Depends(database.get_db), nome: Optional[str] = None, operadora_id: Optional[int] = None):
+async def listar_planos(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(database.get_async_db),
+    nome: Optional[str] = None,
+    operadora_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=PLANOS_PAGINA_MAX),
+    after_id: Optional[int] = None,
+    fields: Optional[str] = None,
+    include: Optional[str] = None,
+):
+    """
+    Sem parâmetros, todos os planos com todas as coleções (como a tela do
+    admin espera). `limit`/`after_id` paginam por id; o cabeçalho
+    X-Next-After-Id traz o after_id da próxima página. `fields` escolhe as
+    colunas do plano e `include` as coleções (e "operadora"); com qualquer
+    um dos dois, só o que foi pedido é lido do banco.
+    """
+    campos = _lista_parametro(fields, CAMPOS_LISTAGEM, "fields")
+    incluir = _lista_parametro(include, (*COLECOES_LISTAGEM, INCLUIR_OPERADORA), "include")
+    nao_modificado = await _catalogo_condicional(request, response, db)
+    if nao_modificado is not None:
+        return nao_modificado
+    # Uma linha a mais diz se existe próxima página sem um COUNT
+    limite = limit + 1 if limit is not None else None
     try:
-        query = db.query(plano_model.Plano)
-        if nome:
-            query = query.filter(plano_model.Plano.nome.ilike(f"%{nome}%"))
-        if operadora_id:
-            query = query.filter(plano_model.Plano.operadora_id == operadora_id)
-        
-        planos = query.options(
-            joinedload(plano_model.Plano.operadora_rel),
-            joinedload(plano_model.Plano.faixas),
-            joinedload(plano_model.Plano.hospitais),
-            joinedload(plano_model.Plano.carencias),
-            joinedload(plano_model.Plano.coparticipacoes),
-            joinedload(plano_model.Plano.municipios),
-        ).all()
-        
-        return planos
+        if campos is None and incluir is None:
+            planos = await carregar_planos_listagem_async(db, nome=nome, operadora_id=operadora_id, after_id=after_id, limite=limite)
+        else:
+            planos = await carregar_planos_campos_async(
+                db, campos or CAMPOS_LISTAGEM, incluir or (), nome=nome, operadora_id=operadora_id, after_id=after_id, limite=limite,
+            )
+        # Tudo já foi carregado: devolve a conexão ao pool antes da serialização
+        await db.close()
     except Exception as e:
         import traceback
         print("=== ERRO NO LISTAR_PLANOS ===")
@@ -328,202 +379,310 @@ def listar_planos(db: Session = Depends(database.get_db), nome: Optional[str] =
         print(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"Erro ao listar planos: {str(e)}")
 
+    headers = {}
+    if limit is not None and len(planos) > limit:
+        planos = planos[:limit]
+        ultimo = planos[-1]
+        headers["X-Next-After-Id"] = str(ultimo["id"] if isinstance(ultimo, dict) else ultimo.id)
+    response.headers.update(headers)
+    if campos is None and incluir is None:
+        return responder(planos, response, item=plano_json)
+    # Resposta parcial: não passa pelo PlanoResponse (os campos omitidos são obrigatórios nele)
+    return JSONResponse(content=planos, headers=dict(response.headers))
+
+
+@router.get("/planos/resumo", response_model=list[cotacao_schema.PlanoResumo])
+async def resumo_planos(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(database.get_async_db),
+    nome: Optional[str] = None,
+    operadora_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=PLANOS_PAGINA_MAX),
+    after_id: Optional[int] = None,
+):
+    """Id, nome, operadora, tipo e totais de hospitais/municípios de cada plano, num único SELECT"""
+    nao_modificado = await _catalogo_condicional(request, response, db)
+    if nao_modificado is not None:
+        return nao_modificado
+    planos = await carregar_resumo_planos_async(
+        db, nome=nome, operadora_id=operadora_id, after_id=after_id, limite=limit + 1 if limit is not None else None,
+    )
+    if limit is not None and len(planos) > limit:
+        planos = planos[:limit]
+        response.headers["X-Next-After-Id"] = str(planos[-1]["id"])
+    return planos
+
+
+@router.get("/planos/{plano_id}", response_model=cotacao_schema.PlanoResponse)
+async def buscar_plano(plano_id: int, request: Request, response: Response, db: AsyncSession = Depends(database.get_async_db)):
+    """Um plano com todas as coleções, sem carregar os demais"""
+    nao_modificado = await _catalogo_condicional(request, response, db)
+    if nao_modificado is not None:
+        return nao_modificado
+    plano = await carregar_plano_async(db, plano_id)
+    if plano is None:
+        raise HTTPException(status_code=404, detail="Plano não encontrado")
+    return plano
+
+
+def _lista_parametro(valor: Optional[str], aceitos, nome: str) -> Optional[tuple[str, ...]]:
+    """'a,b' -> ('a', 'b'), conferindo contra `aceitos`; None se o parâmetro não veio."""
+    if valor is None:
+        return None
+    itens = tuple(dict.fromkeys(i.strip() for i in valor.split(",") if i.strip()))
+    invalidos = [i for i in itens if i not in aceitos]
+    if invalidos:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{nome} inválido: {', '.join(invalidos)} (aceitos: {', '.join(aceitos)})",
+        )
+    return itens
+
+
+# --- BANCO (pool de conexões) ---
+@router.get("/db/pool")
+def status_pool_db():
+    """Conexões em uso, overflow e espera por conexão nos pools deste worker"""
+    return {
+        "async": database.estatisticas_pool(database.async_engine.sync_engine),
+        "sync": database.estatisticas_pool(database.engine),
+    }
+
+
+# --- CATÁLOGO (cache em memória) ---
+@router.get("/catalogo/status")
+def status_catalogo():
+    """Versão do catálogo em memória e contadores de hit/miss/reload"""
+    return catalogo.estatisticas()
+
+@router.post("/catalogo/recarregar")
+async def recarregar_catalogo(db: AsyncSession = Depends(database.get_async_db)):
+    """Força a reconstrução completa do catálogo em memória deste worker"""
+    await catalogo.reconstruir_async(db)
+    return catalogo.estatisticas()
+
 
 # --- COTAÇÃO ---
 
 def verificar_faixa(idade: int, faixa_string: str) -> bool:
     """
-    Função auxiliar para checar se a idade cai na faixa "0-18", "19-23", etc.
+    Função auxiliar para checar se a idade cai na faixa "0-18", "19-23", "59+", etc.
     """
-    try:
-        # Remove espaços e quebra a string no hífen
-        min_str, max_str = faixa_string.replace(" ", "").split("-")
-        min_idade = int(min_str)
-        
-        # Se for "59+", o max seria algo como 999
-        if "+" in max_str:
-            max_idade = 999
-        else:
-            max_idade = int(max_str)
-            
-        return min_idade <= idade <= max_idade
-    except:
+    limites = parse_faixa(faixa_string)
+    if limites is None:
         return False
+    return limites[0] <= idade <= limites[1]
 
 @router.post("/cotacao/", response_model=list[cotacao_schema.CotacaoResultado])
-def calcular_cotacao(dados: cotacao_schema.CotacaoRequest, db: Session = Depends(database.get_db)):
+async def calcular_cotacao(dados: cotacao_schema.CotacaoRequest, response: Response, db: AsyncSession = Depends(database.get_async_db)):
     if not dados.idades:
         raise HTTPException(status_code=400, detail="Lista de idades vazia")
 
-    query = db.query(plano_model.Plano)
-    if dados.operadora_id is not None:
-        query = query.filter(plano_model.Plano.operadora_id == dados.operadora_id)
-    if dados.tipo_contratacao:
-        query = query.filter(plano_model.Plano.tipo_contratacao.ilike(f"{dados.tipo_contratacao}%"))
-    if dados.acomodacao:
-        query = query.filter(plano_model.Plano.acomodacao.ilike(f"{dados.acomodacao}%"))
-    if dados.abrangencia:
-        query = query.filter(plano_model.Plano.abrangencia.ilike(f"{dados.abrangencia}%"))
-    if dados.elegibilidade is not None:
-        query = query.filter(plano_model.Plano.elegibilidade == dados.elegibilidade)
-    if dados.coparticipacao is not None:
-        query = query.filter(plano_model.Plano.coparticipacao == dados.coparticipacao)
-
-    planos_disponiveis = query.options(
-        joinedload(plano_model.Plano.operadora_rel),
-        joinedload(plano_model.Plano.faixas),
-        joinedload(plano_model.Plano.hospitais),
-        joinedload(plano_model.Plano.carencias),
-        joinedload(plano_model.Plano.coparticipacoes),
-        joinedload(plano_model.Plano.municipios),
-    ).all()
-
-    resultados = []
-    for plano in planos_disponiveis:
-        total_plano = 0.0
-        detalhes_beneficiarios = []
-        plano_valido = True
-
-        for idade in dados.idades:
-            preco_encontrado = None
-            faixa_encontrada = ""
-            for faixa in plano.faixas:
-                if verificar_faixa(idade, faixa.faixa_etaria):
-                    preco_encontrado = faixa.valor
-                    faixa_encontrada = faixa.faixa_etaria
-                    break
-
-            if preco_encontrado is not None:
-                total_plano += preco_encontrado
-                detalhes_beneficiarios.append({
-                    "idade": idade,
-                    "faixa_etaria_usada": faixa_encontrada,
-                    "valor": preco_encontrado
-                })
-            else:
-                plano_valido = False
-                break
+    if COTACAO_SQL:
+        # Faixas × idades agregadas no banco; só os planos precificados voltam
+        resultados = await cotar_sql(db, dados)
+    else:
+        resultados = await catalogo.cotar_async(db, dados)
 
-        if plano_valido:
-            # Verificar se operadora existe
-            operadora_nome = plano.operadora_rel.nome if plano.operadora_rel else "N/A"
-            rede_url = plano.operadora_rel.rede_credenciada_url if plano.operadora_rel else None
-            
-            resultados.append({
-                "plano_id": plano.id,
-                "operadora": operadora_nome,
-                "plano": plano.nome,
-                "preco_total": round(total_plano, 2),
-                "beneficiarios": detalhes_beneficiarios,
-                "imagem_coparticipacao_url": getattr(plano, 'imagem_coparticipacao_url', None),
-                "hospitais": [ {"id": h.id, "nome": h.nome, "endereco": h.endereco} for h in plano.hospitais],
-                "carencias": [ {"id": c.id, "descricao": c.descricao, "dias": c.dias} for c in plano.carencias],
-                "coparticipacoes": [ {"id": cp.id, "nome": cp.nome, "tipo_plano": cp.tipo_plano, "imagem_url": cp.imagem_url, "tipo_servico": cp.tipo_servico, "percentual": cp.percentual, "valor_minimo": cp.valor_minimo, "valor_maximo": cp.valor_maximo} for cp in plano.coparticipacoes],
-                "municipios": [ {"id": m.id, "nome": m.nome} for m in plano.municipios],
-                "rede_credenciada_url": rede_url
-            })
-
-    return resultados
+    # Guarda o resultado para que o PDF seja gerado sem recalcular (GET /cotacao/{id}/pdf)
+    response.headers["X-Cotacao-Id"] = cotacoes.salvar(dados.idades, resultados)
+    return responder(resultados, response)
 
 
-@router.post("/cotacao/pdf")
-def gerar_pdf_cotacao_endpoint(dados: cotacao_schema.CotacaoRequest, db: Session = Depends(database.get_db)):
+# Content-types aceitos por /cotacao/lote
+_LEITORES_LOTE = {
+    "application/json": familias_json,
+    "application/x-ndjson": familias_ndjson,
+    "application/ndjson": familias_ndjson,
+    "text/csv": familias_csv,
+    "application/csv": familias_csv,
+}
+
+@router.post("/cotacao/lote")
+async def calcular_cotacao_lote(request: Request, db: AsyncSession = Depends(database.get_async_db)):
     """
-    Endpoint para gerar PDF da cotação
+    Cota várias famílias de uma vez. O corpo pode ser um array JSON de
+    CotacaoRequest, NDJSON (uma por linha) ou CSV com coluna "idades" e as
+    colunas de filtro. A resposta é NDJSON, uma linha por família, enviada
+    conforme cada bloco de famílias é precificado. O catálogo é lido uma
+    única vez para o lote inteiro.
     """
-    if not dados.idades:
-        raise HTTPException(status_code=400, detail="Lista de idades vazia")
-    
-    # Reutilizar a lógica de calcular_cotacao
-    query = db.query(plano_model.Plano)
-    if dados.operadora_id is not None:
-        query = query.filter(plano_model.Plano.operadora_id == dados.operadora_id)
-    if dados.tipo_contratacao:
-        query = query.filter(plano_model.Plano.tipo_contratacao.ilike(f"{dados.tipo_contratacao}%"))
-    if dados.acomodacao:
-        query = query.filter(plano_model.Plano.acomodacao.ilike(f"{dados.acomodacao}%"))
-    if dados.abrangencia:
-        query = query.filter(plano_model.Plano.abrangencia.ilike(f"{dados.abrangencia}%"))
-    if dados.elegibilidade is not None:
-        query = query.filter(plano_model.Plano.elegibilidade == dados.elegibilidade)
-    if dados.coparticipacao is not None:
-        query = query.filter(plano_model.Plano.coparticipacao == dados.coparticipacao)
-
-    planos_disponiveis = query.options(
-        joinedload(plano_model.Plano.operadora_rel),
-        joinedload(plano_model.Plano.faixas),
-        joinedload(plano_model.Plano.hospitais),
-        joinedload(plano_model.Plano.carencias),
-        joinedload(plano_model.Plano.coparticipacoes),
-        joinedload(plano_model.Plano.municipios),
-    ).all()
-
-    resultados = []
-    for plano in planos_disponiveis:
-        total_plano = 0.0
-        detalhes_beneficiarios = []
-        plano_valido = True
-
-        for idade in dados.idades:
-            preco_encontrado = None
-            faixa_encontrada = ""
-            for faixa in plano.faixas:
-                if verificar_faixa(idade, faixa.faixa_etaria):
-                    preco_encontrado = faixa.valor
-                    faixa_encontrada = faixa.faixa_etaria
-                    break
-
-            if preco_encontrado is not None:
-                total_plano += preco_encontrado
-                detalhes_beneficiarios.append({
-                    "idade": idade,
-                    "faixa_etaria_usada": faixa_encontrada,
-                    "valor": preco_encontrado
-                })
-            else:
-                plano_valido = False
-                break
+    tipo = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+    leitor = _LEITORES_LOTE.get(tipo)
+    if leitor is None:
+        raise HTTPException(status_code=415, detail="Envie application/json, application/x-ndjson ou text/csv")
 
-        if plano_valido:
-            operadora_nome = plano.operadora_rel.nome if plano.operadora_rel else "N/A"
-            rede_url = plano.operadora_rel.rede_credenciada_url if plano.operadora_rel else None
-            
-            resultados.append({
-                "plano_id": plano.id,
-                "operadora": operadora_nome,
-                "plano": plano.nome,
-                "preco_total": round(total_plano, 2),
-                "beneficiarios": detalhes_beneficiarios,
-                "imagem_coparticipacao_url": getattr(plano, 'imagem_coparticipacao_url', None),
-                "hospitais": [ {"id": h.id, "nome": h.nome, "endereco": h.endereco} for h in plano.hospitais],
-                "carencias": [ {"id": c.id, "descricao": c.descricao, "dias": c.dias} for c in plano.carencias],
-                "coparticipacoes": [ {"id": cp.id, "nome": cp.nome, "tipo_plano": cp.tipo_plano, "imagem_url": cp.imagem_url, "tipo_servico": cp.tipo_servico, "percentual": cp.percentual, "valor_minimo": cp.valor_minimo, "valor_maximo": cp.valor_maximo} for cp in plano.coparticipacoes],
-                "municipios": [ {"id": m.id, "nome": m.nome} for m in plano.municipios],
-                "rede_credenciada_url": rede_url
-            })
-    
-    # Filtrar por plano específico se solicitado
-    if dados.plano_id is not None:
-        resultados = [r for r in resultados if r.get("plano_id") == dados.plano_id]
-        if not resultados:
-            raise HTTPException(status_code=404, detail="Plano não encontrado para gerar PDF")
+    snapshot = await catalogo.snapshot_async(db)
 
-    # Gerar PDF (inclui desconto_percentual, se enviado)
-    payload_pdf = {"resultados": resultados}
-    desconto_percentual = getattr(dados, 'desconto_percentual', None)
-    if desconto_percentual is not None:
+    async def gerar_linhas():
         try:
-            payload_pdf["desconto_percentual"] = float(desconto_percentual)
-        except Exception:
-            payload_pdf["desconto_percentual"] = 0.0
-    pdf_buffer = gerar_pdf_cotacao(payload_pdf, dados.idades)
-    
+            async for bloco in blocos(leitor(request.stream())):
+                for linha in await run_in_threadpool(list, cotar_bloco(snapshot, bloco)):
+                    yield linha
+        except ValueError as e:
+            yield json.dumps({"erro": str(e)}, ensure_ascii=False) + "\n"
+
+    return RespostaNDJSON(gerar_linhas())
+
+
+def _normalizar_desconto(desconto_percentual) -> float:
+    if desconto_percentual is None:
+        return 0.0
+    try:
+        return float(desconto_percentual)
+    except Exception:
+        return 0.0
+
+
+def _cabecalhos_cache_pdf(chave: str) -> dict:
+    # no-cache: o navegador guarda o PDF mas revalida com If-None-Match
+    return {"ETag": etag(chave), "Cache-Control": "private, no-cache"}
+
+
+def _pdf_em_cache(request: Request, chave: str) -> Optional[Response]:
+    """304 se o cliente já tem este PDF, o PDF do cache se houver, senão None."""
+    if etag_confere(request.headers.get("if-none-match"), chave):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=_cabecalhos_cache_pdf(chave))
+    pdf_bytes = cache_pdf.obter(chave)
+    if pdf_bytes is None:
+        return None
+    return _resposta_pdf(pdf_bytes, chave)
+
+
+def _resposta_pdf(pdf_bytes: bytes, chave: str) -> Response:
     # Nome do arquivo com timestamp
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"cotacao_{timestamp}.pdf"
     
-    return StreamingResponse(
-        pdf_buffer,
+    return Response(
+        content=pdf_bytes,
         media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
\ No newline at end of file
+        headers={"Content-Disposition": f"attachment; filename={filename}", **_cabecalhos_cache_pdf(chave)}
+    )
+
+
+async def _no_pool_pdf(geracao):
+    try:
+        return await geracao
+    except FilaPdfCheia:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Muitos PDFs sendo gerados no momento, tente novamente em instantes",
+            headers={"Retry-After": "5"},
+        )
+    except TempoPdfEsgotado:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="Tempo esgotado ao gerar o PDF")
+
+
+def _ler_em_pedacos(arquivo, caminho: Optional[str]):
+    try:
+        while True:
+            pedaco = arquivo.read(PDF_STREAM_CHUNK)
+            if not pedaco:
+                break
+            yield pedaco
+    finally:
+        arquivo.close()
+        if caminho is not None:
+            remover_temporario(caminho)
+
+
+async def _gerar_pdf(chave: str, plano_ids: list[int], resultados: list[dict], idades: list[int], desconto: float) -> Response:
+    # O ReportLab roda no pool de processos: o event loop e o threadpool
+    # continuam livres para as cotações enquanto o PDF é montado
+    payload_pdf = {"resultados": resultados, "desconto_percentual": desconto}
+
+    if len(resultados) >= PDF_STREAM_MIN_PLANOS:
+        # Comparativo grande: o PDF fica em arquivo temporário e sai em pedaços,
+        # sem passar inteiro pela memória deste worker (nem pelo cache)
+        inicio = time.perf_counter()
+        arquivo, caminho = await _no_pool_pdf(pool_pdf.gerar_arquivo(payload_pdf, idades))
+        pdf_segundos.observar(time.perf_counter() - inicio, "arquivo")
+        arquivo.seek(0, os.SEEK_END)
+        tamanho = arquivo.tell()
+        arquivo.seek(0)
+        pdf_bytes.observar(tamanho, "arquivo")
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return StreamingResponse(
+            _ler_em_pedacos(arquivo, caminho),
+            media_type="application/pdf",
+            headers={
+                "Content-Disposition": f"attachment; filename=cotacao_{timestamp}.pdf",
+                "Content-Length": str(tamanho),
+                **_cabecalhos_cache_pdf(chave),
+            },
+        )
+
+    inicio = time.perf_counter()
+    conteudo = await _no_pool_pdf(pool_pdf.gerar(payload_pdf, idades))
+    pdf_segundos.observar(time.perf_counter() - inicio, "memoria")
+    pdf_bytes.observar(len(conteudo), "memoria")
+    cache_pdf.guardar(chave, plano_ids, conteudo)
+    return _resposta_pdf(conteudo, chave)
+
+
+@router.get("/cotacao/{cotacao_id}/pdf")
+async def gerar_pdf_cotacao_armazenada(cotacao_id: str, request: Request, plano_id: Optional[int] = None, desconto_percentual: Optional[float] = None):
+    """
+    Gera o PDF a partir de uma cotação já calculada (id retornado no header X-Cotacao-Id)
+    """
+    cotacao = cotacoes.obter(cotacao_id)
+    if cotacao is None:
+        raise HTTPException(status_code=404, detail="Cotação não encontrada ou expirada")
+
+    resultados = cotacao.resultados
+    if plano_id is not None:
+        resultado = cotacao.resultado_do_plano(plano_id)
+        if resultado is None:
+            raise HTTPException(status_code=404, detail="Plano não encontrado para gerar PDF")
+        resultados = [resultado]
+
+    # A cotação guardada é imutável: a chave vem do próprio conteúdo
+    desconto = _normalizar_desconto(desconto_percentual)
+    chave = chave_pdf(((r["plano_id"], digesto_resultado(r)) for r in resultados), cotacao.idades, desconto)
+    em_cache = _pdf_em_cache(request, chave)
+    if em_cache is not None:
+        return em_cache
+
+    return await _gerar_pdf(chave, [r["plano_id"] for r in resultados], resultados, cotacao.idades, desconto)
+
+
+@router.post("/cotacao/pdf")
+async def gerar_pdf_cotacao_endpoint(dados: cotacao_schema.CotacaoRequest, request: Request, db: AsyncSession = Depends(database.get_async_db)):
+    """
+    Endpoint para gerar PDF da cotação
+    """
+    if not dados.idades:
+        raise HTTPException(status_code=400, detail="Lista de idades vazia")
+
+    desconto = _normalizar_desconto(dados.desconto_percentual)
+
+    # Com o catálogo em memória, a chave sai das versões dos planos candidatos,
+    # antes de precificar: um PDF repetido não refaz nem a cotação
+    versoes = await catalogo.versoes_planos_async(db, dados, dados.plano_id)
+    if versoes is not None:
+        if dados.plano_id is not None and not versoes:
+            raise HTTPException(status_code=404, detail="Plano não encontrado para gerar PDF")
+        chave = chave_pdf(versoes, dados.idades, desconto)
+        em_cache = _pdf_em_cache(request, chave)
+        if em_cache is not None:
+            return em_cache
+
+    # Com plano_id, só esse plano é carregado e precificado
+    resultados = await catalogo.cotar_async(db, dados, dados.plano_id)
+
+    if dados.plano_id is not None and not resultados:
+        raise HTTPException(status_code=404, detail="Plano não encontrado para gerar PDF")
+
+    if versoes is None:
+        # Cache do catálogo desligado: sem versão por plano, a chave é o conteúdo
+        chave = chave_pdf(((r["plano_id"], digesto_resultado(r)) for r in resultados), dados.idades, desconto)
+        em_cache = _pdf_em_cache(request, chave)
+        if em_cache is not None:
+            return em_cache
+        plano_ids = [r["plano_id"] for r in resultados]
+    else:
+        plano_ids = [pid for pid, _ in versoes]
+
+    return await _gerar_pdf(chave, plano_ids, resultados, dados.idades, desconto)
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from typing import List, Optional
+from app.services.price_index import validar_faixas
 
 # --- OPERADORA ---
 class OperadoraBase(BaseModel):
@@ -101,6 +102,13 @@ class PlanoCreate(PlanoBase):
     coparticipacoes: List[CoparticipacaoCreate] = []
     municipios: List[MunicipioCreate] = []
 
+    @field_validator("faixas_preco")
+    @classmethod
+    def faixas_continuas(cls, faixas: List[FaixaPrecoCreate]) -> List[FaixaPrecoCreate]:
+        # Faixas válidas, sem sobreposição nem idade sem preço entre elas
+        validar_faixas(f.faixa_etaria for f in faixas)
+        return faixas
+
 class PlanoResponse(PlanoBase):
     id: int
     nome: str
@@ -119,6 +127,18 @@ class PlanoResponse(PlanoBase):
     class Config:
         from_attributes = True
 
+class PlanoResumo(BaseModel):
+    id: int
+    nome: str
+    operadora_id: Optional[int] = None
+    operadora: Optional[str] = None  # nome da operadora
+    tipo_contratacao: str
+    acomodacao: str
+    abrangencia: str
+    coparticipacao: bool
+    total_hospitais: int
+    total_municipios: int
+
 # --- SCHEMAS DE CÁLCULO/COTAÇÃO ---
 
 class CotacaoRequest(BaseModel):
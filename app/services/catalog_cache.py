@@ -0,0 +1,433 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Callable, Iterable, Optional, Union
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models import operadora_model, plano_model
+from app.models.catalogo_model import CatalogoAlteracao, CatalogoVersao
+from app.schemas import cotacao_schema
+from app.services.catalog_loader import carregar_planos, carregar_planos_cotacao
+from app.services.metricas import registro, serie
+from app.services.price_index import IndicePrecos, faixas_do_plano, indice_do_plano
+from app.services.rule_engine import MotorPrecos
+
+# Liga/desliga o cache do catálogo (com "0" toda cotação volta a consultar o banco)
+CACHE_ATIVO = os.getenv("CATALOGO_CACHE_ATIVO", "1") != "0"
+
+# De quantos em quantos segundos um worker confere se outro worker alterou o catálogo
+INTERVALO_VERIFICACAO = float(os.getenv("CATALOGO_INTERVALO_VERIFICACAO", "2"))
+
+
+class PlanoCatalogo:
+    """
+    Cópia imutável de um plano com tudo o que a cotação precisa: campos de
+    filtro, índice de preços pré-compilado e as coleções já serializadas.
+    """
+
+    __slots__ = (
+        "id", "operadora_id", "tipo_contratacao", "acomodacao", "abrangencia",
+        "elegibilidade", "coparticipacao", "indice", "versao", "dados",
+    )
+
+    def __init__(self, plano: plano_model.Plano, indice: IndicePrecos, versao: int):
+        self.id = plano.id
+        self.operadora_id = plano.operadora_id
+        self.tipo_contratacao = plano.tipo_contratacao
+        self.acomodacao = plano.acomodacao
+        self.abrangencia = plano.abrangencia
+        self.elegibilidade = plano.elegibilidade
+        self.coparticipacao = plano.coparticipacao
+        self.indice = indice
+        self.versao = versao
+
+        op = plano.operadora_rel
+        self.dados = {
+            "operadora": op.nome if op else "N/A",
+            "plano": plano.nome,
+            "imagem_coparticipacao_url": plano.imagem_coparticipacao_url,
+            "hospitais": [ {"id": h.id, "nome": h.nome, "endereco": h.endereco} for h in plano.hospitais],
+            "carencias": [ {"id": c.id, "descricao": c.descricao, "dias": c.dias} for c in plano.carencias],
+            "coparticipacoes": [ {"id": cp.id, "nome": cp.nome, "tipo_plano": cp.tipo_plano, "imagem_url": cp.imagem_url, "tipo_servico": cp.tipo_servico, "percentual": cp.percentual, "valor_minimo": cp.valor_minimo, "valor_maximo": cp.valor_maximo} for cp in plano.coparticipacoes],
+            "municipios": [ {"id": m.id, "nome": m.nome} for m in plano.municipios],
+            "rede_credenciada_url": op.rede_credenciada_url if op else None,
+        }
+
+    def atende(self, dados: cotacao_schema.CotacaoRequest) -> bool:
+        """Mesmos filtros de aplicar_filtros_cotacao (ilike 'valor%'), feitos em memória."""
+        if dados.operadora_id is not None and self.operadora_id != dados.operadora_id:
+            return False
+        for filtro, valor in (
+            (dados.tipo_contratacao, self.tipo_contratacao),
+            (dados.acomodacao, self.acomodacao),
+            (dados.abrangencia, self.abrangencia),
+        ):
+            if filtro and (valor is None or not valor.lower().startswith(filtro.lower())):
+                return False
+        if dados.elegibilidade is not None and self.elegibilidade != dados.elegibilidade:
+            return False
+        if dados.coparticipacao is not None and self.coparticipacao != dados.coparticipacao:
+            return False
+        return True
+
+    def cotar(self, idades: list[int]) -> Optional[dict]:
+        """
+        Precifica o plano para as idades informadas, um plano por vez.
+        Retorna None se alguma idade não tiver faixa de preço no plano.
+        O caminho normal é o MotorPrecos; este é usado para idades fora da tabela.
+        """
+        total_plano = 0.0
+        detalhes_beneficiarios = []
+
+        for idade in idades:
+            encontrado = self.indice.preco(idade)
+            if encontrado is None:
+                return None
+            faixa_encontrada, preco_encontrado = encontrado
+            total_plano += preco_encontrado
+            detalhes_beneficiarios.append({
+                "idade": idade,
+                "faixa_etaria_usada": faixa_encontrada,
+                "valor": preco_encontrado
+            })
+
+        return self.montar_resultado(total_plano, detalhes_beneficiarios)
+
+    def montar_resultado(self, total_plano: float, detalhes_beneficiarios: list[dict]) -> dict:
+        d = self.dados
+        return {
+            "plano_id": self.id,
+            "operadora": d["operadora"],
+            "plano": d["plano"],
+            "preco_total": round(total_plano, 2),
+            "beneficiarios": detalhes_beneficiarios,
+            "imagem_coparticipacao_url": d["imagem_coparticipacao_url"],
+            "hospitais": d["hospitais"],
+            "carencias": d["carencias"],
+            "coparticipacoes": d["coparticipacoes"],
+            "municipios": d["municipios"],
+            "rede_credenciada_url": d["rede_credenciada_url"],
+        }
+
+
+class CatalogoSnapshot:
+    """Fotografia do catálogo em uma versão. Nunca é alterada depois de criada."""
+
+    __slots__ = ("versao", "planos", "por_id", "operadoras", "_motor")
+
+    def __init__(self, versao: int, por_id: dict[int, PlanoCatalogo], operadoras: dict[int, dict]):
+        self.versao = versao
+        self.por_id = por_id
+        self.planos = tuple(por_id[k] for k in sorted(por_id))
+        self.operadoras = operadoras
+        self._motor: Optional[MotorPrecos] = None
+
+    @property
+    def motor(self) -> MotorPrecos:
+        """Matriz de preços do snapshot, montada no primeiro uso."""
+        if self._motor is None:
+            self._motor = MotorPrecos(self.planos)
+        return self._motor
+
+    def filtrar(self, dados: cotacao_schema.CotacaoRequest, plano_id: Optional[int] = None) -> list[PlanoCatalogo]:
+        if plano_id is not None:
+            plano = self.por_id.get(plano_id)
+            return [plano] if plano is not None and plano.atende(dados) else []
+        return [p for p in self.planos if p.atende(dados)]
+
+
+def _operadora_dict(op: operadora_model.Operadora) -> dict:
+    return {"id": op.id, "nome": op.nome, "rede_credenciada_url": op.rede_credenciada_url}
+
+
+class CatalogoCache:
+    """
+    Catálogo de operadoras e planos mantido em memória em cada worker.
+
+    A versão é o contador de catalogo_versao. As rotas de escrita gravam
+    uma linha em catalogo_alteracoes na mesma transação (registrar_alteracao),
+    marcada com a versão que ela criou, então qualquer worker descobre o que
+    mudou com um SELECT barato e recarrega só os planos afetados.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Rotas async: uma corrotina por vez recarrega; as outras esperam sem
+        # bloquear o event loop (o threading.Lock seria pego na mesma thread)
+        self._lock_async = asyncio.Lock()
+        self._snapshot: Optional[CatalogoSnapshot] = None
+        self._verificado_em = 0.0
+        self._verificar_ja = False
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.rebuilds = 0
+        self._ouvintes: list[Callable[[Optional[Iterable[int]]], None]] = []
+
+    def ao_alterar(self, ouvinte: Callable[[Optional[Iterable[int]]], None]) -> None:
+        """
+        Registra quem guarda dados derivados de planos (ex.: cache de PDF).
+        É chamado com os ids dos planos recarregados ou None quando o catálogo
+        inteiro foi recarregado.
+        """
+        self._ouvintes.append(ouvinte)
+
+    def _notificar(self, plano_ids: Optional[Iterable[int]]) -> None:
+        for ouvinte in self._ouvintes:
+            ouvinte(plano_ids)
+
+    # ----- leitura -----
+
+    def _snapshot_recente(self) -> Optional[CatalogoSnapshot]:
+        # Snapshot que ainda não precisa ser conferido contra catalogo_alteracoes
+        snap = self._snapshot
+        if snap is not None and not self._verificar_ja and time.monotonic() - self._verificado_em < INTERVALO_VERIFICACAO:
+            return snap
+        return None
+
+    def obter(self, db: Session) -> CatalogoSnapshot:
+        """Retorna o snapshot atual, recarregando o que tiver mudado."""
+        snap = self._snapshot_recente()
+        if snap is not None:
+            self.hits += 1
+            return snap
+
+        with self._lock:
+            snap = self._snapshot
+            if snap is None:
+                self.misses += 1
+                self._snapshot = self._carregar_tudo(db)
+                return self._snapshot
+
+            self._verificar_ja = False
+            self._verificado_em = time.monotonic()
+            alteracoes = db.execute(
+                select(CatalogoAlteracao.versao, CatalogoAlteracao.plano_id, CatalogoAlteracao.operadora_id)
+                .where(CatalogoAlteracao.versao > snap.versao)
+                .order_by(CatalogoAlteracao.versao)
+            ).all()
+            if not alteracoes:
+                self.hits += 1
+                return snap
+
+            self.reloads += 1
+            self._snapshot = self._aplicar_alteracoes(db, snap, alteracoes)
+            return self._snapshot
+
+    def cotar(self, db: Session, dados: cotacao_schema.CotacaoRequest, plano_id: Optional[int] = None) -> list[dict]:
+        """
+        Cota a família de `dados` contra os planos que atendem aos filtros, do
+        cache ou direto do banco se o cache estiver desligado. Com plano_id, só
+        esse plano é carregado e precificado.
+        """
+        if CACHE_ATIVO:
+            snap = self.obter(db)
+            return snap.motor.cotar(snap.filtrar(dados, plano_id), dados.idades)
+        planos = [PlanoCatalogo(p, indice_do_plano(p), 0) for p in carregar_planos_cotacao(db, dados, plano_id)]
+        return MotorPrecos(planos).cotar(planos, dados.idades)
+
+    def versoes_planos(self, db: Session, dados: cotacao_schema.CotacaoRequest, plano_id: Optional[int] = None) -> Optional[list[tuple[int, int]]]:
+        """
+        (id, versão) dos planos candidatos à cotação, sem precificar. Serve de
+        chave para o que é derivado da cotação (ex.: PDF). None com o cache
+        desligado, quando não há versão por plano.
+        """
+        if not CACHE_ATIVO:
+            return None
+        return [(p.id, p.versao) for p in self.obter(db).filtrar(dados, plano_id)]
+
+    def snapshot(self, db: Session) -> CatalogoSnapshot:
+        """
+        Snapshot para uso prolongado (ex.: cotação em lote): o do cache ou,
+        com o cache desligado, um carregado na hora só para quem pediu.
+        """
+        if CACHE_ATIVO:
+            return self.obter(db)
+        return self._carregar_tudo(db)
+
+    # ----- leitura (rotas async) -----
+
+    @staticmethod
+    async def _ler(db: AsyncSession, funcao: Callable, *args):
+        # Executa a leitura síncrona na conexão async e encerra a transação logo
+        # em seguida: a conexão volta ao pool antes de precificar e serializar.
+        # O snapshot guarda cópias, nada depende dos objetos da sessão.
+        try:
+            return await db.run_sync(funcao, *args)
+        finally:
+            await db.rollback()
+
+    async def obter_async(self, db: AsyncSession) -> CatalogoSnapshot:
+        """
+        Como obter, com AsyncSession. No caminho comum (snapshot recente) não
+        toca no banco; a conferência/recarga usa a mesma lógica síncrona via
+        run_sync, uma corrotina por vez.
+        """
+        snap = self._snapshot_recente()
+        if snap is not None:
+            self.hits += 1
+            return snap
+        async with self._lock_async:
+            return await self._ler(db, self.obter)
+
+    async def cotar_async(self, db: AsyncSession, dados: cotacao_schema.CotacaoRequest, plano_id: Optional[int] = None) -> list[dict]:
+        if CACHE_ATIVO:
+            snap = await self.obter_async(db)
+            return snap.motor.cotar(snap.filtrar(dados, plano_id), dados.idades)
+        return await self._ler(db, self.cotar, dados, plano_id)
+
+    async def versoes_planos_async(self, db: AsyncSession, dados: cotacao_schema.CotacaoRequest, plano_id: Optional[int] = None) -> Optional[list[tuple[int, int]]]:
+        if not CACHE_ATIVO:
+            return None
+        return [(p.id, p.versao) for p in (await self.obter_async(db)).filtrar(dados, plano_id)]
+
+    async def snapshot_async(self, db: AsyncSession) -> CatalogoSnapshot:
+        if CACHE_ATIVO:
+            return await self.obter_async(db)
+        return await self._ler(db, self._carregar_tudo)
+
+    async def versao_async(self, db: AsyncSession) -> int:
+        """
+        Versão atual do catálogo (contador de catalogo_versao), para ETags.
+        Vem do snapshot enquanto ele não precisa ser conferido; senão é um
+        único SELECT do contador, sem carregar nem recarregar planos.
+        """
+        snap = self._snapshot_recente() if CACHE_ATIVO else None
+        if snap is not None:
+            return snap.versao
+        return (await db.scalar(_VERSAO_ATUAL)) or 0
+
+    async def reconstruir_async(self, db: AsyncSession) -> CatalogoSnapshot:
+        async with self._lock_async:
+            return await self._ler(db, self.reconstruir)
+
+    # ----- invalidação -----
+
+    def marcar_alterado(self) -> None:
+        """Força a conferência de catalogo_alteracoes no próximo acesso."""
+        self._verificar_ja = True
+
+    def reconstruir(self, db: Session) -> CatalogoSnapshot:
+        """Descarta o snapshot e carrega o catálogo inteiro de novo."""
+        with self._lock:
+            self.rebuilds += 1
+            # A carga completa já vê as alterações pendentes; uma escrita
+            # durante a carga marca de novo
+            self._verificar_ja = False
+            self._snapshot = self._carregar_tudo(db)
+            self._notificar(None)
+            return self._snapshot
+
+    def estatisticas(self) -> dict:
+        snap = self._snapshot
+        total = self.hits + self.misses + self.reloads
+        return {
+            "ativo": CACHE_ATIVO,
+            "versao": snap.versao if snap else None,
+            "planos": len(snap.planos) if snap else 0,
+            "operadoras": len(snap.operadoras) if snap else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+            "rebuilds": self.rebuilds,
+            "hit_ratio": round(self.hits / total, 4) if total else None,
+        }
+
+    # ----- carga -----
+
+    def _carregar_tudo(self, db: Session) -> CatalogoSnapshot:
+        # A versão é lida antes dos dados: o que for gravado durante a carga
+        # aparece de novo na próxima verificação, no pior caso recarregado duas vezes.
+        versao = db.execute(_VERSAO_ATUAL).scalar() or 0
+        planos = carregar_planos(db.query(plano_model.Plano))
+        por_id = {p.id: PlanoCatalogo(p, IndicePrecos(faixas_do_plano(p)), versao) for p in planos}
+        operadoras = {op.id: _operadora_dict(op) for op in db.query(operadora_model.Operadora).all()}
+        self._verificado_em = time.monotonic()
+        return CatalogoSnapshot(versao, por_id, operadoras)
+
+    def _aplicar_alteracoes(self, db: Session, snap: CatalogoSnapshot, alteracoes) -> CatalogoSnapshot:
+        versao = alteracoes[-1].versao
+        plano_ids = {a.plano_id for a in alteracoes if a.plano_id is not None}
+        operadora_ids = {a.operadora_id for a in alteracoes if a.operadora_id is not None}
+        if any(a.plano_id is None and a.operadora_id is None for a in alteracoes):
+            self._notificar(None)
+            return self._carregar_tudo(db)
+
+        por_id = dict(snap.por_id)
+        operadoras = dict(snap.operadoras)
+
+        # Planos removidos (ou que trocaram de operadora) somem e voltam na recarga
+        for pid in plano_ids:
+            por_id.pop(pid, None)
+        for pid, p in snap.por_id.items():
+            if p.operadora_id in operadora_ids:
+                por_id.pop(pid, None)
+        alterados = set(plano_ids) | (snap.por_id.keys() - por_id.keys())
+
+        query = db.query(plano_model.Plano)
+        if plano_ids and operadora_ids:
+            query = query.filter(plano_model.Plano.id.in_(plano_ids) | plano_model.Plano.operadora_id.in_(operadora_ids))
+        elif plano_ids:
+            query = query.filter(plano_model.Plano.id.in_(plano_ids))
+        else:
+            query = query.filter(plano_model.Plano.operadora_id.in_(operadora_ids))
+        for p in carregar_planos(query):
+            por_id[p.id] = PlanoCatalogo(p, IndicePrecos(faixas_do_plano(p)), versao)
+            alterados.add(p.id)
+        self._notificar(alterados)
+
+        if operadora_ids:
+            for oid in operadora_ids:
+                operadoras.pop(oid, None)
+            for op in db.query(operadora_model.Operadora).filter(operadora_model.Operadora.id.in_(operadora_ids)).all():
+                operadoras[op.id] = _operadora_dict(op)
+
+        return CatalogoSnapshot(versao, por_id, operadoras)
+
+
+_VERSAO_ATUAL = select(CatalogoVersao.versao).where(CatalogoVersao.id == 1)
+
+
+def registrar_alteracao(db: Union[Session, AsyncSession], plano_id: Optional[int] = None, operadora_id: Optional[int] = None) -> None:
+    """
+    Registra uma alteração do catálogo na transação corrente.
+    Deve ser chamada antes do commit da escrita correspondente.
+    """
+    db.add(CatalogoAlteracao(plano_id=plano_id, operadora_id=operadora_id))
+
+
+@event.listens_for(Session, "before_flush")
+def _numerar_alteracoes(session: Session, flush_context, instances) -> None:
+    # Um incremento do contador por flush com alterações novas, na transação da
+    # escrita: o lock da linha segura a próxima escrita até este commit, então
+    # uma versão só fica visível depois de todas as anteriores. Com o id da
+    # sequência (entregue no INSERT) um worker podia ver a 11 antes da 10 e
+    # nunca aplicar a 10.
+    novas = [obj for obj in session.new if isinstance(obj, CatalogoAlteracao)]
+    if not novas:
+        return
+    tabela = CatalogoVersao.__table__
+    versao = session.connection().execute(
+        update(tabela).where(tabela.c.id == 1).values(versao=tabela.c.versao + 1).returning(tabela.c.versao)
+    ).scalar_one()
+    for alteracao in novas:
+        alteracao.versao = versao
+
+
+# Instância única por processo (worker)
+catalogo = CatalogoCache()
+
+
+@registro.coletor
+def _metricas_catalogo():
+    est = catalogo.estatisticas()
+    return (
+        serie("catalogo_cache_consultas_total", "counter", "Acessos ao catálogo em memória por resultado.",
+              [({"resultado": r}, est[r]) for r in ("hits", "misses", "reloads")])
+        + serie("catalogo_cache_hit_ratio", "gauge", "Fração dos acessos ao catálogo atendidos sem ir ao banco.",
+                [({}, est["hit_ratio"])])
+        + serie("catalogo_versao", "gauge", "Versão (contador de catalogo_versao) do catálogo em memória.", [({}, est["versao"])])
+        + serie("catalogo_planos", "gauge", "Planos no catálogo em memória.", [({}, est["planos"])])
+    )
@@ -0,0 +1,220 @@
+from typing import Optional
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query, Session, joinedload, selectinload
+from app.models import plano_model, operadora_model, faixa_preco_model, hospital_model, carencia_model, coparticipacao_model
+from app.schemas import cotacao_schema
+
+# Colunas de planos que a listagem aceita em fields= (o id vem sempre)
+CAMPOS_LISTAGEM = (
+    "id", "nome", "operadora_id", "tipo_contratacao", "acomodacao", "abrangencia",
+    "coparticipacao", "elegibilidade", "imagem_coparticipacao_url",
+)
+
+# Coleções aceitas em include= e as colunas devolvidas (as mesmas do PlanoResponse)
+COLECOES_LISTAGEM = {
+    "faixas": (faixa_preco_model.FaixaPreco, ("faixa_etaria", "valor")),
+    "hospitais": (hospital_model.Hospital, ("id", "nome", "endereco")),
+    "carencias": (carencia_model.Carencia, ("id", "descricao", "dias")),
+    "coparticipacoes": (coparticipacao_model.Coparticipacao, (
+        "id", "nome", "tipo_plano", "imagem_url", "tipo_servico", "percentual", "valor_minimo", "valor_maximo",
+    )),
+    "municipios": (hospital_model.Municipio, ("id", "nome")),
+}
+
+# include=operadora traz {id, nome, rede_credenciada_url} da operadora do plano
+INCLUIR_OPERADORA = "operadora"
+
+
+def opcoes_grafo_plano() -> tuple:
+    """
+    Opções de carregamento do grafo completo do plano.
+
+    A operadora (muitos-para-um) vem no mesmo SELECT via JOIN, sem multiplicar
+    linhas. Cada coleção filha é buscada em um SELECT próprio com
+    "WHERE plano_id IN (...)", então o número de linhas retornadas é a soma
+    das coleções, e não o produto faixas × hospitais × carências × ... como
+    acontecia com vários joinedload encadeados.
+    """
+    return (
+        joinedload(plano_model.Plano.operadora_rel),
+        selectinload(plano_model.Plano.faixas),
+        selectinload(plano_model.Plano.hospitais),
+        selectinload(plano_model.Plano.carencias),
+        selectinload(plano_model.Plano.coparticipacoes),
+        selectinload(plano_model.Plano.municipios),
+    )
+
+
+def filtros_cotacao(dados: cotacao_schema.CotacaoRequest, plano_id: Optional[int] = None) -> list:
+    """Condições sobre planos dos filtros de uma CotacaoRequest (e, se informado, do plano_id)."""
+    Plano = plano_model.Plano
+    condicoes = []
+    if plano_id is not None:
+        condicoes.append(Plano.id == plano_id)
+    if dados.operadora_id is not None:
+        condicoes.append(Plano.operadora_id == dados.operadora_id)
+    if dados.tipo_contratacao:
+        condicoes.append(Plano.tipo_contratacao.ilike(f"{dados.tipo_contratacao}%"))
+    if dados.acomodacao:
+        condicoes.append(Plano.acomodacao.ilike(f"{dados.acomodacao}%"))
+    if dados.abrangencia:
+        condicoes.append(Plano.abrangencia.ilike(f"{dados.abrangencia}%"))
+    if dados.elegibilidade is not None:
+        condicoes.append(Plano.elegibilidade == dados.elegibilidade)
+    if dados.coparticipacao is not None:
+        condicoes.append(Plano.coparticipacao == dados.coparticipacao)
+    return condicoes
+
+
+def aplicar_filtros_cotacao(query: Query, dados: cotacao_schema.CotacaoRequest, plano_id: Optional[int] = None) -> Query:
+    """Aplica os filtros de uma CotacaoRequest (e, se informado, o plano_id) à query de planos."""
+    condicoes = filtros_cotacao(dados, plano_id)
+    return query.filter(*condicoes) if condicoes else query
+
+
+def carregar_planos(query: Query) -> list[plano_model.Plano]:
+    """Executa a query de planos carregando o grafo completo (ordenado por id)."""
+    return query.options(*opcoes_grafo_plano()).order_by(plano_model.Plano.id).all()
+
+
+def carregar_planos_cotacao(db: Session, dados: cotacao_schema.CotacaoRequest, plano_id: Optional[int] = None) -> list[plano_model.Plano]:
+    """Planos candidatos a uma cotação, com todas as coleções carregadas."""
+    return carregar_planos(aplicar_filtros_cotacao(db.query(plano_model.Plano), dados, plano_id))
+
+
+def _filtrar_listagem(stmt: Select, nome: Optional[str], operadora_id: Optional[int], after_id: Optional[int], limite: Optional[int]) -> Select:
+    # Paginação por chave (id > after_id): o custo de uma página não depende
+    # de quantas vieram antes, ao contrário de OFFSET
+    if nome:
+        stmt = stmt.where(plano_model.Plano.nome.ilike(f"%{nome}%"))
+    if operadora_id:
+        stmt = stmt.where(plano_model.Plano.operadora_id == operadora_id)
+    if after_id is not None:
+        stmt = stmt.where(plano_model.Plano.id > after_id)
+    stmt = stmt.order_by(plano_model.Plano.id)
+    return stmt.limit(limite) if limite is not None else stmt
+
+
+def consulta_planos_listagem(nome: Optional[str] = None, operadora_id: Optional[int] = None, after_id: Optional[int] = None, limite: Optional[int] = None) -> Select:
+    """SELECT da listagem do admin (grafo completo, ordenado por id), para Session ou AsyncSession."""
+    return _filtrar_listagem(select(plano_model.Plano).options(*opcoes_grafo_plano()), nome, operadora_id, after_id, limite)
+
+
+def carregar_planos_listagem(db: Session, nome: Optional[str] = None, operadora_id: Optional[int] = None) -> list[plano_model.Plano]:
+    """Planos para a listagem do admin, com todas as coleções carregadas."""
+    return list(db.scalars(consulta_planos_listagem(nome, operadora_id)).unique())
+
+
+async def carregar_planos_listagem_async(db: AsyncSession, nome: Optional[str] = None, operadora_id: Optional[int] = None, after_id: Optional[int] = None, limite: Optional[int] = None) -> list[plano_model.Plano]:
+    """Como carregar_planos_listagem, com AsyncSession: nada fica para lazy load."""
+    return list((await db.scalars(consulta_planos_listagem(nome, operadora_id, after_id, limite))).unique())
+
+
+async def carregar_planos_campos_async(
+    db: AsyncSession,
+    campos: tuple[str, ...],
+    incluir: tuple[str, ...],
+    nome: Optional[str] = None,
+    operadora_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    limite: Optional[int] = None,
+) -> list[dict]:
+    """
+    Listagem enxuta: só as colunas de `campos` dos planos e só as coleções
+    de `incluir`, cada uma num SELECT "WHERE plano_id IN (ids da página)"
+    com as colunas da resposta. Nada é carregado pelo ORM; o que não foi
+    pedido não é lido do banco.
+    """
+    tabela = plano_model.Plano.__table__
+    colunas = ("id", *(c for c in campos if c != "id"))
+    if INCLUIR_OPERADORA in incluir and "operadora_id" not in colunas:
+        colunas += ("operadora_id",)
+    linhas = (await db.execute(
+        _filtrar_listagem(select(*(tabela.c[c] for c in colunas)), nome, operadora_id, after_id, limite)
+    )).mappings().all()
+    planos = [{c: linha[c] for c in colunas} for linha in linhas]
+    if not planos:
+        return planos
+
+    por_id = {p["id"]: p for p in planos}
+    for colecao in incluir:
+        if colecao == INCLUIR_OPERADORA:
+            continue
+        modelo, colunas_colecao = COLECOES_LISTAGEM[colecao]
+        filha = modelo.__table__
+        for plano in planos:
+            plano[colecao] = []
+        stmt = (
+            select(filha.c.plano_id, *(filha.c[c] for c in colunas_colecao))
+            .where(filha.c.plano_id.in_(por_id))
+            .order_by(filha.c.plano_id, filha.c.id)
+        )
+        for linha in (await db.execute(stmt)).mappings():
+            por_id[linha["plano_id"]][colecao].append({c: linha[c] for c in colunas_colecao})
+
+    if INCLUIR_OPERADORA in incluir:
+        op = operadora_model.Operadora.__table__
+        ids = {p["operadora_id"] for p in planos if p["operadora_id"] is not None}
+        operadoras = {linha["id"]: dict(linha) for linha in (await db.execute(
+            select(op.c.id, op.c.nome, op.c.rede_credenciada_url).where(op.c.id.in_(ids))
+        )).mappings()} if ids else {}
+        for plano in planos:
+            plano[INCLUIR_OPERADORA] = operadoras.get(plano["operadora_id"])
+        if "operadora_id" not in campos:
+            for plano in planos:
+                del plano["operadora_id"]
+    return planos
+
+
+async def carregar_plano_async(db: AsyncSession, plano_id: int) -> Optional[plano_model.Plano]:
+    """Um plano com o grafo completo (populate_existing: recarrega coleções já na sessão)."""
+    stmt = (
+        select(plano_model.Plano)
+        .where(plano_model.Plano.id == plano_id)
+        .options(*opcoes_grafo_plano())
+        .execution_options(populate_existing=True)
+    )
+    return (await db.scalars(stmt)).unique().first()
+
+
+async def carregar_planos_por_ids_async(db: AsyncSession, plano_ids: list[int]) -> list[plano_model.Plano]:
+    """Vários planos pelo id, com o grafo completo, ordenados por id."""
+    stmt = (
+        select(plano_model.Plano)
+        .where(plano_model.Plano.id.in_(plano_ids))
+        .options(*opcoes_grafo_plano())
+        .order_by(plano_model.Plano.id)
+    )
+    return list((await db.scalars(stmt)).unique())
+
+
+async def carregar_resumo_planos_async(
+    db: AsyncSession,
+    nome: Optional[str] = None,
+    operadora_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    limite: Optional[int] = None,
+) -> list[dict]:
+    """
+    Resumo dos planos para listas do admin num único SELECT: colunas do
+    plano, nome da operadora e totais de hospitais e municípios (contagens
+    correlacionadas, feitas só para os planos da página pelo índice de
+    plano_id). Devolve dicts, sem objetos do ORM.
+    """
+    plano = plano_model.Plano.__table__
+    operadora = operadora_model.Operadora.__table__
+    hospitais, municipios = (
+        select(func.count()).where(modelo.__table__.c.plano_id == plano.c.id).scalar_subquery()
+        for modelo in (hospital_model.Hospital, hospital_model.Municipio)
+    )
+    stmt = (
+        select(
+            plano.c.id, plano.c.nome, plano.c.operadora_id, operadora.c.nome.label("operadora"),
+            plano.c.tipo_contratacao, plano.c.acomodacao, plano.c.abrangencia, plano.c.coparticipacao,
+            hospitais.label("total_hospitais"),
+            municipios.label("total_municipios"),
+        )
+        .select_from(plano.outerjoin(operadora, operadora.c.id == plano.c.operadora_id))
+    )
+    return [dict(linha) for linha in (await db.execute(_filtrar_listagem(stmt, nome, operadora_id, after_id, limite))).mappings()]
@@ -0,0 +1,174 @@
+import os
+import zlib
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele, só gzip
+    brotli = None
+
+# Liga/desliga a compressão das respostas
+COMPRESSAO_ATIVA = os.getenv("COMPRESSAO_ATIVA", "1") != "0"
+
+# Respostas menores que isso vão sem compressão (não compensa o custo)
+COMPRESSAO_MIN_BYTES = int(os.getenv("COMPRESSAO_MIN_BYTES", "1024"))
+
+# PDFs do reportlab já saem comprimidos: por padrão vão como estão
+COMPRESSAO_PDF = os.getenv("COMPRESSAO_PDF", "0") != "0"
+
+NIVEL_GZIP = int(os.getenv("COMPRESSAO_NIVEL_GZIP", "6"))
+QUALIDADE_BROTLI = int(os.getenv("COMPRESSAO_QUALIDADE_BROTLI", "4"))
+
+TIPOS_COMPRIMIVEIS = ("application/json", "application/x-ndjson", "text/csv", "text/plain", "text/html")
+TIPO_PDF = "application/pdf"
+
+# Sufixo que a compressão põe no ETag (a representação muda, o ETag forte também)
+SUFIXOS_ETAG = ("-gzip", "-br")
+
+
+def escolher_codificacao(accept_encoding: str) -> Optional[str]:
+    """
+    "br" ou "gzip" conforme o Accept-Encoding do cliente (com q-values e
+    "*"); br só com o pacote brotli instalado e, no empate, preferido.
+    None se o cliente não aceita nenhuma das duas.
+    """
+    aceitas = {}
+    for parte in accept_encoding.split(","):
+        nome, _, parametros = parte.partition(";")
+        nome = nome.strip().lower()
+        if not nome:
+            continue
+        q = 1.0
+        parametros = parametros.strip().replace(" ", "")
+        if parametros.startswith("q="):
+            try:
+                q = float(parametros[2:])
+            except ValueError:
+                q = 0.0
+        aceitas[nome] = q
+
+    melhor, melhor_q = None, 0.0
+    for codificacao in (("br",) if brotli is not None else ()) + ("gzip",):
+        q = aceitas.get(codificacao, aceitas.get("*", 0.0))
+        if q > melhor_q:
+            melhor, melhor_q = codificacao, q
+    return melhor
+
+
+def etag_sem_codificacao(etag: str) -> str:
+    """'"abc-gzip"' -> '"abc"': o ETag da representação sem compressão."""
+    for sufixo in SUFIXOS_ETAG:
+        if etag.endswith(sufixo + '"'):
+            return etag[: -len(sufixo) - 1] + '"'
+    return etag
+
+
+def _etag_codificado(etag: str, codificacao: str) -> str:
+    return etag[:-1] + f'-{codificacao}"' if etag.endswith('"') else etag
+
+
+class _Gzip:
+    def __init__(self):
+        # wbits=31: formato gzip (cabeçalho e CRC), não zlib cru
+        self._z = zlib.compressobj(NIVEL_GZIP, zlib.DEFLATED, 31)
+
+    def comprimir(self, dados: bytes) -> bytes:
+        # Z_SYNC_FLUSH: cada pedaço de um streaming chega ao cliente na hora
+        return self._z.compress(dados) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def terminar(self, dados: bytes = b"") -> bytes:
+        return self._z.compress(dados) + self._z.flush()
+
+
+class _Brotli:
+    def __init__(self):
+        self._b = brotli.Compressor(quality=QUALIDADE_BROTLI)
+
+    def comprimir(self, dados: bytes) -> bytes:
+        return self._b.process(dados) + self._b.flush()
+
+    def terminar(self, dados: bytes = b"") -> bytes:
+        return self._b.process(dados) + self._b.finish()
+
+
+_COMPRESSORES = {"gzip": _Gzip, "br": _Brotli}
+
+
+def _comprimivel(status: int, headers: Headers) -> bool:
+    if status < 200 or status in (204, 304) or "content-encoding" in headers:
+        return False
+    tipo = headers.get("content-type", "").split(";")[0].strip().lower()
+    return tipo in TIPOS_COMPRIMIVEIS or (COMPRESSAO_PDF and tipo == TIPO_PDF)
+
+
+class MiddlewareCompressao:
+    """
+    Middleware ASGI puro que comprime (br ou gzip, negociado pelo
+    Accept-Encoding) as respostas JSON/NDJSON/CSV a partir de
+    COMPRESSAO_MIN_BYTES. Respostas em streaming são comprimidas pedaço a
+    pedaço, sem bufferizar; PDFs só com COMPRESSAO_PDF=1.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        cabecalhos = Headers(scope=scope)
+        codificacao = escolher_codificacao(cabecalhos.get("accept-encoding", ""))
+        if codificacao is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = None
+        compressor = None
+        decidido = False
+
+        async def enviar(mensagem):
+            nonlocal inicio, compressor, decidido
+            if mensagem["type"] == "http.response.start":
+                # Segura o início até ver o primeiro pedaço do corpo
+                inicio = mensagem
+                return
+            if mensagem["type"] != "http.response.body" or (decidido and compressor is None):
+                await send(mensagem)
+                return
+
+            corpo = mensagem.get("body", b"")
+            mais = mensagem.get("more_body", False)
+            if not decidido:
+                decidido = True
+                headers = MutableHeaders(raw=inicio["headers"])
+                if inicio["status"] == 304 and "etag" in headers:
+                    # O 304 leva o ETag da versão comprimida se é ela que o cliente tem
+                    comprimido = _etag_codificado(headers["etag"], codificacao)
+                    if comprimido in cabecalhos.get("if-none-match", ""):
+                        headers["etag"] = comprimido
+                        headers.add_vary_header("Accept-Encoding")
+                if not _comprimivel(inicio["status"], headers) or (not mais and len(corpo) < COMPRESSAO_MIN_BYTES):
+                    await send(inicio)
+                    await send(mensagem)
+                    return
+                compressor = _COMPRESSORES[codificacao]()
+                headers["content-encoding"] = codificacao
+                headers.add_vary_header("Accept-Encoding")
+                if "etag" in headers:
+                    headers["etag"] = _etag_codificado(headers["etag"], codificacao)
+                if mais:
+                    # Tamanho final desconhecido: vai em chunked
+                    del headers["content-length"]
+                else:
+                    corpo = compressor.terminar(corpo)
+                    headers["content-length"] = str(len(corpo))
+                    await send(inicio)
+                    await send({"type": "http.response.body", "body": corpo})
+                    return
+                await send(inicio)
+
+            saida = compressor.comprimir(corpo) if mais else compressor.terminar(corpo)
+            await send({"type": "http.response.body", "body": saida, "more_body": mais})
+
+        await self.app(scope, receive, enviar)
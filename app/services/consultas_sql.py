@@ -0,0 +1,206 @@
+import logging
+import re
+import time
+import weakref
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+if settings.db_debug and not logger.handlers:
+    # Sem configuração de logging o Python só mostra WARNING: em debug o
+    # resumo de cada requisição (INFO) também vai para o stderr
+    logger.addHandler(logging.StreamHandler())
+    logger.setLevel(logging.INFO)
+
+# Liga o middleware quando há algo a fazer com os números
+CONTAGEM_ATIVA = settings.db_debug or settings.db_alerta_repeticoes > 0
+
+# Placeholders dos drivers (?, %(nome)s, $1) e listas de IN expandidas
+_PARAMETRO = re.compile(r"%\(\w+\)s|\$\d+")
+_LISTA = re.compile(r"\?(?:\s*,\s*\?)+")
+
+
+def formato_sql(statement: str) -> str:
+    """SQL sem a parte que muda entre execuções: placeholders e tamanho das listas de IN."""
+    return _LISTA.sub("?", _PARAMETRO.sub("?", statement))
+
+
+class ContadorSQL:
+    """
+    Statements, linhas e tempo de banco de uma requisição. Linhas lidas são
+    as buscadas do cursor; escritas, os conjuntos de parâmetros de um INSERT
+    e o rowcount de UPDATE/DELETE.
+    """
+
+    __slots__ = ("consultas", "linhas", "escritas", "tempo", "formatos", "_lotes")
+
+    def __init__(self):
+        self.consultas = 0
+        self.linhas = 0
+        self.escritas = 0
+        self.tempo = 0.0
+        self.formatos: dict[str, int] = {}
+        # Execuções já registradas: um INSERT em lote (insertmanyvalues) passa
+        # pelo cursor uma vez por pedaço, mas é uma execução só
+        self._lotes = weakref.WeakSet()
+
+    def registrar(self, statement: str, duracao: float, context, cursor) -> None:
+        self.consultas += 1
+        self.tempo += duracao
+        if context in self._lotes:
+            return
+        self._lotes.add(context)
+        self.formatos[statement] = self.formatos.get(statement, 0) + 1
+        if context.isinsert:
+            # O rowcount de INSERT ... RETURNING só fica certo depois do fetch
+            self.escritas += len(context.compiled_parameters or ()) or max(cursor.rowcount, 0)
+        elif (context.isupdate or context.isdelete) and cursor.description is not None:
+            # UPDATE/DELETE ... RETURNING: como no INSERT, o rowcount do SQLite
+            # só fica certo depois do fetch; conta as linhas devolvidas
+            context.cursor = _CursorContado(context.cursor, self, "escritas")
+        elif context.isupdate or context.isdelete:
+            # No executemany o rowcount já é a soma das execuções
+            self.escritas += max(cursor.rowcount, 0)
+        elif cursor.description is not None:
+            # Leituras: o rowcount é -1 no SQLite; conta o que for buscado
+            context.cursor = _CursorContado(context.cursor, self)
+
+    def repetidos(self, minimo: int) -> list[tuple[str, int]]:
+        """Formatos de SQL executados `minimo` vezes ou mais, do mais repetido ao menos."""
+        contagem: dict[str, int] = {}
+        for statement, n in self.formatos.items():
+            formato = formato_sql(statement)
+            contagem[formato] = contagem.get(formato, 0) + n
+        return sorted(((f, n) for f, n in contagem.items() if n >= minimo), key=lambda item: -item[1])
+
+    def cabecalhos(self) -> list[tuple[bytes, bytes]]:
+        return [
+            (b"x-db-queries", str(self.consultas).encode()),
+            (b"x-db-rows", str(self.linhas).encode()),
+            (b"x-db-rows-written", str(self.escritas).encode()),
+            (b"x-db-time-ms", f"{self.tempo * 1000:.2f}".encode()),
+        ]
+
+
+class _CursorContado:
+    """
+    Cursor do driver que soma ao ContadorSQL as linhas devolvidas pelos
+    fetch*, em `linhas` (leituras) ou `escritas` (UPDATE/DELETE ... RETURNING).
+    """
+
+    __slots__ = ("_cursor", "_contador", "_campo")
+
+    def __init__(self, cursor, contador: ContadorSQL, campo: str = "linhas"):
+        self._cursor = cursor
+        self._contador = contador
+        self._campo = campo
+
+    def _somar(self, n: int) -> None:
+        setattr(self._contador, self._campo, getattr(self._contador, self._campo) + n)
+
+    def fetchone(self):
+        linha = self._cursor.fetchone()
+        if linha is not None:
+            self._somar(1)
+        return linha
+
+    def fetchmany(self, *args, **kwargs):
+        linhas = self._cursor.fetchmany(*args, **kwargs)
+        self._somar(len(linhas))
+        return linhas
+
+    def fetchall(self):
+        linhas = self._cursor.fetchall()
+        self._somar(len(linhas))
+        return linhas
+
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome)
+
+
+# Contador da requisição corrente. O SQLAlchemy propaga o contexto para o
+# greenlet das sessões async e o run_in_threadpool para a thread, então os
+# eventos do engine enxergam o mesmo objeto que o middleware criou.
+_contador: ContextVar[Optional[ContadorSQL]] = ContextVar("contador_sql", default=None)
+
+
+def contador_atual() -> Optional[ContadorSQL]:
+    return _contador.get()
+
+
+# Valem para todos os engines (o async executa pelo sync_engine dele)
+@event.listens_for(Engine, "before_cursor_execute")
+def _antes(conn, cursor, statement, parameters, context, executemany):
+    if _contador.get() is not None:
+        conn.info.setdefault("inicio_sql", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _depois(conn, cursor, statement, parameters, context, executemany):
+    contador = _contador.get()
+    if contador is None:
+        return
+    inicios = conn.info.get("inicio_sql")
+    if not inicios:
+        return
+    contador.registrar(statement, time.perf_counter() - inicios.pop(), context, cursor)
+
+
+@event.listens_for(Engine, "handle_error")
+def _erro(contexto):
+    # Statement que falhou não passa pelo after_cursor_execute
+    conexao = contexto.connection
+    if conexao is not None and conexao.info.get("inicio_sql"):
+        conexao.info["inicio_sql"].pop()
+
+
+class MiddlewareConsultasSQL:
+    """
+    Middleware ASGI que abre um ContadorSQL por requisição. Com DB_DEBUG põe
+    os números nos cabeçalhos X-DB-* (o que foi executado até o início da
+    resposta) e registra o total no log ao fim; com DB_ALERTA_REPETICOES
+    avisa quando a rota repetiu o mesmo SQL esse número de vezes.
+    """
+
+    def __init__(self, app, debug: bool = settings.db_debug, alerta_repeticoes: int = settings.db_alerta_repeticoes):
+        self.app = app
+        self.debug = debug
+        self.alerta_repeticoes = alerta_repeticoes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        contador = ContadorSQL()
+        status = 500
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+                if self.debug:
+                    mensagem["headers"] = list(mensagem.get("headers", [])) + contador.cabecalhos()
+            await send(mensagem)
+
+        token = _contador.set(contador)
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _contador.reset(token)
+            self._registrar(scope, status, contador)
+
+    def _registrar(self, scope, status: int, contador: ContadorSQL) -> None:
+        if not contador.consultas:
+            return
+        rota = getattr(scope.get("route"), "path", None) or scope["path"]
+        requisicao = f"{scope['method']} {rota}"
+        if self.debug:
+            logger.info("%s %s: %d consultas, %d linhas lidas, %d escritas, %.2f ms de banco",
+                        requisicao, status, contador.consultas, contador.linhas, contador.escritas, contador.tempo * 1000)
+        if self.alerta_repeticoes > 0:
+            for formato, n in contador.repetidos(self.alerta_repeticoes):
+                logger.warning("%s executou o mesmo SQL %d vezes (N+1?): %s", requisicao, n, " ".join(formato.split()))
@@ -0,0 +1,189 @@
+import logging
+import os
+from itertools import groupby
+from typing import Optional
+from sqlalchemy import ARRAY, CompoundSelect, Float, Integer, and_, bindparam, cast, func, literal, null, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import faixa_preco_model, operadora_model, plano_model
+from app.schemas import cotacao_schema
+from app.services.catalog_cache import catalogo
+from app.services.catalog_loader import COLECOES_LISTAGEM, filtros_cotacao
+from app.services.metricas import planos_retornados
+from app.services.price_index import parse_faixa
+
+logger = logging.getLogger(__name__)
+
+# Cotação agregada no banco (faixas × idades, GROUP BY plano) em vez do
+# MotorPrecos sobre o catálogo em memória. Mesmo resultado, outro custo:
+# nada do catálogo fica no worker, e só os planos precificados voltam do banco
+COTACAO_SQL = os.getenv("COTACAO_SQL", "0") != "0"
+
+# Coleções (hospitais, carências, ...) só dos N planos mais baratos; os demais
+# voltam com preço e listas vazias. 0: de todos, como no catálogo em memória
+COLECOES_MAX = int(os.getenv("COTACAO_SQL_COLECOES_MAX", "0"))
+
+# Coleções de cada plano cotado, na ordem e no formato do PlanoCatalogo.dados
+COLECOES_COTACAO = ("hospitais", "carencias", "coparticipacoes", "municipios")
+
+
+def _tabela_idades(dialeto: str, idades: list[int]):
+    """(pos, idade) de cada beneficiário, na ordem da família, como tabela."""
+    if dialeto == "postgresql":
+        # Um único parâmetro array: o SQL é o mesmo para qualquer tamanho de família
+        return (
+            func.unnest(bindparam("idades", idades, type_=ARRAY(Integer)))
+            .table_valued("idade", with_ordinality="pos")
+            .render_derived(name="idades")
+        )
+    # Sem arrays (SQLite): uma linha por pessoa num UNION ALL
+    return union_all(*(
+        select(literal(pos, Integer).label("pos"), literal(idade, Integer).label("idade"))
+        for pos, idade in enumerate(idades, 1)
+    )).subquery("idades")
+
+
+def consulta_precos(dialeto: str, dados: cotacao_schema.CotacaoRequest, plano_id: Optional[int] = None) -> CompoundSelect:
+    """
+    (plano_id, pos, faixa_etaria, valor) de cada pessoa da família, só dos
+    planos que atendem aos filtros e têm faixa para todas as idades,
+    ordenado por plano e pessoa. Junto, com pos e valor nulos, as faixas
+    dos planos candidatos ainda sem idade_min/idade_max.
+    """
+    Faixa = faixa_preco_model.FaixaPreco
+    Plano = plano_model.Plano
+    idades = _tabela_idades(dialeto, dados.idades)
+
+    # Faixas que contêm a idade de cada pessoa. Com faixas sobrepostas (só em
+    # dados anteriores à validação) vence a primeira, como no IndicePrecos
+    casadas = (
+        select(
+            Faixa.plano_id, idades.c.pos, Faixa.faixa_etaria, Faixa.valor,
+            func.row_number().over(partition_by=(Faixa.plano_id, idades.c.pos), order_by=Faixa.id).label("ordem"),
+        )
+        .select_from(Plano)
+        .join(Faixa, Faixa.plano_id == Plano.id)
+        .join(idades, and_(Faixa.idade_min <= idades.c.idade, idades.c.idade <= Faixa.idade_max))
+        .where(*filtros_cotacao(dados, plano_id))
+        .cte("casadas")
+    )
+    precificados = (
+        select(casadas.c.plano_id)
+        .where(casadas.c.ordem == 1)
+        .group_by(casadas.c.plano_id)
+        .having(func.count() == len(dados.idades))
+    )
+    precos = (
+        select(casadas.c.plano_id, casadas.c.pos, casadas.c.faixa_etaria, casadas.c.valor)
+        .where(casadas.c.ordem == 1, casadas.c.plano_id.in_(precificados))
+    )
+    # Faixas que a migração 4 não preencheu (ou gravadas por fora das rotas):
+    # o intervalo acima não as vê, e o MotorPrecos ainda interpreta o texto
+    sem_idade = (
+        select(Faixa.plano_id, cast(null(), Integer).label("pos"), Faixa.faixa_etaria, cast(null(), Float).label("valor"))
+        .select_from(Plano)
+        .join(Faixa, Faixa.plano_id == Plano.id)
+        .where(or_(Faixa.idade_min.is_(None), Faixa.idade_max.is_(None)), *filtros_cotacao(dados, plano_id))
+    )
+    return union_all(precos, sem_idade).order_by("plano_id", "pos")
+
+
+async def _carregar_dados_planos(db: AsyncSession, plano_ids: list[int], com_colecoes: list[int]) -> dict[int, dict]:
+    """
+    plano_id -> campos da resposta (os mesmos do PlanoCatalogo.dados), lidos
+    com Core: um SELECT do plano com a operadora e um por coleção, só dos
+    planos de `com_colecoes` (os demais ficam com as listas vazias), sem as
+    faixas e sem objetos do ORM no identity map.
+    """
+    plano = plano_model.Plano.__table__
+    op = operadora_model.Operadora.__table__
+    linhas = (await db.execute(
+        select(plano.c.id, plano.c.nome, plano.c.imagem_coparticipacao_url, op.c.nome.label("operadora"), op.c.rede_credenciada_url)
+        .select_from(plano.outerjoin(op, op.c.id == plano.c.operadora_id))
+        .where(plano.c.id.in_(plano_ids))
+    )).mappings()
+    por_id = {
+        linha["id"]: {
+            "operadora": linha["operadora"] if linha["operadora"] is not None else "N/A",
+            "plano": linha["nome"],
+            "imagem_coparticipacao_url": linha["imagem_coparticipacao_url"],
+            **{colecao: [] for colecao in COLECOES_COTACAO},
+            "rede_credenciada_url": linha["rede_credenciada_url"],
+        }
+        for linha in linhas
+    }
+    for colecao in COLECOES_COTACAO:
+        modelo, colunas = COLECOES_LISTAGEM[colecao]
+        filha = modelo.__table__
+        stmt = (
+            select(filha.c.plano_id, *(filha.c[c] for c in colunas))
+            .where(filha.c.plano_id.in_(com_colecoes))
+            .order_by(filha.c.plano_id, filha.c.id)
+        )
+        for linha in (await db.execute(stmt)).mappings():
+            por_id[linha["plano_id"]][colecao].append({c: linha[c] for c in colunas})
+    return por_id
+
+
+async def cotar_sql(db: AsyncSession, dados: cotacao_schema.CotacaoRequest, plano_id: Optional[int] = None) -> list[dict]:
+    """
+    Cota a família com uma consulta de preços (consulta_precos) e um
+    carregamento das coleções só dos planos precificados (ou dos
+    COLECOES_MAX mais baratos). Devolve o mesmo que CatalogoCache.cotar_async,
+    na mesma ordem (por id do plano). Se algum candidato tem faixa sem
+    idade_min/idade_max que o MotorPrecos saberia interpretar, a cotação
+    inteira vai para o catálogo em memória.
+    """
+    legados: set[int] = set()
+    try:
+        linhas = (await db.execute(consulta_precos(db.get_bind().dialect.name, dados, plano_id))).all()
+        legados = {
+            linha.plano_id for linha in linhas
+            if linha.pos is None and linha.faixa_etaria is not None and parse_faixa(linha.faixa_etaria) is not None
+        }
+        por_plano = {} if legados else {
+            pid: list(grupo)
+            for pid, grupo in groupby((linha for linha in linhas if linha.pos is not None), key=lambda linha: linha.plano_id)
+        }
+        totais = {}
+        for pid, precos in por_plano.items():
+            # Soma pessoa a pessoa, na ordem da família, como o MotorPrecos: o
+            # SUM do banco não garante a ordem e o float poderia diferir
+            total = 0.0
+            for linha in precos:
+                total += linha.valor
+            totais[pid] = total
+        com_colecoes = list(por_plano)
+        if COLECOES_MAX > 0:
+            com_colecoes = sorted(por_plano, key=lambda pid: (totais[pid], pid))[:COLECOES_MAX]
+        campos = await _carregar_dados_planos(db, list(por_plano), com_colecoes) if por_plano else {}
+    finally:
+        # Devolve a conexão ao pool antes de montar e serializar a resposta
+        await db.rollback()
+
+    if legados:
+        logger.warning(
+            "%d plano(s) com faixas sem idade_min/idade_max (rode scripts/migrar.py): cotação pelo catálogo em memória",
+            len(legados),
+        )
+        return await catalogo.cotar_async(db, dados, plano_id)
+
+    resultados = []
+    for pid, precos in por_plano.items():
+        d = campos[pid]
+        resultados.append({
+            "plano_id": pid,
+            "operadora": d["operadora"],
+            "plano": d["plano"],
+            "preco_total": round(totais[pid], 2),
+            "beneficiarios": [
+                {"idade": idade, "faixa_etaria_usada": linha.faixa_etaria, "valor": linha.valor}
+                for linha, idade in zip(precos, dados.idades)
+            ],
+            "imagem_coparticipacao_url": d["imagem_coparticipacao_url"],
+            **{colecao: d[colecao] for colecao in COLECOES_COTACAO},
+            "rede_credenciada_url": d["rede_credenciada_url"],
+        })
+
+    # Os planos que não passaram não saem do banco: só os retornados são contados
+    planos_retornados.observar(len(resultados))
+    return resultados
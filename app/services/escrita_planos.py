@@ -0,0 +1,201 @@
+from collections import defaultdict, deque
+from typing import Sequence
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import plano_model, faixa_preco_model, hospital_model, carencia_model, coparticipacao_model
+from app.schemas import cotacao_schema
+from app.services.catalog_cache import registrar_alteracao
+from app.services.price_index import validar_faixas
+
+# Campos da tabela planos em PlanoCreate (o resto são as coleções filhas)
+CAMPOS_PLANO = (
+    "operadora_id", "nome", "tipo_contratacao", "acomodacao", "abrangencia",
+    "coparticipacao", "elegibilidade", "imagem_coparticipacao_url",
+)
+
+
+def linhas_filhas(plano_id: int, plano: cotacao_schema.PlanoCreate) -> dict[type, list[dict]]:
+    """Linhas de cada tabela filha de um PlanoCreate, prontas para INSERT."""
+    return {
+        faixa_preco_model.FaixaPreco: [
+            {"plano_id": plano_id, "faixa_etaria": f.faixa_etaria, "valor": f.valor, "idade_min": idade_min, "idade_max": idade_max}
+            for f, (idade_min, idade_max) in zip(plano.faixas_preco, validar_faixas(f.faixa_etaria for f in plano.faixas_preco))
+        ],
+        hospital_model.Hospital: [
+            {"plano_id": plano_id, "nome": h.nome, "endereco": h.endereco} for h in plano.hospitais
+        ],
+        carencia_model.Carencia: [
+            {"plano_id": plano_id, "descricao": c.descricao, "dias": c.dias} for c in plano.carencias
+        ],
+        coparticipacao_model.Coparticipacao: [
+            {
+                "plano_id": plano_id, "nome": c.nome, "tipo_plano": c.tipo_plano, "imagem_url": c.imagem_url,
+                "tipo_servico": c.tipo_servico, "percentual": c.percentual,
+                "valor_minimo": c.valor_minimo, "valor_maximo": c.valor_maximo,
+            }
+            for c in plano.coparticipacoes
+        ],
+        hospital_model.Municipio: [
+            {"plano_id": plano_id, "nome": m.nome} for m in plano.municipios
+        ],
+    }
+
+
+async def inserir_linhas(db: AsyncSession, linhas: dict[type, list[dict]]) -> None:
+    """
+    Um INSERT executemany por tabela. O SQLAlchemy agrupa as linhas em
+    INSERTs de vários VALUES (insertmanyvalues), então milhares de linhas
+    viram poucas idas ao banco.
+    """
+    for modelo, valores in linhas.items():
+        if valores:
+            await db.execute(insert(modelo), valores)
+
+
+async def inserir_planos(db: AsyncSession, planos: Sequence[cotacao_schema.PlanoCreate]) -> list[int]:
+    """
+    Insere os planos e todas as coleções filhas na transação corrente, com
+    um INSERT por tabela, e devolve os ids na ordem de `planos`. Não faz
+    commit nem registra a alteração do catálogo: isso fica com quem chama.
+    """
+    if not planos:
+        return []
+    # RETURNING em lote, na ordem dos parâmetros: os ids casam com os planos
+    ids = list((await db.scalars(
+        insert(plano_model.Plano).returning(plano_model.Plano.id, sort_by_parameter_order=True),
+        [{campo: getattr(p, campo) for campo in CAMPOS_PLANO} for p in planos],
+    )).all())
+
+    linhas: dict[type, list[dict]] = {}
+    for plano_id, plano in zip(ids, planos):
+        for modelo, valores in linhas_filhas(plano_id, plano).items():
+            linhas.setdefault(modelo, []).extend(valores)
+    await inserir_linhas(db, linhas)
+    return ids
+
+
+async def criar_planos(db: AsyncSession, planos: Sequence[cotacao_schema.PlanoCreate]) -> list[int]:
+    """
+    inserir_planos + uma alteração do catálogo por plano criado, num único
+    commit: os workers carregam só os planos novos, não a operadora inteira.
+    """
+    ids = await inserir_planos(db, planos)
+    for plano_id in ids:
+        registrar_alteracao(db, plano_id=plano_id)
+    await db.commit()
+    return ids
+
+
+# Coleções sem id no PlanoCreate: as linhas guardadas casam com as enviadas
+# pela coluna chave, e só as colunas de valor podem mudar.
+# (modelo, coluna chave, colunas de valor)
+COLECOES_POR_CHAVE = (
+    # idade_min/idade_max vêm da faixa_etaria; comparar também corrige linhas antigas sem elas
+    (faixa_preco_model.FaixaPreco, "faixa_etaria", ("valor", "idade_min", "idade_max")),
+    (hospital_model.Hospital, "nome", ("endereco",)),
+    (carencia_model.Carencia, "descricao", ("dias",)),
+    (hospital_model.Municipio, "nome", ()),
+)
+
+# Campos de uma coparticipação que a edição do plano altera (tipo_plano e
+# imagem_url ficam como estão)
+CAMPOS_COPARTICIPACAO = ("nome", "tipo_servico", "percentual", "valor_minimo", "valor_maximo")
+
+
+class DiffColecao:
+    """Linhas a inserir, atualizar (id + colunas) e remover (ids) de uma tabela filha."""
+
+    __slots__ = ("inserir", "atualizar", "remover")
+
+    def __init__(self):
+        self.inserir: list[dict] = []
+        self.atualizar: list[dict] = []
+        self.remover: list[int] = []
+
+
+def diff_por_chave(guardadas, enviadas, chave: str, colunas: tuple[str, ...]) -> DiffColecao:
+    """
+    Casa as linhas guardadas (com id) com as enviadas pela chave, na ordem
+    em que aparecem (chaves repetidas casam uma a uma). Casadas com os mesmos
+    valores não geram nada; com valores diferentes viram UPDATE; as que
+    sobram de cada lado viram DELETE e INSERT.
+    """
+    diff = DiffColecao()
+    por_chave = defaultdict(deque)
+    for linha in guardadas:
+        por_chave[linha[chave]].append(linha)
+    for nova in enviadas:
+        fila = por_chave.get(nova[chave])
+        if not fila:
+            diff.inserir.append(nova)
+            continue
+        antiga = fila.popleft()
+        alteradas = {c: nova[c] for c in colunas if antiga[c] != nova[c]}
+        if alteradas:
+            diff.atualizar.append({"id": antiga["id"], **alteradas})
+    diff.remover = [linha["id"] for fila in por_chave.values() for linha in fila]
+    return diff
+
+
+def diff_coparticipacoes(guardadas, enviadas: list[dict]) -> DiffColecao:
+    """Pelo id: com id do plano atualiza, sem id insere, as que não vieram são removidas."""
+    diff = DiffColecao()
+    por_id = {linha["id"]: linha for linha in guardadas}
+    vistos = set()
+    for nova in enviadas:
+        cid = nova.pop("id", None)
+        if cid is None:
+            diff.inserir.append(nova)
+            continue
+        antiga = por_id.get(cid)
+        if antiga is None:
+            # id de outro plano (ou já removido): ignorado, como antes
+            continue
+        vistos.add(cid)
+        alteradas = {c: nova[c] for c in CAMPOS_COPARTICIPACAO if antiga[c] != nova[c]}
+        if alteradas:
+            diff.atualizar.append({"id": cid, **alteradas})
+    diff.remover = [cid for cid in por_id if cid not in vistos]
+    return diff
+
+
+async def _guardadas(db: AsyncSession, modelo, plano_id: int, colunas) -> list[dict]:
+    tabela = modelo.__table__
+    stmt = select(tabela.c.id, *(tabela.c[c] for c in colunas)).where(tabela.c.plano_id == plano_id).order_by(tabela.c.id)
+    return [dict(linha) for linha in (await db.execute(stmt)).mappings()]
+
+
+async def aplicar_diff(db: AsyncSession, modelo, diff: DiffColecao) -> None:
+    """Um DELETE ... IN, um UPDATE executemany e um INSERT executemany, só os que tiverem linhas."""
+    if diff.remover:
+        await db.execute(delete(modelo).where(modelo.id.in_(diff.remover)))
+    if diff.atualizar:
+        # UPDATE em lote pela chave primária (executemany)
+        await db.execute(update(modelo), diff.atualizar)
+    if diff.inserir:
+        await db.execute(insert(modelo), diff.inserir)
+
+
+async def atualizar_colecoes(db: AsyncSession, plano_id: int, plano: cotacao_schema.PlanoCreate) -> dict[str, int]:
+    """
+    Leva as coleções guardadas do plano ao estado de `plano` alterando só
+    as linhas que mudaram, na transação corrente (sem commit). Devolve
+    quantas linhas foram inseridas, atualizadas e removidas.
+    """
+    novas = linhas_filhas(plano_id, plano)
+    diffs = []
+    for modelo, chave, colunas in COLECOES_POR_CHAVE:
+        guardadas = await _guardadas(db, modelo, plano_id, (chave, *colunas))
+        diffs.append((modelo, diff_por_chave(guardadas, novas[modelo], chave, colunas)))
+
+    copart = coparticipacao_model.Coparticipacao
+    enviadas = [{**linha, "id": c.id} for linha, c in zip(novas[copart], plano.coparticipacoes)]
+    diffs.append((copart, diff_coparticipacoes(await _guardadas(db, copart, plano_id, CAMPOS_COPARTICIPACAO), enviadas)))
+
+    resumo = {"inseridas": 0, "atualizadas": 0, "removidas": 0}
+    for modelo, diff in diffs:
+        await aplicar_diff(db, modelo, diff)
+        resumo["inseridas"] += len(diff.inserir)
+        resumo["atualizadas"] += len(diff.atualizar)
+        resumo["removidas"] += len(diff.remover)
+    return resumo
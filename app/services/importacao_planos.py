@@ -0,0 +1,271 @@
+import csv
+import os
+import re
+import tempfile
+import unicodedata
+from typing import AsyncIterator, Iterable, Iterator, Optional
+from pydantic import ValidationError
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import operadora_model, plano_model
+from app.schemas import cotacao_schema
+from app.services.escrita_planos import criar_planos
+from app.services.lote_cotacao import linhas_texto, valor_booleano
+from app.services.price_index import parse_faixa
+
+CONTENT_TYPES_CSV = {"text/csv", "application/csv"}
+CONTENT_TYPE_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Quanto do XLSX enviado fica em memória antes de ir para um temporário em disco (MB)
+XLSX_SPOOL_MAX_MB = float(os.getenv("IMPORTACAO_XLSX_SPOOL_MAX_MB", "8"))
+
+# Coluna da planilha -> campo de PlanoCreate (cabeçalhos sem acento, em minúsculas)
+COLUNAS_PLANO = {
+    "nome": "nome",
+    "plano": "nome",
+    "tipo_contratacao": "tipo_contratacao",
+    "contratacao": "tipo_contratacao",
+    "acomodacao": "acomodacao",
+    "abrangencia": "abrangencia",
+    "coparticipacao": "coparticipacao",
+    "elegibilidade": "elegibilidade",
+    "imagem_coparticipacao_url": "imagem_coparticipacao_url",
+}
+COLUNAS_BOOLEANAS = ("coparticipacao", "elegibilidade")
+
+# Coleções: itens separados por "|", campos de um item por ":"
+SEPARADOR_ITENS = "|"
+SEPARADOR_CAMPOS = ":"
+
+
+class LinhaImportacao:
+    """Uma linha da planilha: o plano validado ou o erro."""
+
+    __slots__ = ("linha", "nome", "plano", "erro")
+
+    def __init__(self, linha: int, nome: Optional[str] = None, plano: Optional[cotacao_schema.PlanoCreate] = None, erro: Optional[str] = None):
+        self.linha = linha
+        self.nome = nome
+        self.plano = plano
+        self.erro = erro
+
+    def relatorio(self) -> dict:
+        return {"linha": self.linha, "plano": self.nome, "erro": self.erro}
+
+
+def normalizar_coluna(nome) -> str:
+    """'Carências ' -> 'carencias', 'Tipo Contratação' -> 'tipo_contratacao', ' 0 - 18' -> '0-18'."""
+    if parse_faixa(str(nome or "")) is not None:
+        return str(nome).replace(" ", "")
+    texto = unicodedata.normalize("NFKD", str(nome or "")).encode("ascii", "ignore").decode()
+    return re.sub(r"\s+", "_", texto.strip().lower())
+
+
+# "1.234", "12.345.678": pontos só entre grupos de três dígitos, sem vírgula
+_MILHAR_PONTO = re.compile(r"-?[1-9]\d{0,2}(\.\d{3})+")
+
+
+def numero(valor) -> float:
+    """
+    Aceita 150, "150.5", "R$ 1.234,56", "R$ 1.234" e "1,234.56". Só com
+    ponto, grupos de três dígitos ("1.234") são milhar, como no pt-BR; "150.5"
+    e "0.500" são decimais.
+    """
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    texto = str(valor).replace("R$", "").replace(" ", "").strip()
+    if "," in texto and "." in texto:
+        # O separador que aparece por último é o decimal
+        milhar = "." if texto.rfind(",") > texto.rfind(".") else ","
+        texto = texto.replace(milhar, "")
+    elif _MILHAR_PONTO.fullmatch(texto):
+        texto = texto.replace(".", "")
+    return float(texto.replace(",", "."))
+
+
+def _texto(valor) -> str:
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor).strip()
+
+
+def _itens(valor, campos: int = -1) -> list[list[str]]:
+    return [
+        [campo.strip() for campo in item.split(SEPARADOR_CAMPOS, campos - 1)]
+        for item in _texto(valor).split(SEPARADOR_ITENS) if item.strip()
+    ]
+
+
+def _opcional(campos: list[str], posicao: int) -> Optional[str]:
+    return campos[posicao] if len(campos) > posicao and campos[posicao] else None
+
+
+def _dias(campos: list[str]) -> int:
+    if not _opcional(campos, 1):
+        raise ValueError(f"Carência sem dias: {campos[0]}")
+    return int(numero(campos[1]))
+
+
+def _dados_plano(campos: dict, operadoras: dict[str, int]) -> dict:
+    dados = {}
+    if _texto(campos.get("operadora_id")):
+        operadora_id = int(numero(campos["operadora_id"]))
+        if operadora_id not in operadoras.values():
+            raise ValueError(f"Operadora não encontrada: {operadora_id}")
+        dados["operadora_id"] = operadora_id
+    elif _texto(campos.get("operadora")):
+        nome = _texto(campos["operadora"])
+        if nome.lower() not in operadoras:
+            raise ValueError(f"Operadora não encontrada: {nome}")
+        dados["operadora_id"] = operadoras[nome.lower()]
+
+    for coluna, campo in COLUNAS_PLANO.items():
+        valor = campos.get(coluna)
+        if campo in dados or valor is None or _texto(valor) == "":
+            continue
+        if campo in COLUNAS_BOOLEANAS:
+            dados[campo] = valor if isinstance(valor, bool) else valor_booleano(_texto(valor))
+        else:
+            dados[campo] = _texto(valor)
+
+    # Colunas de faixa etária ("0-18", "59+"), na ordem da planilha
+    dados["faixas_preco"] = [
+        {"faixa_etaria": coluna, "valor": numero(valor)}
+        for coluna, valor in campos.items()
+        if parse_faixa(coluna) is not None and _texto(valor) != ""
+    ]
+    dados["hospitais"] = [
+        # O endereço pode ter ":" (só o primeiro separa os campos)
+        {"nome": c[0], "endereco": _opcional(c, 1)} for c in _itens(campos.get("hospitais"), campos=2)
+    ]
+    dados["carencias"] = [
+        {"descricao": c[0], "dias": _dias(c)} for c in _itens(campos.get("carencias"))
+    ]
+    dados["coparticipacoes"] = [
+        {
+            "nome": c[0], "tipo_servico": c[0],
+            "percentual": numero(_opcional(c, 1)) if _opcional(c, 1) else None,
+            "valor_minimo": numero(_opcional(c, 2)) if _opcional(c, 2) else None,
+            "valor_maximo": numero(_opcional(c, 3)) if _opcional(c, 3) else None,
+        }
+        for c in _itens(campos.get("coparticipacoes"))
+    ]
+    dados["municipios"] = [{"nome": c[0]} for c in _itens(campos.get("municipios"))]
+    return dados
+
+
+def plano_da_linha(linha: int, campos: dict, operadoras: dict[str, int]) -> LinhaImportacao:
+    """Converte uma linha (colunas já normalizadas) em PlanoCreate, ou no erro da linha."""
+    nome = _texto(campos.get("nome") or campos.get("plano")) or None
+    try:
+        dados = _dados_plano(campos, operadoras)
+    except ValueError as e:
+        mensagem = str(e)
+        if mensagem.startswith("could not convert") or mensagem.startswith("invalid literal"):
+            mensagem = f"Número inválido: {mensagem.rsplit(':', 1)[-1].strip()}"
+        return LinhaImportacao(linha, nome, erro=mensagem)
+    if "operadora_id" not in dados:
+        return LinhaImportacao(linha, nome, erro="Informe a coluna operadora ou operadora_id")
+    try:
+        plano = cotacao_schema.PlanoCreate(**dados)
+    except ValidationError as e:
+        return LinhaImportacao(linha, nome, erro="; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+    if not plano.faixas_preco:
+        return LinhaImportacao(linha, nome, erro="Nenhuma faixa de preço (colunas como 0-18, 59+)")
+    return LinhaImportacao(linha, plano.nome, plano)
+
+
+# ----- leitura -----
+
+async def linhas_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, dict]]:
+    """
+    (número da linha, colunas) de um CSV com cabeçalho, conforme os bytes
+    chegam. Separador "," ou ";" (detectado pelo cabeçalho); campos entre
+    aspas não podem conter quebra de linha.
+    """
+    cabecalho = None
+    separador = ","
+    numero_linha = 0
+    async for texto in linhas_texto(chunks):
+        numero_linha += 1
+        if not texto.strip():
+            continue
+        if cabecalho is None:
+            separador = ";" if texto.count(";") > texto.count(",") else ","
+            cabecalho = [normalizar_coluna(c) for c in next(csv.reader([texto], delimiter=separador))]
+            continue
+        yield numero_linha, dict(zip(cabecalho, next(csv.reader([texto], delimiter=separador))))
+    if cabecalho is None:
+        raise ValueError("Arquivo vazio")
+
+
+async def guardar_corpo(chunks: AsyncIterator[bytes]):
+    """Copia o corpo para um SpooledTemporaryFile (o XLSX é um zip e precisa de seek)."""
+    arquivo = tempfile.SpooledTemporaryFile(max_size=int(XLSX_SPOOL_MAX_MB * 1024 * 1024))
+    async for chunk in chunks:
+        arquivo.write(chunk)
+    arquivo.seek(0)
+    return arquivo
+
+
+def linhas_xlsx(arquivo) -> Iterator[tuple[int, dict]]:
+    """
+    (número da linha, colunas) da primeira aba de um XLSX, lida em modo
+    read_only (linha a linha, sem montar a planilha inteira em memória).
+    """
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("Importação de XLSX indisponível: instale o openpyxl")
+    from zipfile import BadZipFile
+
+    try:
+        planilha = load_workbook(arquivo, read_only=True, data_only=True)
+    except (BadZipFile, KeyError, OSError):
+        raise ValueError("Arquivo XLSX inválido")
+    try:
+        cabecalho = None
+        for numero_linha, valores in enumerate(planilha.worksheets[0].iter_rows(values_only=True), start=1):
+            if all(v is None or _texto(v) == "" for v in valores):
+                continue
+            if cabecalho is None:
+                cabecalho = [normalizar_coluna(v) for v in valores]
+                continue
+            yield numero_linha, dict(zip(cabecalho, valores))
+        if cabecalho is None:
+            raise ValueError("Planilha vazia")
+    finally:
+        planilha.close()
+
+
+# ----- gravação -----
+
+async def referencias(db: AsyncSession) -> tuple[dict[str, int], set[tuple[int, str]]]:
+    """Operadoras por nome (minúsculo) e os (operadora_id, nome do plano) que já existem."""
+    operadoras = {nome.lower(): oid for oid, nome in (await db.execute(
+        select(operadora_model.Operadora.id, operadora_model.Operadora.nome)
+    )).all() if nome}
+    existentes = set((await db.execute(
+        select(plano_model.Plano.operadora_id, func.lower(plano_model.Plano.nome))
+    )).all())
+    return operadoras, existentes
+
+
+def marcar_duplicados(linhas: Iterable[LinhaImportacao], existentes: set[tuple[int, str]]) -> None:
+    """Erro nas linhas cujo plano já existe na operadora, no banco ou mais acima no arquivo."""
+    vistos = set(existentes)
+    for linha in linhas:
+        if linha.plano is None:
+            continue
+        chave = (linha.plano.operadora_id, linha.plano.nome.lower())
+        if chave in vistos:
+            linha.plano = None
+            linha.erro = "Plano já existe nesta operadora"
+        vistos.add(chave)
+
+
+async def gravar(db: AsyncSession, linhas: list[LinhaImportacao]) -> list[int]:
+    """Insere os planos válidos numa única transação."""
+    return await criar_planos(db, [linha.plano for linha in linhas if linha.plano is not None])
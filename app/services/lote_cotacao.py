@@ -0,0 +1,232 @@
+import codecs
+import csv
+import json
+import os
+import re
+from typing import AsyncIterator, Iterator, Optional
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from app.schemas import cotacao_schema
+from app.services.catalog_cache import CatalogoSnapshot
+from app.services.rule_engine import FAMILIAS_POR_BLOCO
+
+# Colunas aceitas no CSV (além de "idades" e da opcional "referencia")
+COLUNAS_FILTRO = ("operadora_id", "plano_id", "tipo_contratacao", "acomodacao", "abrangencia", "elegibilidade", "coparticipacao")
+
+# Maior família aceita no array JSON (caracteres). Acima disso, ou com JSON
+# inválido, o lote para ali: um array não tem como ser retomado no meio
+FAMILIA_JSON_MAX = int(os.getenv("LOTE_FAMILIA_JSON_MAX", str(64 * 1024)))
+
+# Uma família incompleta só dá erro no fim do buffer, a não ser uma string
+# aberta (o erro aponta o início dela) ou um literal cortado ("tru", "-Infinit")
+_MARGEM_INCOMPLETO = 10
+
+# Separadores aceitos entre as idades na coluna "idades" do CSV
+_SEPARADOR_IDADES = re.compile(r"[\s;,|]+")
+
+_VERDADEIRO = {"1", "true", "sim", "s", "yes", "y", "x"}
+_FALSO = {"0", "false", "nao", "não", "n", "no"}
+
+
+class RespostaNDJSON(StreamingResponse):
+    """
+    StreamingResponse que não fica escutando desconexão do cliente.
+
+    O gerador do lote lê o corpo da requisição (request.stream()) enquanto já
+    responde; o listener padrão do Starlette disputaria essas mesmas
+    mensagens de receive() e o corpo nunca chegaria ao gerador.
+    """
+
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+class FamiliaLote:
+    """Uma linha do lote: o pedido validado ou o erro de validação."""
+
+    __slots__ = ("linha", "referencia", "pedido", "erro")
+
+    def __init__(self, linha: int, referencia=None, pedido: Optional[cotacao_schema.CotacaoRequest] = None, erro: Optional[str] = None):
+        self.linha = linha
+        self.referencia = referencia
+        self.pedido = pedido
+        self.erro = erro
+
+
+def _validar(linha: int, dados) -> FamiliaLote:
+    if not isinstance(dados, dict):
+        return FamiliaLote(linha, erro="Cada família deve ser um objeto JSON")
+    referencia = dados.get("referencia")
+    try:
+        pedido = cotacao_schema.CotacaoRequest(**dados)
+    except ValidationError as e:
+        return FamiliaLote(linha, referencia, erro="; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+    if not pedido.idades:
+        return FamiliaLote(linha, referencia, erro="Lista de idades vazia")
+    return FamiliaLote(linha, referencia, pedido)
+
+
+async def _texto(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    async for chunk in chunks:
+        texto = decoder.decode(chunk)
+        if texto:
+            yield texto
+    resto = decoder.decode(b"", final=True)
+    if resto:
+        yield resto
+
+
+async def linhas_texto(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Linhas de texto UTF-8 (com ou sem BOM) de um corpo que chega em pedaços."""
+    pendente = ""
+    async for texto in _texto(chunks):
+        pendente += texto
+        *completas, pendente = pendente.split("\n")
+        for linha in completas:
+            yield linha.rstrip("\r")
+    if pendente:
+        yield pendente.rstrip("\r")
+
+
+async def familias_json(chunks: AsyncIterator[bytes]) -> AsyncIterator[FamiliaLote]:
+    """
+    Lê um array JSON de famílias conforme os bytes chegam, sem carregar o
+    corpo inteiro: cada objeto é decodificado assim que termina de chegar.
+    Uma família inválida ou com mais de FAMILIA_JSON_MAX caracteres vira o
+    erro dessa linha e encerra a leitura; o resto do corpo não é guardado.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    abriu = False
+    linha = 0
+    async for texto in _texto(chunks):
+        buffer += texto
+        pos = 0
+        while True:
+            while pos < len(buffer) and (buffer[pos].isspace() or (abriu and buffer[pos] == ",")):
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if not abriu:
+                if buffer[pos] != "[":
+                    raise ValueError("O corpo JSON deve ser um array de famílias")
+                abriu = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                dados, fim = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                if e.pos < len(buffer) - _MARGEM_INCOMPLETO and not e.msg.startswith("Unterminated string"):
+                    yield FamiliaLote(linha + 1, erro=f"JSON inválido: {e.msg}; o restante do lote não foi lido")
+                    return
+                if len(buffer) - pos > FAMILIA_JSON_MAX:
+                    yield FamiliaLote(linha + 1, erro=f"Família com mais de {FAMILIA_JSON_MAX} caracteres; o restante do lote não foi lido")
+                    return
+                break  # objeto incompleto: espera o próximo pedaço
+            linha += 1
+            yield _validar(linha, dados)
+            pos = fim
+        buffer = buffer[pos:]
+    if buffer.strip():
+        raise ValueError("JSON incompleto no fim do lote")
+
+
+async def familias_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[FamiliaLote]:
+    """Uma família (objeto JSON) por linha."""
+    linha = 0
+    async for texto in linhas_texto(chunks):
+        if not texto.strip():
+            continue
+        linha += 1
+        try:
+            dados = json.loads(texto)
+        except json.JSONDecodeError as e:
+            yield FamiliaLote(linha, erro=f"JSON inválido: {e.msg}")
+            continue
+        yield _validar(linha, dados)
+
+
+def valor_booleano(valor: str):
+    """Sim/não de planilha ("sim", "x", "0", ...); vazio vira None."""
+    valor = valor.strip().lower()
+    if not valor:
+        return None
+    if valor in _VERDADEIRO:
+        return True
+    if valor in _FALSO:
+        return False
+    return valor  # deixa o pydantic reclamar
+
+
+async def familias_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[FamiliaLote]:
+    """
+    CSV com cabeçalho. Separador "," ou ";" (detectado pelo cabeçalho).
+    A coluna "idades" aceita as idades separadas por espaço, ";", "," ou "|";
+    qualquer outra coisa (decimal, sinal, texto) vira o erro dessa linha.
+    Campos entre aspas não podem conter quebra de linha.
+    """
+    cabecalho = None
+    separador = ","
+    linha = 0
+    async for texto in linhas_texto(chunks):
+        if not texto.strip():
+            continue
+        if cabecalho is None:
+            separador = ";" if texto.count(";") > texto.count(",") else ","
+            cabecalho = [c.strip().lower() for c in next(csv.reader([texto], delimiter=separador))]
+            if "idades" not in cabecalho:
+                raise ValueError("O CSV precisa de uma coluna 'idades'")
+            continue
+
+        linha += 1
+        campos = dict(zip(cabecalho, next(csv.reader([texto], delimiter=separador))))
+        idades = [i for i in _SEPARADOR_IDADES.split(campos.get("idades", "").strip()) if i]
+        invalida = next((i for i in idades if not re.fullmatch(r"\d+", i)), None)
+        if invalida is not None:
+            yield FamiliaLote(linha, campos.get("referencia") or None, erro=f"idades: {invalida!r} não é uma idade")
+            continue
+        dados = {"idades": [int(i) for i in idades]}
+        for coluna in COLUNAS_FILTRO:
+            valor = campos.get(coluna, "").strip()
+            if not valor:
+                continue
+            dados[coluna] = valor_booleano(valor) if coluna in ("elegibilidade", "coparticipacao") else valor
+        if campos.get("referencia"):
+            dados["referencia"] = campos["referencia"]
+        yield _validar(linha, dados)
+
+
+def cotar_bloco(snapshot: CatalogoSnapshot, bloco: list[FamiliaLote]) -> Iterator[str]:
+    """Cota um bloco de famílias contra o mesmo snapshot e produz uma linha NDJSON por família."""
+    validas = [f for f in bloco if f.pedido is not None]
+    resultados = snapshot.motor.cotar_lote((snapshot.filtrar(f.pedido, f.pedido.plano_id), f.pedido.idades) for f in validas)
+    por_familia = dict(zip((id(f) for f in validas), resultados))
+
+    for familia in bloco:
+        saida = {"linha": familia.linha}
+        if familia.referencia is not None:
+            saida["referencia"] = familia.referencia
+        if familia.pedido is None:
+            saida["erro"] = familia.erro
+        else:
+            saida["idades"] = familia.pedido.idades
+            saida["resultados"] = por_familia[id(familia)]
+        yield json.dumps(saida, ensure_ascii=False) + "\n"
+
+
+async def blocos(familias: AsyncIterator[FamiliaLote], tamanho: int = FAMILIAS_POR_BLOCO) -> AsyncIterator[list[FamiliaLote]]:
+    bloco = []
+    async for familia in familias:
+        bloco.append(familia)
+        if len(bloco) == tamanho:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
@@ -0,0 +1,216 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable, Optional
+
+# Liga/desliga o middleware de métricas HTTP (os contadores de domínio ficam sempre ativos)
+METRICAS_ATIVAS = os.getenv("METRICAS_ATIVAS", "1") != "0"
+
+# Buckets padrão de latência (segundos), os mesmos do cliente oficial do Prometheus
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+
+def _formatar(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def _rotulos(nomes: tuple[str, ...], valores: tuple, extra: str = "") -> str:
+    pares = [f'{n}="{_escapar(str(v))}"' for n, v in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _escapar(texto: str) -> str:
+    return texto.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple[str, ...] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self._lock = threading.Lock()
+
+    def cabecalho(self) -> list[str]:
+        return [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+
+
+class Contador(_Metrica):
+    """Contador monotônico, opcionalmente com rótulos."""
+
+    tipo = "counter"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple[str, ...] = ()):
+        super().__init__(nome, ajuda, rotulos)
+        self._valores: dict[tuple, float] = {}
+
+    def inc(self, valor: float = 1, *rotulos) -> None:
+        with self._lock:
+            self._valores[rotulos] = self._valores.get(rotulos, 0) + valor
+
+    def linhas(self) -> list[str]:
+        with self._lock:
+            itens = sorted(self._valores.items())
+        return self.cabecalho() + [f"{self.nome}{_rotulos(self.rotulos, r)} {_formatar(v)}" for r, v in itens]
+
+
+class Medidor(_Metrica):
+    """Valor que sobe e desce (ex.: requisições em andamento)."""
+
+    tipo = "gauge"
+
+    def __init__(self, nome: str, ajuda: str):
+        super().__init__(nome, ajuda)
+        self.valor = 0
+
+    def somar(self, delta: float) -> None:
+        with self._lock:
+            self.valor += delta
+
+    def linhas(self) -> list[str]:
+        return self.cabecalho() + [f"{self.nome} {_formatar(self.valor)}"]
+
+
+class Histograma(_Metrica):
+    """Histograma cumulativo no formato do Prometheus (_bucket, _sum, _count)."""
+
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, buckets: Iterable[float] = BUCKETS_LATENCIA, rotulos: tuple[str, ...] = ()):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = tuple(sorted(buckets))
+        # Por combinação de rótulos: [contagem por bucket (+Inf no fim), soma]
+        self._series: dict[tuple, list] = {}
+
+    def observar(self, valor: float, *rotulos) -> None:
+        indice = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(rotulos)
+            if serie is None:
+                serie = self._series[rotulos] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][indice] += 1
+            serie[1] += valor
+
+    def linhas(self) -> list[str]:
+        with self._lock:
+            series = sorted((r, list(contagens), soma) for r, (contagens, soma) in self._series.items())
+        saida = self.cabecalho()
+        for rotulos, contagens, soma in series:
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + (float("inf"),), contagens):
+                acumulado += contagem
+                le = f'le="{_formatar(limite)}"'
+                saida.append(f"{self.nome}_bucket{_rotulos(self.rotulos, rotulos, le)} {acumulado}")
+            saida.append(f"{self.nome}_sum{_rotulos(self.rotulos, rotulos)} {_formatar(soma)}")
+            saida.append(f"{self.nome}_count{_rotulos(self.rotulos, rotulos)} {acumulado}")
+        return saida
+
+
+class RegistroMetricas:
+    """
+    Métricas deste processo (worker do uvicorn) no formato texto do Prometheus.
+    Além das métricas registradas, coletores são chamados a cada leitura para
+    expor o estado de componentes que já têm seus próprios contadores
+    (catálogo, cache de PDF, pool do banco).
+    """
+
+    def __init__(self):
+        self._metricas: list[_Metrica] = []
+        self._coletores: list[Callable[[], Iterable[str]]] = []
+
+    def registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def coletor(self, funcao: Callable[[], Iterable[str]]) -> Callable[[], Iterable[str]]:
+        self._coletores.append(funcao)
+        return funcao
+
+    def renderizar(self) -> str:
+        linhas = []
+        for metrica in self._metricas:
+            linhas.extend(metrica.linhas())
+        for coletor in self._coletores:
+            linhas.extend(coletor())
+        return "\n".join(linhas) + "\n"
+
+
+def serie(nome: str, tipo: str, ajuda: str, valores: Iterable[tuple[dict, Optional[float]]]) -> list[str]:
+    """Linhas de uma métrica calculada na hora (para coletores). Valores None são omitidos."""
+    saida = [f"# HELP {nome} {ajuda}", f"# TYPE {nome} {tipo}"]
+    for rotulos, valor in valores:
+        if valor is not None:
+            saida.append(f"{nome}{_rotulos(tuple(rotulos), tuple(rotulos.values()))} {_formatar(valor)}")
+    return saida
+
+
+registro = RegistroMetricas()
+
+# ----- HTTP -----
+
+requisicoes = registro.registrar(Contador(
+    "http_requisicoes_total", "Requisições HTTP por método, rota e status.", ("metodo", "rota", "status")))
+duracao_requisicao = registro.registrar(Histograma(
+    "http_requisicao_duracao_segundos", "Latência das requisições HTTP até o fim da resposta.", rotulos=("metodo", "rota")))
+em_andamento = registro.registrar(Medidor(
+    "http_requisicoes_em_andamento", "Requisições HTTP sendo atendidas agora."))
+
+# ----- domínio -----
+
+_BUCKETS_PLANOS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+planos_precificados = registro.registrar(Histograma(
+    "cotacao_planos_precificados", "Planos candidatos precificados por cotação (família).", _BUCKETS_PLANOS))
+planos_retornados = registro.registrar(Histograma(
+    "cotacao_planos_retornados", "Planos com preço devolvidos por cotação (família).", _BUCKETS_PLANOS))
+pdf_segundos = registro.registrar(Histograma(
+    "pdf_geracao_segundos", "Tempo de geração de PDF de cotação (fila do pool incluída).",
+    (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0), ("modo",)))
+pdf_bytes = registro.registrar(Histograma(
+    "pdf_bytes", "Tamanho dos PDFs gerados.",
+    (16 * 1024, 64 * 1024, 256 * 1024, 1024 * 1024, 4 * 1024 * 1024, 16 * 1024 * 1024), ("modo",)))
+
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI puro (sem BaseHTTPMiddleware, que bufferiza o corpo):
+    conta a requisição em andamento, guarda o status de http.response.start
+    e, quando a resposta termina de ser enviada, registra latência e status
+    com o caminho da rota ("/api/v1/planos/{plano_id}"), não a URL crua.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            await send(mensagem)
+
+        em_andamento.somar(1)
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracao = time.perf_counter() - inicio
+            em_andamento.somar(-1)
+            # O FastAPI guarda a rota encontrada no próprio scope
+            rota = scope.get("route")
+            caminho = getattr(rota, "path", None) or "desconhecida"
+            metodo = scope["method"]
+            duracao_requisicao.observar(duracao, metodo, caminho)
+            requisicoes.inc(1, metodo, caminho, str(status))
@@ -0,0 +1,258 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+from app.services.catalog_cache import catalogo
+from app.services.compressao import etag_sem_codificacao
+from app.services.metricas import registro, serie
+from app.services.pdf_generator import VERSAO_TEMPLATE, data_por_extenso
+
+# Limite do cache em memória por worker (MB)
+PDF_CACHE_MAX_MB = float(os.getenv("PDF_CACHE_MAX_MB", "64"))
+# Diretório para os PDFs que saem da memória (vazio = sem disco). Pode ser
+# compartilhado entre workers: a chave é a mesma para o mesmo conteúdo.
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR") or None
+PDF_CACHE_DISCO_MAX_MB = float(os.getenv("PDF_CACHE_DISCO_MAX_MB", "512"))
+
+
+def digesto_resultado(resultado: dict) -> str:
+    """Hash do conteúdo de um resultado de cotação (para quando não há versão do plano)."""
+    texto = json.dumps(resultado, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(texto.encode()).hexdigest()
+
+
+def chave_pdf(planos: Iterable[tuple[int, object]], idades: list[int], desconto_percentual: float) -> str:
+    """
+    Chave do PDF: hash de (planos com sua versão no catálogo, idades na ordem
+    informada, desconto, versão do template, data impressa no rodapé). A
+    tabela de beneficiários segue essa ordem, então ela entra na chave como
+    veio. `planos` são pares (plano_id, versão) ou (plano_id, digesto do resultado).
+    """
+    partes = {
+        "planos": sorted([pid, str(versao)] for pid, versao in planos),
+        "idades": list(idades),
+        "desconto": round(float(desconto_percentual or 0), 4),
+        "template": VERSAO_TEMPLATE,
+        "data": data_por_extenso(),
+    }
+    return hashlib.sha256(json.dumps(partes, sort_keys=True).encode()).hexdigest()
+
+
+def etag(chave: str) -> str:
+    return f'"{chave}"'
+
+
+def etag_confere(if_none_match: Optional[str], chave: str) -> bool:
+    """Compara o If-None-Match do cliente com o ETag da chave (aceita lista e "*")."""
+    if not if_none_match:
+        return False
+    alvo = etag(chave)
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato.startswith("W/"):
+            candidato = candidato[2:]
+        # O ETag que o cliente tem pode ser o da resposta comprimida
+        if etag_sem_codificacao(candidato) in (alvo, "*"):
+            return True
+    return False
+
+
+class CachePdf:
+    """
+    LRU de PDFs prontos, limitado em bytes. O que sai da memória vai para
+    PDF_CACHE_DIR (se configurado), também limitado em bytes.
+
+    Cada entrada lembra os planos que contém: quando o catálogo recarrega um
+    plano, as entradas com ele são descartadas (memória e disco). Como a chave
+    inclui a versão de cada plano, uma entrada antiga também nunca seria
+    encontrada; o descarte só libera o espaço mais cedo.
+    """
+
+    def __init__(self, max_bytes: int = int(PDF_CACHE_MAX_MB * 1024 * 1024), diretorio: Optional[str] = PDF_CACHE_DIR,
+                 disco_max_bytes: int = int(PDF_CACHE_DISCO_MAX_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes
+        self.diretorio = diretorio
+        self.disco_max_bytes = disco_max_bytes
+        self._memoria: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._disco: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes_disco = 0
+        self._planos: dict[str, tuple[int, ...]] = {}
+        self._por_plano: dict[int, set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.hits_disco = 0
+        self.misses = 0
+        if self.diretorio:
+            os.makedirs(self.diretorio, exist_ok=True)
+            self._indexar_disco()
+
+    # ----- leitura / escrita -----
+
+    def obter(self, chave: str) -> Optional[bytes]:
+        with self._lock:
+            conteudo = self._memoria.get(chave)
+            if conteudo is not None:
+                self._memoria.move_to_end(chave)
+                self.hits += 1
+                return conteudo
+            if chave not in self._disco:
+                self.misses += 1
+                return None
+        try:
+            with open(self._arquivo(chave), "rb") as f:
+                conteudo = f.read()
+        except OSError:
+            with self._lock:
+                self._remover_disco(chave)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits_disco += 1
+            # O arquivo continua no disco como cópia: ao sair da memória não precisa ser regravado
+            if chave in self._disco:
+                self._disco.move_to_end(chave)
+            self._guardar_memoria(chave, conteudo)
+        return conteudo
+
+    def guardar(self, chave: str, plano_ids: Iterable[int], conteudo: bytes) -> None:
+        if len(conteudo) > self.max_bytes:
+            return
+        with self._lock:
+            self._indexar_planos(chave, tuple(plano_ids))
+            self._guardar_memoria(chave, conteudo)
+
+    # ----- invalidação -----
+
+    def invalidar_planos(self, plano_ids: Optional[Iterable[int]] = None) -> None:
+        """Descarta as entradas com algum dos planos (None = tudo)."""
+        with self._lock:
+            if plano_ids is None:
+                chaves = set(self._memoria) | set(self._disco)
+            else:
+                chaves = set()
+                for pid in plano_ids:
+                    chaves |= self._por_plano.get(pid, set())
+            for chave in chaves:
+                conteudo = self._memoria.pop(chave, None)
+                if conteudo is not None:
+                    self._bytes -= len(conteudo)
+                self._remover_disco(chave)
+                self._desindexar_planos(chave)
+
+    def estatisticas(self) -> dict:
+        total = self.hits + self.hits_disco + self.misses
+        return {
+            "itens_memoria": len(self._memoria),
+            "bytes_memoria": self._bytes,
+            "itens_disco": len(self._disco),
+            "bytes_disco": self._bytes_disco,
+            "hits": self.hits,
+            "hits_disco": self.hits_disco,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.hits_disco) / total, 4) if total else None,
+        }
+
+    # ----- internos (chamados com o lock) -----
+
+    def _guardar_memoria(self, chave: str, conteudo: bytes) -> None:
+        anterior = self._memoria.pop(chave, None)
+        if anterior is not None:
+            self._bytes -= len(anterior)
+        self._memoria[chave] = conteudo
+        self._bytes += len(conteudo)
+        while self._bytes > self.max_bytes:
+            antiga, dados = self._memoria.popitem(last=False)
+            self._bytes -= len(dados)
+            if antiga in self._disco:
+                self._disco.move_to_end(antiga)
+            elif self.diretorio:
+                self._guardar_disco(antiga, dados)
+            else:
+                self._desindexar_planos(antiga)
+
+    def _arquivo(self, chave: str) -> str:
+        return os.path.join(self.diretorio, f"{chave}.pdf")
+
+    def _guardar_disco(self, chave: str, conteudo: bytes) -> None:
+        if len(conteudo) > self.disco_max_bytes:
+            self._desindexar_planos(chave)
+            return
+        try:
+            # Escrita atômica: outro worker pode estar lendo o mesmo diretório
+            fd, temporario = tempfile.mkstemp(dir=self.diretorio, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(conteudo)
+            os.replace(temporario, self._arquivo(chave))
+        except OSError:
+            self._desindexar_planos(chave)
+            return
+        self._disco[chave] = len(conteudo)
+        self._bytes_disco += len(conteudo)
+        while self._bytes_disco > self.disco_max_bytes:
+            self._remover_disco(next(iter(self._disco)))
+
+    def _remover_disco(self, chave: str, apagar: bool = True) -> None:
+        tamanho = self._disco.pop(chave, None)
+        if tamanho is None:
+            return
+        self._bytes_disco -= tamanho
+        if apagar:
+            if chave not in self._memoria:
+                self._desindexar_planos(chave)
+            try:
+                os.remove(self._arquivo(chave))
+            except OSError:
+                pass
+
+    def _indexar_disco(self) -> None:
+        # PDFs deixados por execuções anteriores: sem índice de planos, saem por LRU
+        arquivos = []
+        for nome in os.listdir(self.diretorio):
+            if nome.endswith(".pdf"):
+                caminho = os.path.join(self.diretorio, nome)
+                try:
+                    estado = os.stat(caminho)
+                except OSError:
+                    continue
+                arquivos.append((estado.st_mtime, nome[:-4], estado.st_size))
+        for _, chave, tamanho in sorted(arquivos):
+            self._disco[chave] = tamanho
+            self._bytes_disco += tamanho
+        while self._bytes_disco > self.disco_max_bytes:
+            self._remover_disco(next(iter(self._disco)))
+
+    def _indexar_planos(self, chave: str, plano_ids: tuple[int, ...]) -> None:
+        self._desindexar_planos(chave)
+        self._planos[chave] = plano_ids
+        for pid in plano_ids:
+            self._por_plano.setdefault(pid, set()).add(chave)
+
+    def _desindexar_planos(self, chave: str) -> None:
+        for pid in self._planos.pop(chave, ()):
+            chaves = self._por_plano.get(pid)
+            if chaves is not None:
+                chaves.discard(chave)
+                if not chaves:
+                    del self._por_plano[pid]
+
+
+# Instância única por processo (worker)
+cache_pdf = CachePdf()
+catalogo.ao_alterar(cache_pdf.invalidar_planos)
+
+
+@registro.coletor
+def _metricas_cache_pdf():
+    est = cache_pdf.estatisticas()
+    return (
+        serie("pdf_cache_consultas_total", "counter", "Consultas ao cache de PDF por resultado.",
+              [({"resultado": r}, est[r]) for r in ("hits", "hits_disco", "misses")])
+        + serie("pdf_cache_hit_ratio", "gauge", "Fração das consultas ao cache de PDF atendidas (memória ou disco).",
+                [({}, est["hit_ratio"])])
+        + serie("pdf_cache_bytes", "gauge", "Bytes de PDF guardados no cache.",
+                [({"local": "memoria"}, est["bytes_memoria"]), ({"local": "disco"}, est["bytes_disco"])])
+    )
@@ -1,466 +1,507 @@
-from reportlab.lib.pagesizes import letter, A4
+from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch, cm
+from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
 from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from reportlab.lib.enums import TA_CENTER
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from io import BytesIO
 from datetime import datetime
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Iterator, Optional
 
+# Suba sempre que o layout mudar: faz parte da chave do cache de PDFs
+VERSAO_TEMPLATE = 1
 
-def gerar_pdf_cotacao(dados_cotacao: dict, idades: list[int]) -> BytesIO:
+MESES = ("janeiro", "fevereiro", "março", "abril", "maio", "junho", "julho",
+         "agosto", "setembro", "outubro", "novembro", "dezembro")
+
+
+def formatar_moeda(valor: float) -> str:
+    return f"R$ {valor:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+
+
+def data_por_extenso(quando: Optional[datetime] = None) -> str:
+    quando = quando or datetime.now()
+    return f"{quando.day:02d} de {MESES[quando.month - 1]} de {quando.year}"
+
+
+class TemplateCotacao:
     """
-    Gera um PDF profissional com layout moderno e responsivo
+    Template do PDF de cotação, compilado uma vez por processo.
+
+    Guarda a paleta, todos os ParagraphStyle/TableStyle, os textos fixos e
+    as larguras das colunas. Os flowables são criados a cada documento,
+    inclusive os de texto fixo: o ReportLab guarda estado de layout neles
+    (quebras de frame, _postponed), e um flowable reaproveitado leva esse
+    estado para o PDF seguinte ou para outra thread.
+
+    Nas listas longas (hospitais, ícone ✓) o texto que cabe em uma linha vai
+    para a célula como string, formatada pelo TableStyle, sem passar pelo
+    parser e pela quebra de linhas do Paragraph.
     """
-    buffer = BytesIO()
-    # Margens ajustadas para layout proporcional
-    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=20, bottomMargin=20, leftMargin=20, rightMargin=20)
-    elements = []
-    
-    # ===== PALETA DE CORES =====
-    blue_primary = colors.HexColor('#0052cc')
-    blue_dark = colors.HexColor('#003a9e')
-    blue_light = colors.HexColor('#f0f4ff')
-    green_success = colors.HexColor('#10b981')
-    yellow_warning = colors.HexColor('#f59e0b')
-    red_alert = colors.HexColor('#ef4444')
-    slate900 = colors.HexColor('#1a202c')
-    slate700 = colors.HexColor('#4a5568')
-    slate500 = colors.HexColor('#6b7280')
-    slate300 = colors.HexColor('#d1d5db')
-    slate100 = colors.HexColor('#f8f9fa')
-    white = colors.HexColor('#ffffff')
-    
+
+    def __init__(self):
+        # ===== PALETA DE CORES =====
+        self.blue_primary = colors.HexColor('#0052cc')
+        self.blue_dark = colors.HexColor('#003a9e')
+        self.blue_light = colors.HexColor('#f0f4ff')
+        self.green_success = colors.HexColor('#10b981')
+        self.yellow_warning = colors.HexColor('#f59e0b')
+        self.slate900 = colors.HexColor('#1a202c')
+        self.slate700 = colors.HexColor('#4a5568')
+        self.slate300 = colors.HexColor('#d1d5db')
+        self.slate100 = colors.HexColor('#f8f9fa')
+        self.white = colors.HexColor('#ffffff')
+
+        self._compilar_estilos()
+        self._compilar_estilos_tabela()
+        self._compilar_textos_fixos()
+
     # ===== ESTILOS =====
-    styles = getSampleStyleSheet()
-    
-    header_title = ParagraphStyle(
-        'HeaderTitle',
-        parent=styles['Heading1'],
-        fontSize=28,
-        textColor=blue_dark,  # usar azul escuro para aparecer em fundo claro
-        spaceAfter=10,
-        fontName='Helvetica-Bold'
-    )
-    
-    header_subtitle = ParagraphStyle(
-        'HeaderSubtitle',
-        parent=styles['Normal'],
-        fontSize=12,
-        textColor=white,
-        spaceAfter=5,
-        fontName='Helvetica'
-    )
-    
-    section_title = ParagraphStyle(
-        'SectionTitle',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=slate900,
-        spaceAfter=12,
-        spaceBefore=15,
-        fontName='Helvetica-Bold',
-        borderColor=slate300,
-        borderPadding=8
-    )
-    
-    normal_style = styles['Normal']
-    normal_style.fontSize = 11
-    normal_style.textColor = slate900
-    
-    small_style = ParagraphStyle(
-        'Small',
-        parent=normal_style,
-        fontSize=9,
-        textColor=slate700
-    )
-    
-    # Estilos adicionais para cards de preço
-    price_label = ParagraphStyle(
-        'PriceLabel',
-        parent=normal_style,
-        fontSize=9,
-        textColor=colors.HexColor('#666666'),
-        fontName='Helvetica-Bold'
-    )
-    
-    price_value_blue = ParagraphStyle(
-        'PriceValueBlue',
-        parent=normal_style,
-        fontSize=18,
-        textColor=blue_primary,
-        fontName='Helvetica-Bold'
-    )
-    
-    price_value_green = ParagraphStyle(
-        'PriceValueGreen',
-        parent=normal_style,
-        fontSize=18,
-        textColor=green_success,
-        fontName='Helvetica-Bold'
-    )
-    
-    price_small = ParagraphStyle(
-        'PriceSmall',
-        parent=normal_style,
-        fontSize=8,
-        textColor=colors.HexColor('#999999')
-    )
-    
-    attention_style = ParagraphStyle(
-        'Attention',
-        parent=normal_style,
-        fontSize=10,
-        textColor=colors.HexColor('#92400e')
-    )
-    
-    
-    # ===== HEADER COM FUNDO AZUL =====
-    header_content = []
-    
-    # Título principal
-    header_content.append(Paragraph("Cotação de Plano de Saúde", header_title))
-    
-    # Data e beneficiários
-    data_geracao = datetime.now().strftime("%d de %B de %Y").replace('January', 'janeiro').replace('February', 'fevereiro').replace('March', 'março').replace('April', 'abril').replace('May', 'maio').replace('June', 'junho').replace('July', 'julho').replace('August', 'agosto').replace('September', 'setembro').replace('October', 'outubro').replace('November', 'novembro').replace('December', 'dezembro')
-    header_content.append(Paragraph(f"Data: <b>{data_geracao}</b>", header_subtitle))
-    
-    # Info do operador (será adicionada para cada resultado)
-    
-    # Tabela para o header com fundo azul
-    header_table = Table([
-        [Spacer(1, 5)],
-        [Paragraph("&nbsp;".join(p.text for p in header_content), header_subtitle)],
-        [Spacer(1, 5)]
-    ], colWidths=[7.5*inch])
-    
-    header_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), blue_dark),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('LEFTPADDING', (0, 0), (-1, -1), 30),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 30),
-        ('TOPPADDING', (0, 0), (-1, -1), 25),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 25),
-    ]))
-    
-    # Criar header simplificado (sem estilos inline)
-    elements.append(Paragraph("Cotação de Plano de Saúde", header_title))
-    elements.append(Spacer(1, 8))
-    elements.append(Paragraph(f"📅 Data: <b>{data_geracao}</b>", small_style))
-    elements.append(Spacer(1, 15))
-    
-    # ===== RESULTADOS =====
-    desconto_pct = float(dados_cotacao.get('desconto_percentual') or 0)
-    
-    if not dados_cotacao.get('resultados'):
-        elements.append(Paragraph("Nenhum plano encontrado com os critérios selecionados.", normal_style))
-    else:
-        for idx, resultado in enumerate(dados_cotacao['resultados'], 1):
-            # Separador de página se não for o primeiro
-            if idx > 1:
-                elements.append(PageBreak())
-            
-            # ===== CABEÇALHO DO PLANO =====
-            preco_total = float(resultado['preco_total'])
-            
-            # Calcular desconto total
-            total_desc_num = 0.0
-            if desconto_pct and desconto_pct > 0 and resultado.get('beneficiarios'):
+    def _compilar_estilos(self):
+        base = getSampleStyleSheet()
+
+        self.header_title = ParagraphStyle(
+            'HeaderTitle',
+            parent=base['Heading1'],
+            fontSize=28,
+            textColor=self.blue_dark,  # usar azul escuro para aparecer em fundo claro
+            spaceAfter=10,
+            fontName='Helvetica-Bold'
+        )
+
+        self.section_title = ParagraphStyle(
+            'SectionTitle',
+            parent=base['Heading2'],
+            fontSize=14,
+            textColor=self.slate900,
+            spaceAfter=12,
+            spaceBefore=15,
+            fontName='Helvetica-Bold',
+            borderColor=self.slate300,
+            borderPadding=8
+        )
+
+        # Estilo próprio em vez de alterar o styles['Normal'] compartilhado
+        self.normal_style = ParagraphStyle('CotacaoNormal', parent=base['Normal'], fontSize=11, textColor=self.slate900)
+        normal = self.normal_style
+
+        self.small_style = ParagraphStyle('Small', parent=normal, fontSize=9, textColor=self.slate700)
+
+        # Estilos dos cards de preço
+        self.price_label = ParagraphStyle('PriceLabel', parent=normal, fontSize=9, textColor=colors.HexColor('#666666'), fontName='Helvetica-Bold')
+        self.price_value_blue = ParagraphStyle('PriceValueBlue', parent=normal, fontSize=18, textColor=self.blue_primary, fontName='Helvetica-Bold')
+        self.price_value_green = ParagraphStyle('PriceValueGreen', parent=normal, fontSize=18, textColor=self.green_success, fontName='Helvetica-Bold')
+        self.price_small = ParagraphStyle('PriceSmall', parent=normal, fontSize=8, textColor=colors.HexColor('#999999'))
+
+        self.attention_style = ParagraphStyle('Attention', parent=normal, fontSize=10, textColor=colors.HexColor('#92400e'))
+
+        # Antes eram ParagraphStyle('') criados dentro dos laços
+        self.plan_title = ParagraphStyle('PlanTitle', parent=normal, fontSize=14, textColor=self.white, fontName='Helvetica-Bold')
+        self.plan_subtitle = ParagraphStyle('PlanSubtitle', parent=normal, fontSize=10, textColor=self.white)
+        self.check_style = ParagraphStyle('Check', parent=normal, textColor=self.green_success, fontSize=14)
+        self.link_style = ParagraphStyle('Link', parent=normal, textColor=self.blue_primary, fontSize=11)
+        self.footer_style = ParagraphStyle('Footer', parent=normal, fontSize=9, textColor=self.slate700, alignment=TA_CENTER)
+        self.footer_small = ParagraphStyle('FooterSmall', parent=normal, fontSize=8, textColor=colors.grey, alignment=TA_CENTER)
+
+    def _compilar_estilos_tabela(self):
+        self.ts_header_plano = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), self.blue_dark),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 15),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 15),
+            ('TOPPADDING', (0, 0), (-1, -1), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+        ])
+
+        self.ts_precos = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.Color(0.98, 0.98, 1.0)),
+            ('BACKGROUND', (0, 1), (-1, 1), colors.Color(0.98, 0.98, 1.0)),
+            ('BACKGROUND', (0, 2), (-1, 2), colors.Color(0.98, 0.98, 1.0)),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 12),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 12),
+            ('TOPPADDING', (0, 0), (-1, -1), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+            ('BORDER', (0, 0), (-1, -1), 0.5, self.slate300),
+            ('LEFTBORDER', (0, 0), (0, -1), 4, self.blue_primary),
+            ('LEFTBORDER', (1, 0), (1, -1), 4, self.blue_primary),
+            ('LEFTBORDER', (2, 0), (2, -1), 4, self.green_success),
+        ])
+
+        self.ts_beneficiarios = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), self.blue_primary),
+            ('TEXTCOLOR', (0, 0), (-1, 0), self.white),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 9),
+            ('TOPPADDING', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+            ('BACKGROUND', (0, 1), (-1, -1), self.blue_light),
+            ('GRID', (0, 0), (-1, -1), 0.5, self.slate300),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [self.blue_light, self.white]),
+        ])
+
+        self.ts_celula_carencia = TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ])
+
+        self.ts_carencias = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), self.blue_light),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('BORDER', (0, 0), (-1, -1), 1, colors.HexColor('#d4dcff')),
+            ('TOPPADDING', (0, 0), (-1, -1), 15),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 15),
+        ])
+
+        # Linha com ✓ (coparticipações, hospitais e municípios)
+        comum_item = [
+            ('BACKGROUND', (0, 0), (-1, -1), self.slate100),
+            ('ALIGN', (0, 0), (0, 0), 'CENTER'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 10),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 10),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('BORDER', (0, 0), (-1, -1), 0.5, self.slate300),
+            ('LEFTBORDER', (0, 0), (-1, -1), 3, self.blue_primary),
+        ]
+        # O ✓ é uma string na primeira célula, com a fonte do antigo estilo "Check"
+        comum_item += [
+            ('FONTNAME', (0, 0), (0, 0), self.check_style.fontName),
+            ('FONTSIZE', (0, 0), (0, 0), self.check_style.fontSize),
+            ('LEADING', (0, 0), (0, 0), self.check_style.leading),
+            ('TEXTCOLOR', (0, 0), (0, 0), self.check_style.textColor),
+        ]
+        self.ts_item_meio = TableStyle(comum_item + [('VALIGN', (0, 0), (-1, -1), 'MIDDLE')])
+        self.ts_item_topo = TableStyle(comum_item + [('VALIGN', (0, 0), (-1, -1), 'TOP')])
+
+        # Nome em negrito e endereço em texto pequeno (quando vão como string)
+        self.ts_hospital = TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('FONTNAME', (0, 0), (0, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (0, 0), self.normal_style.fontSize),
+            ('LEADING', (0, 0), (0, 0), self.normal_style.leading),
+            ('TEXTCOLOR', (0, 0), (0, 0), self.normal_style.textColor),
+            ('FONTNAME', (0, 1), (0, 1), self.small_style.fontName),
+            ('FONTSIZE', (0, 1), (0, 1), self.small_style.fontSize),
+            ('LEADING', (0, 1), (0, 1), self.small_style.leading),
+            ('TEXTCOLOR', (0, 1), (0, 1), self.small_style.textColor),
+        ])
+        # Largura útil da célula do hospital (7.0in menos o padding padrão de 6pt de cada lado)
+        self.largura_texto_hospital = 7.0*inch - 12
+
+        self.ts_rodape = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), self.slate100),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('TOPPADDING', (0, 0), (-1, -1), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+            ('BORDER', (0, 0), (-1, -1), 0.5, self.slate300),
+        ])
+
+        self.ts_atencao = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#fef3c7')),
+            ('LEFTPADDING', (0, 0), (-1, -1), 12),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 12),
+            ('TOPPADDING', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+            ('BORDER', (0, 0), (-1, -1), 1.5, self.yellow_warning),
+            ('LEFTBORDER', (0, 0), (-1, -1), 4, self.yellow_warning),
+        ])
+
+    def _compilar_textos_fixos(self):
+        self.rotulos_precos = ("VALOR TOTAL", "DESCONTO APLICADO", "VALOR FINAL")
+        self.largura_precos = [2.3*inch, 2.3*inch, 2.3*inch]
+        self.texto_atencao = "💡 <b>Atenção:</b> Preço válido para o período de cobertura conforme especificado. Consulte os prazos de carência antes de contratar."
+
+        self.cabecalho_beneficiarios = ['Idade', 'Faixa Etária', 'Valor']
+        self.cabecalho_beneficiarios_desconto = ['Idade', 'Faixa Etária', 'Valor Base', 'Desconto', 'Valor Final']
+        self.largura_beneficiarios = [1.5*inch, 2.0*inch, 2.0*inch]
+        self.largura_beneficiarios_desconto = [1.0*inch, 1.5*inch, 1.5*inch, 1.5*inch, 1.5*inch]
+
+        self.largura_item = [0.4*inch, 7.1*inch]
+        self.texto_rede = "Acesse a plataforma para visualizar a lista completa de hospitais, clínicas e laboratórios parceiros:"
+        self.texto_nenhum_plano = "Nenhum plano encontrado com os critérios selecionados."
+        self.texto_validade = "Esta cotação é válida por 7 dias. Depois disso, solicite uma nova cotação."
+
+    # ===== MONTAGEM POR REQUISIÇÃO =====
+    def rodape(self, data_geracao: str) -> Table:
+        tabela = Table([
+            [Paragraph("📄 Documento gerado automaticamente pelo Sistema de Cotação em " + data_geracao, self.footer_style)],
+            [Paragraph(self.texto_validade, self.footer_small)]
+        ], colWidths=[7.5*inch])
+        tabela.setStyle(self.ts_rodape)
+        return tabela
+
+    def _titulo_secao(self, nome: str) -> Paragraph:
+        return Paragraph(nome, self.section_title)
+
+    def cabecalho(self, data_geracao: str) -> list:
+        return [
+            Paragraph("Cotação de Plano de Saúde", self.header_title),
+            Spacer(1, 8),
+            Paragraph(f"📅 Data: <b>{data_geracao}</b>", self.small_style),
+            Spacer(1, 15),
+        ]
+
+    def _texto_celula(self, texto: str, estilo: ParagraphStyle, fonte: str, largura: float):
+        """String pura se o texto não tem marcação e cabe em uma linha; senão Paragraph."""
+        if '<' not in texto and '&' not in texto and stringWidth(texto, fonte, estilo.fontSize) <= largura:
+            return texto
+        return Paragraph(f"<b>{texto}</b>" if fonte == 'Helvetica-Bold' else texto, estilo)
+
+    def _item(self, conteudo, estilo: TableStyle) -> Table:
+        tabela = Table([["✓", conteudo]], colWidths=self.largura_item)
+        tabela.setStyle(estilo)
+        return tabela
+
+    def secao_plano(self, resultado: dict, desconto_pct: float) -> list:
+        """Flowables de um plano (cabeçalho, preços, beneficiários, carências, rede...)."""
+        elements = []
+
+        # ===== CABEÇALHO DO PLANO =====
+        preco_total = float(resultado['preco_total'])
+
+        # Calcular desconto total
+        total_desc_num = 0.0
+        if desconto_pct and desconto_pct > 0 and resultado.get('beneficiarios'):
+            for ben in resultado['beneficiarios']:
+                valor_num = float(ben['valor'])
+                total_desc_num += max(0.0, valor_num - (valor_num * desconto_pct / 100.0))
+        else:
+            total_desc_num = preco_total
+
+        valor_economizado = preco_total - total_desc_num
+
+        operadora = resultado.get('operadora', 'N/A')
+        plano = resultado.get('plano', 'N/A')
+        num_beneficiarios = len(resultado.get('beneficiarios', []))
+
+        header_plan = Table([[
+            Paragraph(f"<b>{operadora}</b> — {plano}", self.plan_title),
+            Paragraph(f"Beneficiários: {num_beneficiarios} pessoa{'s' if num_beneficiarios > 1 else ''}", self.plan_subtitle)
+        ]], colWidths=[7.5*inch])
+        header_plan.setStyle(self.ts_header_plano)
+
+        elements.append(header_plan)
+        elements.append(Spacer(1, 15))
+
+        # ===== CARDS DE PREÇO =====
+        price_table = Table([
+            [Paragraph(rotulo, self.price_label) for rotulo in self.rotulos_precos],
+            [
+                Paragraph(formatar_moeda(preco_total), self.price_value_blue),
+                Paragraph(f"-{desconto_pct:.0f}%", self.price_value_green),
+                Paragraph(formatar_moeda(total_desc_num), self.price_value_green)
+            ],
+            [
+                Paragraph("sem desconto", self.price_small),
+                Paragraph(f"economize {formatar_moeda(valor_economizado)}", self.price_small),
+                Paragraph("Melhor preço", self.price_small)
+            ]
+        ], colWidths=self.largura_precos)
+        price_table.setStyle(self.ts_precos)
+
+        elements.append(price_table)
+        elements.append(Spacer(1, 20))
+
+        caixa_atencao = Table([[Paragraph(self.texto_atencao, self.attention_style)]], colWidths=[7.5*inch])
+        caixa_atencao.setStyle(self.ts_atencao)
+        elements.append(caixa_atencao)
+        elements.append(Spacer(1, 20))
+
+        # ===== TABELA DE BENEFICIÁRIOS =====
+        if resultado.get('beneficiarios'):
+            elements.append(self._titulo_secao("Detalhamento por Beneficiário"))
+
+            if desconto_pct and desconto_pct > 0:
+                data = [self.cabecalho_beneficiarios_desconto]
                 for ben in resultado['beneficiarios']:
                     valor_num = float(ben['valor'])
-                    total_desc_num += max(0.0, valor_num - (valor_num * desconto_pct / 100.0))
+                    desconto_val = valor_num * desconto_pct / 100.0
+                    valor_desc = max(0.0, valor_num - desconto_val)
+                    data.append([str(ben['idade']), ben['faixa_etaria_usada'], formatar_moeda(ben['valor']),
+                                 formatar_moeda(desconto_val), formatar_moeda(valor_desc)])
+                colwidths = self.largura_beneficiarios_desconto
             else:
-                total_desc_num = preco_total
-            
-            valor_economizado = preco_total - total_desc_num
-            
-            # Cabeçalho azul escuro
-            operadora = resultado.get('operadora', 'N/A')
-            plano = resultado.get('plano', 'N/A')
-            num_beneficiarios = len(resultado.get('beneficiarios', []))
-            
-            elementos_header = [
-                Paragraph(f"<b>{operadora}</b> — {plano}", ParagraphStyle('', parent=styles['Normal'], fontSize=14, textColor=white, fontName='Helvetica-Bold')),
-                Paragraph(f"Beneficiários: {num_beneficiarios} pessoa{'s' if num_beneficiarios > 1 else ''}", ParagraphStyle('', parent=styles['Normal'], fontSize=10, textColor=white))
-            ]
-            
-            header_plan = Table([elementos_header], colWidths=[7.5*inch])
-            header_plan.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, -1), blue_dark),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 15),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 15),
-                ('TOPPADDING', (0, 0), (-1, -1), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ]))
-            
-            elements.append(header_plan)
-            elements.append(Spacer(1, 15))
-            
-            # ===== CARDS DE PREÇO =====
-            preco_fmt = f"R$ {preco_total:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-            desconto_fmt = f"R$ {valor_economizado:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-            final_fmt = f"R$ {total_desc_num:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-            
-            # Criar cards sem HTML inline styles
-            preco_cards = [
-                [
-                    Paragraph("VALOR TOTAL", price_label) if Paragraph else "",
-                    Paragraph("DESCONTO APLICADO", price_label) if Paragraph else "",
-                    Paragraph("VALOR FINAL", price_label) if Paragraph else ""
-                ],
-                [
-                    Paragraph(preco_fmt, price_value_blue),
-                    Paragraph(f"-{desconto_pct:.0f}%", price_value_green),
-                    Paragraph(final_fmt, price_value_green)
-                ],
-                [
-                    Paragraph("sem desconto", price_small),
-                    Paragraph(f"economize {desconto_fmt}", price_small),
-                    Paragraph("Melhor preço", price_small)
-                ]
-            ]
-            
-            price_table = Table(preco_cards, colWidths=[2.3*inch, 2.3*inch, 2.3*inch])
-            price_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.Color(0.98, 0.98, 1.0)),
-                ('BACKGROUND', (0, 1), (-1, 1), colors.Color(0.98, 0.98, 1.0)),
-                ('BACKGROUND', (0, 2), (-1, 2), colors.Color(0.98, 0.98, 1.0)),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 12),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 12),
-                ('TOPPADDING', (0, 0), (-1, -1), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-                ('BORDER', (0, 0), (-1, -1), 0.5, slate300),
-                ('LEFTBORDER', (0, 0), (0, -1), 4, blue_primary),
-                ('LEFTBORDER', (1, 0), (1, -1), 4, blue_primary),
-                ('LEFTBORDER', (2, 0), (2, -1), 4, green_success),
-            ]))
-            
-            
-            elements.append(price_table)
-            elements.append(Spacer(1, 20))
-            
-            # ===== DESTAQUE (ATENÇÃO) =====
-            elements.append(Table([
-                [Paragraph("💡 <b>Atenção:</b> Preço válido para o período de cobertura conforme especificado. Consulte os prazos de carência antes de contratar.", attention_style)]
-            ], colWidths=[7.5*inch]).setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#fef3c7')),
-                ('LEFTPADDING', (0, 0), (-1, -1), 12),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 12),
-                ('TOPPADDING', (0, 0), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-                ('BORDER', (0, 0), (-1, -1), 1.5, yellow_warning),
-                ('LEFTBORDER', (0, 0), (-1, -1), 4, yellow_warning),
-            ])))
-            
-            elements.append(Spacer(1, 20))
-            
-            # ===== TABELA DE BENEFICIÁRIOS =====
-            if resultado.get('beneficiarios'):
-                elements.append(Paragraph("Detalhamento por Beneficiário", section_title))
-                
-                if desconto_pct and desconto_pct > 0:
-                    data = [['Idade', 'Faixa Etária', 'Valor Base', 'Desconto', 'Valor Final']]
-                else:
-                    data = [['Idade', 'Faixa Etária', 'Valor']]
-                
+                data = [self.cabecalho_beneficiarios]
                 for ben in resultado['beneficiarios']:
-                    valor_formatado = f"R$ {ben['valor']:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-                    
-                    if desconto_pct and desconto_pct > 0:
-                        valor_num = float(ben['valor'])
-                        desconto_val = valor_num * desconto_pct / 100.0
-                        valor_desc = max(0.0, valor_num - desconto_val)
-                        desconto_fmt = f"R$ {desconto_val:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-                        valor_desc_fmt = f"R$ {valor_desc:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-                        data.append([
-                            str(ben['idade']),
-                            ben['faixa_etaria_usada'],
-                            valor_formatado,
-                            desconto_fmt,
-                            valor_desc_fmt
-                        ])
-                    else:
-                        data.append([
-                            str(ben['idade']),
-                            ben['faixa_etaria_usada'],
-                            valor_formatado
-                        ])
-                
-                colwidths = [1.0*inch, 1.5*inch, 1.5*inch, 1.5*inch, 1.5*inch] if desconto_pct > 0 else [1.5*inch, 2.0*inch, 2.0*inch]
-                
-                table_ben = Table(data, colWidths=colwidths)
-                table_ben.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), blue_primary),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), white),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 9),
-                    ('TOPPADDING', (0, 0), (-1, 0), 10),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-                    ('BACKGROUND', (0, 1), (-1, -1), blue_light),
-                    ('GRID', (0, 0), (-1, -1), 0.5, slate300),
-                    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [blue_light, white]),
-                ]))
-                
-                elements.append(table_ben)
-                elements.append(Spacer(1, 15))
-            
-            # ===== CARÊNCIAS =====
-            if resultado.get('carencias'):
-                elements.append(Paragraph("Carências", section_title))
-                
-                # Cards de carências em grid
-                carencia_data = []
-                row = []
-                for i, car in enumerate(resultado['carencias']):
-                    dias_texto = Paragraph(f"<b>{car['dias']}</b>", normal_style)
-                    descricao_texto = Paragraph(car['descricao'], small_style)
-                    
-                    celula_content = Table([[dias_texto], [descricao_texto]], colWidths=[3.3*inch])
-                    celula_content.setStyle(TableStyle([
-                        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                    ]))
-                    row.append(celula_content)
-                    
-                    if (i + 1) % 2 == 0 or i == len(resultado['carencias']) - 1:
-                        carencia_data.append(row)
-                        row = []
-                
-                if row:
+                    data.append([str(ben['idade']), ben['faixa_etaria_usada'], formatar_moeda(ben['valor'])])
+                colwidths = self.largura_beneficiarios
+
+            table_ben = Table(data, colWidths=colwidths)
+            table_ben.setStyle(self.ts_beneficiarios)
+
+            elements.append(table_ben)
+            elements.append(Spacer(1, 15))
+
+        # ===== CARÊNCIAS =====
+        if resultado.get('carencias'):
+            elements.append(self._titulo_secao("Carências"))
+
+            # Cards de carências em grid (2 por linha)
+            carencia_data = []
+            row = []
+            for i, car in enumerate(resultado['carencias']):
+                celula_content = Table([
+                    [Paragraph(f"<b>{car['dias']}</b>", self.normal_style)],
+                    [Paragraph(car['descricao'], self.small_style)]
+                ], colWidths=[3.3*inch])
+                celula_content.setStyle(self.ts_celula_carencia)
+                row.append(celula_content)
+
+                if (i + 1) % 2 == 0 or i == len(resultado['carencias']) - 1:
                     carencia_data.append(row)
-                
-                carencia_widths = [3.5*inch] * len(row) if row else [3.5*inch] * 2
-                
-                carencia_table = Table(carencia_data, colWidths=carencia_widths)
-                carencia_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, -1), blue_light),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                    ('BORDER', (0, 0), (-1, -1), 1, colors.HexColor('#d4dcff')),
-                    ('TOPPADDING', (0, 0), (-1, -1), 15),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 15),
-                ]))
-                
-                elements.append(carencia_table)
-                elements.append(Spacer(1, 15))
-            
-            # ===== COPARTICIPAÇÕES =====
-            if resultado.get('coparticipacoes'):
-                elements.append(Paragraph("Coparticipação", section_title))
-                
-                for cop in resultado['coparticipacoes']:
-                    texto = f"<b>{cop.get('nome', 'N/A')}</b>"
-                    if cop.get('tipo_servico'):
-                        texto += f" - {cop['tipo_servico']}"
-                    if cop.get('percentual'):
-                        texto += f" ({cop['percentual']}%)"
-                    
-                    cop_para = Paragraph(texto, normal_style)
-                    cop_table = Table([[Paragraph("✓", ParagraphStyle('', parent=normal_style, textColor=green_success, fontSize=14)), cop_para]], colWidths=[0.4*inch, 7.1*inch])
-                    cop_table.setStyle(TableStyle([
-                        ('BACKGROUND', (0, 0), (-1, -1), slate100),
-                        ('ALIGN', (0, 0), (0, 0), 'CENTER'),
-                        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                        ('LEFTPADDING', (0, 0), (-1, -1), 10),
-                        ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-                        ('TOPPADDING', (0, 0), (-1, -1), 8),
-                        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-                        ('BORDER', (0, 0), (-1, -1), 0.5, slate300),
-                        ('LEFTBORDER', (0, 0), (-1, -1), 3, blue_primary),
-                    ]))
-                    elements.append(cop_table)
-                    elements.append(Spacer(1, 8))
-                
-                elements.append(Spacer(1, 7))
-            
-            # ===== HOSPITAIS =====
-            if resultado.get('hospitais'):
-                elements.append(Paragraph("Hospitais Credenciados", section_title))
-                
-                for hosp in resultado['hospitais']:
-                    hosp_nome = Paragraph(f"<b>{hosp['nome']}</b>", normal_style)
-                    hosp_endereco = Paragraph(hosp.get('endereco', ''), small_style) if hosp.get('endereco') else Paragraph("", small_style)
-                    
-                    hosp_para = Table([[hosp_nome], [hosp_endereco]], colWidths=[7.0*inch])
-                    hosp_para.setStyle(TableStyle([
-                        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                    ]))
-                    hosp_table = Table([[Paragraph("✓", ParagraphStyle('', parent=normal_style, textColor=green_success, fontSize=14)), hosp_para]], colWidths=[0.4*inch, 7.1*inch])
-                    hosp_table.setStyle(TableStyle([
-                        ('BACKGROUND', (0, 0), (-1, -1), slate100),
-                        ('ALIGN', (0, 0), (0, 0), 'CENTER'),
-                        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                        ('LEFTPADDING', (0, 0), (-1, -1), 10),
-                        ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-                        ('TOPPADDING', (0, 0), (-1, -1), 8),
-                        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-                        ('BORDER', (0, 0), (-1, -1), 0.5, slate300),
-                        ('LEFTBORDER', (0, 0), (-1, -1), 3, blue_primary),
-                    ]))
-                    elements.append(hosp_table)
-                    elements.append(Spacer(1, 8))
-                
-                elements.append(Spacer(1, 7))
-            
-            # ===== MUNICÍPIOS =====
-            if resultado.get('municipios'):
-                elements.append(Paragraph("Municípios Atendidos", section_title))
-                
-                municipios_texto = ", ".join([m['nome'] for m in resultado['municipios']])
-                mun_para = Paragraph(municipios_texto, normal_style)
-                mun_table = Table([[Paragraph("✓", ParagraphStyle('', parent=normal_style, textColor=green_success, fontSize=14)), mun_para]], colWidths=[0.4*inch, 7.1*inch])
-                mun_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, -1), slate100),
-                    ('ALIGN', (0, 0), (0, 0), 'CENTER'),
-                    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                    ('LEFTPADDING', (0, 0), (-1, -1), 10),
-                    ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-                    ('TOPPADDING', (0, 0), (-1, -1), 8),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-                    ('BORDER', (0, 0), (-1, -1), 0.5, slate300),
-                    ('LEFTBORDER', (0, 0), (-1, -1), 3, blue_primary),
-                ]))
-                elements.append(mun_table)
-                elements.append(Spacer(1, 15))
-            
-            # ===== LINK REDE CREDENCIADA =====
-            if resultado.get('rede_credenciada_url'):
-                elements.append(Paragraph("Consulte a Rede Credenciada", section_title))
-                elements.append(Paragraph("Acesse a plataforma para visualizar a lista completa de hospitais, clínicas e laboratórios parceiros:", normal_style))
-                elements.append(Spacer(1, 5))
-                elements.append(Paragraph(f"<link href='{resultado['rede_credenciada_url']}'><b>{resultado['rede_credenciada_url']}</b></link> →", ParagraphStyle('', parent=normal_style, textColor=blue_primary, fontSize=11)))
-                elements.append(Spacer(1, 15))
-    
-    # ===== RODAPÉ =====
-    elements.append(Spacer(1, 20))
-    footer_table = Table([
-        [Paragraph("📄 Documento gerado automaticamente pelo Sistema de Cotação em " + data_geracao, ParagraphStyle('', parent=normal_style, fontSize=9, textColor=slate700, alignment=TA_CENTER))],
-        [Paragraph("Esta cotação é válida por 7 dias. Depois disso, solicite uma nova cotação.", ParagraphStyle('', parent=normal_style, fontSize=8, textColor=colors.grey, alignment=TA_CENTER))]
-    ], colWidths=[7.5*inch])
-    
-    footer_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), slate100),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('TOPPADDING', (0, 0), (-1, -1), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-        ('BORDER', (0, 0), (-1, -1), 0.5, slate300),
-    ]))
-    
-    elements.append(footer_table)
-    
-    # Construir PDF
-    doc.build(elements)
-    buffer.seek(0)
-    return buffer
-
-
-
-
-#Alterações futuras podem incluir a adição de gráficos, logotipos personalizados e outros elementos visuais para melhorar a apresentação do PDF.
\ No newline at end of file
+                    row = []
+
+            carencia_table = Table(carencia_data, colWidths=[3.5*inch] * 2)
+            carencia_table.setStyle(self.ts_carencias)
+
+            elements.append(carencia_table)
+            elements.append(Spacer(1, 15))
+
+        # ===== COPARTICIPAÇÕES =====
+        if resultado.get('coparticipacoes'):
+            elements.append(self._titulo_secao("Coparticipação"))
+
+            for cop in resultado['coparticipacoes']:
+                texto = f"<b>{cop.get('nome', 'N/A')}</b>"
+                if cop.get('tipo_servico'):
+                    texto += f" - {cop['tipo_servico']}"
+                if cop.get('percentual'):
+                    texto += f" ({cop['percentual']}%)"
+
+                elements.append(self._item(Paragraph(texto, self.normal_style), self.ts_item_meio))
+                elements.append(Spacer(1, 8))
+
+            elements.append(Spacer(1, 7))
+
+        # ===== HOSPITAIS =====
+        if resultado.get('hospitais'):
+            elements.append(self._titulo_secao("Hospitais Credenciados"))
+
+            for hosp in resultado['hospitais']:
+                hosp_nome = self._texto_celula(str(hosp['nome']), self.normal_style, 'Helvetica-Bold', self.largura_texto_hospital)
+                hosp_endereco = self._texto_celula(str(hosp.get('endereco') or ''), self.small_style, self.small_style.fontName, self.largura_texto_hospital)
+
+                hosp_para = Table([[hosp_nome], [hosp_endereco]], colWidths=[7.0*inch])
+                hosp_para.setStyle(self.ts_hospital)
+                elements.append(self._item(hosp_para, self.ts_item_topo))
+                elements.append(Spacer(1, 8))
+
+            elements.append(Spacer(1, 7))
+
+        # ===== MUNICÍPIOS =====
+        if resultado.get('municipios'):
+            elements.append(self._titulo_secao("Municípios Atendidos"))
+
+            municipios_texto = ", ".join([m['nome'] for m in resultado['municipios']])
+            elements.append(self._item(Paragraph(municipios_texto, self.normal_style), self.ts_item_topo))
+            elements.append(Spacer(1, 15))
+
+        # ===== LINK REDE CREDENCIADA =====
+        if resultado.get('rede_credenciada_url'):
+            url = resultado['rede_credenciada_url']
+            elements.append(self._titulo_secao("Consulte a Rede Credenciada"))
+            elements.append(Paragraph(self.texto_rede, self.normal_style))
+            elements.append(Spacer(1, 5))
+            elements.append(Paragraph(f"<link href='{url}'><b>{url}</b></link> →", self.link_style))
+            elements.append(Spacer(1, 15))
+
+        return elements
+
+    def secoes(self, dados_cotacao: dict, data_geracao: str) -> Iterator[list]:
+        """Flowables do documento, uma seção (cabeçalho, cada plano, rodapé) por vez."""
+        yield self.cabecalho(data_geracao)
+
+        # ===== RESULTADOS =====
+        desconto_pct = float(dados_cotacao.get('desconto_percentual') or 0)
+
+        if not dados_cotacao.get('resultados'):
+            yield [Paragraph(self.texto_nenhum_plano, self.normal_style)]
+        else:
+            for idx, resultado in enumerate(dados_cotacao['resultados'], 1):
+                secao = self.secao_plano(resultado, desconto_pct)
+                # Separador de página se não for o primeiro
+                yield [PageBreak()] + secao if idx > 1 else secao
+
+        # ===== RODAPÉ =====
+        yield [Spacer(1, 20), self.rodape(data_geracao)]
+
+    def gerar_em(self, destino: BinaryIO, dados_cotacao: dict, idades: list[int]) -> None:
+        """
+        Escreve o PDF em `destino` (BytesIO, arquivo, SpooledTemporaryFile).
+        As seções dos planos são montadas conforme o layout avança, então só
+        os flowables do plano corrente ficam em memória, e não o documento todo.
+        """
+        # Margens ajustadas para layout proporcional
+        doc = SimpleDocTemplate(destino, pagesize=A4, topMargin=20, bottomMargin=20, leftMargin=20, rightMargin=20)
+        doc.build(_FlowablesSobDemanda(self.secoes(dados_cotacao, data_por_extenso())))
+
+    def gerar(self, dados_cotacao: dict, idades: list[int]) -> BytesIO:
+        buffer = BytesIO()
+        self.gerar_em(buffer, dados_cotacao, idades)
+        buffer.seek(0)
+        return buffer
+
+
+class _FlowablesSobDemanda(list):
+    """
+    Lista que o doc.build consome pela frente (flowables[0] / del flowables[0]).
+    Quando fica curta, puxa a próxima seção do gerador; o build nunca vê o
+    documento inteiro de uma vez. Mantém ao menos 2 itens porque o
+    keepWithNext do ReportLab olha o flowable seguinte.
+    """
+
+    def __init__(self, secoes: Iterator[list]):
+        super().__init__()
+        self._secoes = secoes
+
+    def __len__(self) -> int:
+        while self._secoes is not None and super().__len__() < 2:
+            try:
+                self.extend(next(self._secoes))
+            except StopIteration:
+                self._secoes = None
+        return super().__len__()
+
+
+_template: Optional[TemplateCotacao] = None
+
+
+def obter_template() -> TemplateCotacao:
+    """Template compilado do processo (criado no primeiro PDF)."""
+    global _template
+    if _template is None:
+        _template = TemplateCotacao()
+    return _template
+
+
+def gerar_pdf_cotacao(dados_cotacao: dict, idades: list[int]) -> BytesIO:
+    """
+    Gera um PDF profissional com layout moderno e responsivo
+    """
+    return obter_template().gerar(dados_cotacao, idades)
+
+
+def gerar_pdf_cotacao_arquivo(dados_cotacao: dict, idades: list[int], limite_memoria: int) -> SpooledTemporaryFile:
+    """
+    Mesmo PDF, em um SpooledTemporaryFile: fica em memória até `limite_memoria`
+    bytes e passa para o disco acima disso. Volta posicionado no início.
+    """
+    arquivo = SpooledTemporaryFile(max_size=limite_memoria, suffix=".pdf")
+    try:
+        obter_template().gerar_em(arquivo, dados_cotacao, idades)
+    except BaseException:
+        arquivo.close()
+        raise
+    arquivo.seek(0)
+    return arquivo
+
+
+#Alterações futuras podem incluir a adição de gráficos, logotipos personalizados e outros elementos visuais para melhorar a apresentação do PDF.
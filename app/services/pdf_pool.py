@@ -0,0 +1,172 @@
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import BinaryIO, Callable, Optional
+from fastapi.concurrency import run_in_threadpool
+from app.services.pdf_generator import gerar_pdf_cotacao, gerar_pdf_cotacao_arquivo, obter_template
+
+# Processos dedicados à geração de PDF (0 = gera no threadpool, como antes)
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))
+# Máximo de PDFs em andamento + na fila por worker do uvicorn
+PDF_MAX_FILA = int(os.getenv("PDF_MAX_FILA", "16"))
+# Tempo máximo (segundos) que a rota espera por um PDF
+PDF_TIMEOUT = float(os.getenv("PDF_TIMEOUT", "30"))
+# Modo arquivo (PDFs grandes): até quantos MB o SpooledTemporaryFile fica em
+# memória e em qual diretório ficam os temporários (vazio = padrão do sistema)
+PDF_SPOOL_MAX_MB = float(os.getenv("PDF_SPOOL_MAX_MB", "4"))
+PDF_TMP_DIR = os.getenv("PDF_TMP_DIR") or None
+# A partir de quantos planos o PDF usa o modo arquivo e é enviado em pedaços
+PDF_STREAM_MIN_PLANOS = int(os.getenv("PDF_STREAM_MIN_PLANOS", "20"))
+# Tamanho de cada pedaço enviado ao cliente no modo arquivo
+PDF_STREAM_CHUNK = 64 * 1024
+
+
+class FilaPdfCheia(Exception):
+    """Já existem PDF_MAX_FILA PDFs em andamento ou na fila."""
+
+
+class TempoPdfEsgotado(Exception):
+    """O PDF não ficou pronto dentro de PDF_TIMEOUT segundos."""
+
+
+def _gerar_bytes(dados_cotacao: dict, idades: list[int]) -> bytes:
+    # Roda no processo filho: devolve bytes, que atravessam o pickle sem custo extra
+    return gerar_pdf_cotacao(dados_cotacao, idades).getvalue()
+
+
+def _gerar_em_caminho(caminho: str, dados_cotacao: dict, idades: list[int]) -> None:
+    # Roda no processo filho: o PDF vai direto para o arquivo, nada volta pelo pickle
+    with open(caminho, "wb") as destino:
+        obter_template().gerar_em(destino, dados_cotacao, idades)
+
+
+def remover_temporario(caminho: str) -> None:
+    try:
+        os.remove(caminho)
+    except OSError:
+        pass
+
+
+class PoolPdf:
+    """
+    Executa gerar_pdf_cotacao (ReportLab, CPU pura) em um ProcessPoolExecutor
+    para não disputar o GIL e o threadpool com as rotas de cotação.
+    """
+
+    def __init__(self, workers: int = PDF_WORKERS, max_fila: int = PDF_MAX_FILA, timeout: float = PDF_TIMEOUT):
+        self.workers = workers
+        self.max_fila = max_fila
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._em_uso = 0
+
+    @property
+    def em_uso(self) -> int:
+        return self._em_uso
+
+    def _obter_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # "spawn" em todas as plataformas: o filho só importa o gerador de PDF,
+                # sem herdar conexões de banco ou threads do uvicorn
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def _reservar(self) -> None:
+        with self._lock:
+            if self._em_uso >= self.max_fila:
+                raise FilaPdfCheia()
+            self._em_uso += 1
+
+    def _liberar(self, *_) -> None:
+        with self._lock:
+            self._em_uso -= 1
+
+    async def gerar(self, dados_cotacao: dict, idades: list[int]) -> bytes:
+        """Gera o PDF sem bloquear o event loop. Levanta FilaPdfCheia ou TempoPdfEsgotado."""
+        if self.workers <= 0:
+            return await self._no_threadpool(_gerar_bytes, dados_cotacao, idades)
+        return await self._no_pool(_gerar_bytes, dados_cotacao, idades)
+
+    async def gerar_arquivo(self, dados_cotacao: dict, idades: list[int]) -> tuple[BinaryIO, Optional[str]]:
+        """
+        Para cotações grandes: o PDF nunca vira um único `bytes` no worker web.
+        Devolve (arquivo aberto para leitura, no início; caminho a apagar depois
+        de fechá-lo, ou None). Sem pool é um SpooledTemporaryFile; com pool o
+        processo filho escreve num temporário em disco.
+        """
+        if self.workers <= 0:
+            limite = int(PDF_SPOOL_MAX_MB * 1024 * 1024)
+            return await self._no_threadpool(gerar_pdf_cotacao_arquivo, dados_cotacao, idades, limite), None
+
+        fd, caminho = tempfile.mkstemp(suffix=".pdf", dir=PDF_TMP_DIR)
+        os.close(fd)
+        try:
+            await self._no_pool(_gerar_em_caminho, caminho, dados_cotacao, idades,
+                                ao_abandonar=lambda _: remover_temporario(caminho))
+            return open(caminho, "rb"), caminho
+        except TempoPdfEsgotado:
+            raise  # o filho ainda escreve no arquivo: ao_abandonar apaga quando ele terminar
+        except BaseException:
+            remover_temporario(caminho)
+            raise
+
+    async def _no_threadpool(self, funcao: Callable, *args):
+        self._reservar()
+        try:
+            return await asyncio.wait_for(run_in_threadpool(funcao, *args), self.timeout)
+        except asyncio.TimeoutError:
+            raise TempoPdfEsgotado()
+        finally:
+            self._liberar()
+
+    async def _no_pool(self, funcao: Callable, *args, ao_abandonar: Optional[Callable[[Future], None]] = None):
+        self._reservar()
+        try:
+            executor = self._obter_executor()
+            try:
+                futuro = executor.submit(funcao, *args)
+            except BrokenProcessPool:
+                self._descartar(executor)
+                raise
+        except BaseException:
+            # Sem futuro (pool que não subiu, submit recusado) ninguém devolveria a vaga
+            self._liberar()
+            raise
+        # A vaga só é devolvida quando o processo termina de fato, mesmo após timeout
+        futuro.add_done_callback(self._liberar)
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(futuro)), self.timeout)
+        except asyncio.TimeoutError:
+            futuro.cancel()  # só surte efeito se ainda estiver na fila
+            if ao_abandonar is not None:
+                futuro.add_done_callback(ao_abandonar)
+            raise TempoPdfEsgotado()
+        except BrokenProcessPool:
+            # Um processo morreu (ex.: falta de memória): o próximo PDF sobe um pool novo
+            self._descartar(executor)
+            raise
+
+    def _descartar(self, executor: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def encerrar(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# Instância única por processo (worker do uvicorn)
+pool_pdf = PoolPdf()
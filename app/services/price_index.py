@@ -0,0 +1,133 @@
+from typing import Iterable, Optional
+
+# Idades cobertas pela tabela pré-calculada (0..120). Idades fora desse
+# intervalo caem na varredura das faixas, como antes.
+IDADE_MAXIMA = 120
+
+# Limite superior usado para faixas abertas ("59+")
+IDADE_FAIXA_ABERTA = 999
+
+
+def parse_faixa(faixa_string: str) -> Optional[tuple[int, int]]:
+    """
+    Converte "0-18", " 19 - 23 " ou "59+" em (idade_min, idade_max).
+    Retorna None se a string não for uma faixa válida.
+    """
+    try:
+        texto = faixa_string.replace(" ", "")
+        if texto.endswith("+"):
+            return int(texto[:-1]), IDADE_FAIXA_ABERTA
+
+        min_str, max_str = texto.split("-")
+        min_idade = int(min_str)
+
+        # Também aceita o formato "59-+"
+        if "+" in max_str:
+            max_idade = IDADE_FAIXA_ABERTA
+        else:
+            max_idade = int(max_str)
+
+        return min_idade, max_idade
+    except (AttributeError, ValueError):
+        return None
+
+
+def validar_faixas(rotulos: Iterable[str]) -> list[tuple[int, int]]:
+    """
+    (idade_min, idade_max) de cada faixa, na ordem recebida. ValueError se
+    alguma não for uma faixa válida ou se, em ordem de idade, elas se
+    sobrepõem ou deixam um buraco entre uma e a seguinte.
+    """
+    rotulos = list(rotulos)
+    limites = []
+    for rotulo in rotulos:
+        faixa = parse_faixa(rotulo)
+        if faixa is None or faixa[0] < 0 or faixa[0] > faixa[1]:
+            raise ValueError(f"Faixa etária inválida: {rotulo!r} (use 0-18, 19-23, 59+)")
+        limites.append(faixa)
+
+    ordenadas = sorted(zip(limites, rotulos))
+    for ((_, fim), anterior), ((inicio, _), rotulo) in zip(ordenadas, ordenadas[1:]):
+        if inicio <= fim:
+            raise ValueError(f"Faixas sobrepostas: {anterior!r} e {rotulo!r}")
+        if inicio > fim + 1:
+            raise ValueError(f"Idades sem faixa entre {anterior!r} e {rotulo!r}")
+    return limites
+
+
+def faixas_do_plano(plano) -> tuple[tuple[str, float, Optional[int], Optional[int]], ...]:
+    """(faixa_etaria, valor, idade_min, idade_max) das faixas do plano, para IndicePrecos."""
+    return tuple(
+        (f.faixa_etaria, f.valor, getattr(f, "idade_min", None), getattr(f, "idade_max", None))
+        for f in plano.faixas
+    )
+
+
+class IndicePrecos:
+    """
+    Tabela idade -> (faixa_etaria, valor) de um plano, montada uma única vez.
+    Respeita a ordem das faixas: a primeira faixa que contém a idade vence.
+
+    Cada faixa é (faixa_etaria, valor) ou (faixa_etaria, valor, idade_min,
+    idade_max), como em faixas_do_plano; sem as idades gravadas (linhas
+    anteriores à migração) o texto da faixa é interpretado.
+    """
+
+    __slots__ = ("faixas", "tabela")
+
+    def __init__(self, faixas: Iterable[tuple]):
+        # (faixa_etaria, valor, idade_min, idade_max) apenas das faixas válidas
+        self.faixas = []
+        for faixa in faixas:
+            faixa_etaria, valor = faixa[0], faixa[1]
+            if len(faixa) == 4 and faixa[2] is not None and faixa[3] is not None:
+                limites = faixa[2], faixa[3]
+            else:
+                limites = parse_faixa(faixa_etaria)
+            if limites is not None:
+                self.faixas.append((faixa_etaria, valor, limites[0], limites[1]))
+
+        self.tabela: list[Optional[tuple[str, float]]] = [None] * (IDADE_MAXIMA + 1)
+        # Percorre de trás para frente para que a primeira faixa prevaleça
+        for faixa_etaria, valor, idade_min, idade_max in reversed(self.faixas):
+            inicio = max(idade_min, 0)
+            fim = min(idade_max, IDADE_MAXIMA)
+            if inicio <= fim:
+                self.tabela[inicio:fim + 1] = [(faixa_etaria, valor)] * (fim + 1 - inicio)
+
+    def preco(self, idade: int) -> Optional[tuple[str, float]]:
+        """Retorna (faixa_etaria, valor) para a idade, ou None se não houver faixa."""
+        if 0 <= idade <= IDADE_MAXIMA:
+            return self.tabela[idade]
+        for faixa_etaria, valor, idade_min, idade_max in self.faixas:
+            if idade_min <= idade <= idade_max:
+                return faixa_etaria, valor
+        return None
+
+
+# Cache por processo: plano_id -> (assinatura das faixas, índice)
+_indices: dict[int, tuple[tuple, IndicePrecos]] = {}
+
+
+def indice_do_plano(plano) -> IndicePrecos:
+    """
+    Retorna o índice de preços do plano, recompilando apenas quando as faixas
+    mudaram desde a última vez (a assinatura compara as faixas inteiras).
+    """
+    assinatura = faixas_do_plano(plano)
+    em_cache = _indices.get(plano.id)
+    if em_cache is not None and em_cache[0] == assinatura:
+        return em_cache[1]
+
+    indice = IndicePrecos(assinatura)
+    if plano.id is not None:
+        _indices[plano.id] = (assinatura, indice)
+    return indice
+
+
+def invalidar_indice(plano_id: Optional[int] = None) -> None:
+    """Descarta o índice de um plano (ou de todos, se plano_id for None)."""
+    if plano_id is None:
+        _indices.clear()
+    else:
+        _indices.pop(plano_id, None)
@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+# Quantas cotações ficam guardadas por worker e por quanto tempo (segundos)
+MAX_COTACOES = int(os.getenv("COTACAO_STORE_MAX", "1000"))
+TTL_COTACAO = float(os.getenv("COTACAO_STORE_TTL", "1800"))
+
+
+class CotacaoArmazenada:
+    __slots__ = ("id", "idades", "resultados", "criada_em")
+
+    def __init__(self, cotacao_id: str, idades: list[int], resultados: list[dict]):
+        self.id = cotacao_id
+        self.idades = idades
+        self.resultados = resultados
+        self.criada_em = time.monotonic()
+
+    def resultado_do_plano(self, plano_id: int) -> Optional[dict]:
+        for r in self.resultados:
+            if r.get("plano_id") == plano_id:
+                return r
+        return None
+
+
+class CotacaoStore:
+    """
+    Guarda as cotações calculadas para que o PDF seja gerado a partir do
+    resultado já precificado, sem refazer a cotação. Limitado em quantidade
+    (descarta as mais antigas) e em tempo de vida.
+    """
+
+    def __init__(self, max_itens: int = MAX_COTACOES, ttl: float = TTL_COTACAO):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._itens: "OrderedDict[str, CotacaoArmazenada]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def salvar(self, idades: list[int], resultados: list[dict]) -> str:
+        cotacao = CotacaoArmazenada(uuid.uuid4().hex, list(idades), resultados)
+        with self._lock:
+            self._expurgar()
+            self._itens[cotacao.id] = cotacao
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+        return cotacao.id
+
+    def obter(self, cotacao_id: str) -> Optional[CotacaoArmazenada]:
+        with self._lock:
+            cotacao = self._itens.get(cotacao_id)
+            if cotacao is None:
+                return None
+            if time.monotonic() - cotacao.criada_em > self.ttl:
+                del self._itens[cotacao_id]
+                return None
+            return cotacao
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def _expurgar(self) -> None:
+        # Itens entram em ordem de criação, então os expirados estão no início
+        limite = time.monotonic() - self.ttl
+        while self._itens:
+            primeiro = next(iter(self._itens.values()))
+            if primeiro.criada_em >= limite:
+                break
+            self._itens.popitem(last=False)
+
+
+# Instância única por processo (worker)
+cotacoes = CotacaoStore()
@@ -0,0 +1,88 @@
+import json
+import os
+from typing import Any, Callable, Optional
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from app.models import plano_model
+
+try:
+    import orjson
+except ImportError:  # opcional: sem ele, json.dumps sem a revalidação
+    orjson = None
+
+# Opcional: com 1, /cotacao/, /api/cotacao/ e /planos/ devolvem o JSON dos
+# dicts que o servidor já montou nos campos e na ordem do response_model, sem
+# a revalidação do FastAPI item por item
+RESPOSTA_JSON_RAPIDA = os.getenv("RESPOSTA_JSON_RAPIDA", "0") != "0"
+
+# O orjson só difere do json nos floats que o json escreve em notação
+# científica (|x| >= 1e16 ou < 1e-4): 1e16 e 0.00001 contra 1e+16 e 1e-05.
+# Para achar esses casos sem percorrer os dados, o corpo é reduzido a
+# "0", "1", "e", "." e espaço (um translate, em C) e procurado por "0e",
+# "1e" e "0.0000"; se aparecer algum (mesmo dentro de um texto), o corpo é
+# refeito com json.dumps.
+_REDUCAO = bytes(
+    ord("0") if c == ord("0") else ord("1") if ord("1") <= c <= ord("9") else c if c in b"e." else ord(" ")
+    for c in range(256)
+)
+_NOTACAO_DIFERENTE = (b"0e", b"1e", b"0.0000")
+
+
+def _json_padrao(conteudo: Any) -> bytes:
+    # Mesmos parâmetros do JSONResponse do Starlette
+    return json.dumps(conteudo, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+class RespostaJSONRapida(JSONResponse):
+    """JSONResponse pelo orjson (se instalado), byte a byte igual ao padrão."""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return _json_padrao(content)
+        corpo = orjson.dumps(content)
+        reduzido = corpo.translate(_REDUCAO)
+        if any(trecho in reduzido for trecho in _NOTACAO_DIFERENTE):
+            return _json_padrao(content)
+        return corpo
+
+
+def responder(conteudo: list, response: Optional[Response] = None, item: Optional[Callable[[Any], dict]] = None):
+    """
+    `conteudo` como está (o FastAPI valida pelo response_model) ou, com o
+    caminho rápido ligado, já serializado, levando os cabeçalhos que a rota
+    pôs em `response`. `item` converte cada elemento (ex.: objeto do ORM)
+    no dict do schema.
+    """
+    if not RESPOSTA_JSON_RAPIDA:
+        return conteudo
+    if item is not None:
+        conteudo = [item(x) for x in conteudo]
+    headers = dict(response.headers) if response is not None else None
+    return RespostaJSONRapida(conteudo, headers=headers)
+
+
+def plano_json(plano: plano_model.Plano) -> dict:
+    """Um plano com as coleções carregadas, nos campos e na ordem do PlanoResponse."""
+    return {
+        "nome": plano.nome,
+        "tipo_contratacao": plano.tipo_contratacao,
+        "acomodacao": plano.acomodacao,
+        "abrangencia": plano.abrangencia,
+        "coparticipacao": plano.coparticipacao,
+        "elegibilidade": plano.elegibilidade,
+        "imagem_coparticipacao_url": plano.imagem_coparticipacao_url,
+        "id": plano.id,
+        "operadora_id": plano.operadora_id,
+        "faixas": [{"faixa_etaria": f.faixa_etaria, "valor": f.valor} for f in plano.faixas],
+        "hospitais": [{"id": h.id, "nome": h.nome, "endereco": h.endereco} for h in plano.hospitais],
+        "carencias": [{"id": c.id, "descricao": c.descricao, "dias": c.dias} for c in plano.carencias],
+        "coparticipacoes": [
+            {
+                "id": c.id, "nome": c.nome, "tipo_plano": c.tipo_plano, "imagem_url": c.imagem_url,
+                "tipo_servico": c.tipo_servico, "percentual": c.percentual,
+                "valor_minimo": c.valor_minimo, "valor_maximo": c.valor_maximo,
+            }
+            for c in plano.coparticipacoes
+        ],
+        "municipios": [{"id": m.id, "nome": m.nome} for m in plano.municipios],
+    }
@@ -0,0 +1,150 @@
+from typing import Iterable, Iterator, Optional, Sequence
+import numpy as np
+from app.services.metricas import planos_precificados, planos_retornados
+from app.services.price_index import IDADE_MAXIMA
+
+# Quantas famílias são precificadas por bloco em cotar_lote (limita a memória
+# do array planos × famílias × pessoas)
+FAMILIAS_POR_BLOCO = 64
+
+
+class MotorPrecos:
+    """
+    Motor de precificação vetorizado.
+
+    Guarda todos os planos como uma matriz densa planos × segmentos de idade
+    (float, NaN onde o plano não tem faixa) e um vetor idade -> segmento.
+    Os segmentos são a união das fronteiras das faixas de todos os planos:
+    num catálogo só com as 10 faixas da ANS, são exatamente essas 10 colunas.
+
+    Uma cotação vira um gather (precos[linhas, segmentos das idades]) seguido
+    de uma soma por linha, em vez de laços Python sobre objetos ORM.
+
+    Os planos só precisam expor id, indice (IndicePrecos), cotar(idades) e
+    montar_resultado(total, beneficiarios), como PlanoCatalogo.
+    """
+
+    def __init__(self, planos: Sequence):
+        self.planos = list(planos)
+        self.linha_por_id = {p.id: i for i, p in enumerate(self.planos)}
+
+        # Rótulos das faixas ("0-18", "59+") viram inteiros
+        self.rotulos: list[str] = []
+        ids_rotulos: dict[str, int] = {}
+
+        n_idades = IDADE_MAXIMA + 1
+        valores = np.full((len(self.planos), n_idades), np.nan)
+        rotulos = np.full((len(self.planos), n_idades), -1, dtype=np.int32)
+        for i, plano in enumerate(self.planos):
+            for idade, encontrado in enumerate(plano.indice.tabela):
+                if encontrado is None:
+                    continue
+                faixa_etaria, valor = encontrado
+                rid = ids_rotulos.get(faixa_etaria)
+                if rid is None:
+                    rid = ids_rotulos[faixa_etaria] = len(self.rotulos)
+                    self.rotulos.append(faixa_etaria)
+                valores[i, idade] = valor
+                rotulos[i, idade] = rid
+
+        # Um novo segmento começa onde algum plano troca de faixa
+        inicio = np.ones(n_idades, dtype=bool)
+        if self.planos:
+            mesmo_valor = (valores[:, 1:] == valores[:, :-1]) | (np.isnan(valores[:, 1:]) & np.isnan(valores[:, :-1]))
+            inicio[1:] = ((rotulos[:, 1:] != rotulos[:, :-1]) | ~mesmo_valor).any(axis=0)
+        colunas = np.flatnonzero(inicio)
+
+        self.idade_segmento = np.cumsum(inicio) - 1
+
+        # Coluna extra no fim (preço 0.0) usada para completar famílias menores em cotar_lote
+        self.coluna_vazia = len(colunas)
+        self.precos = np.concatenate([valores[:, colunas], np.zeros((len(self.planos), 1))], axis=1)
+        # Mesma forma de precos, mas já com o texto da faixa (object), para não
+        # traduzir id -> rótulo elemento a elemento na montagem do resultado
+        nomes = np.array(self.rotulos + [None], dtype=object)
+        self.faixas = nomes[np.concatenate([rotulos[:, colunas], np.full((len(self.planos), 1), -1, dtype=np.int32)], axis=1)]
+
+    def precificar(self, planos: Sequence, idades: list[int]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Só a parte numérica, sem montar resultados: (totais, validos) por plano,
+        na ordem de `planos`. Idades devem estar entre 0 e IDADE_MAXIMA.
+        """
+        linhas = np.fromiter((self.linha_por_id[p.id] for p in planos), dtype=np.intp, count=len(planos))
+        precos = self.precos[linhas[:, None], self.idade_segmento[idades]]
+        totais = precos[:, 0].copy()
+        for j in range(1, len(idades)):
+            totais += precos[:, j]
+        return totais, ~np.isnan(totais)
+
+    def cotar(self, planos: Sequence, idades: list[int]) -> list[dict]:
+        """Cota uma família contra os planos informados (que devem estar no motor)."""
+        return next(self.cotar_lote([(planos, idades)]))
+
+    def cotar_lote(self, familias: Iterable[tuple[Sequence, list[int]]]) -> Iterator[list[dict]]:
+        """
+        Cota várias famílias, cada uma com sua lista de planos candidatos.
+        Produz, na ordem de entrada, a lista de resultados de cada família.
+        """
+        bloco = []
+        for familia in familias:
+            bloco.append(familia)
+            if len(bloco) == FAMILIAS_POR_BLOCO:
+                yield from self._cotar_bloco(bloco)
+                bloco = []
+        if bloco:
+            yield from self._cotar_bloco(bloco)
+
+    def _cotar_bloco(self, bloco: list[tuple[Sequence, list[int]]]) -> list[list[dict]]:
+        saida: list[Optional[list[dict]]] = [None] * len(bloco)
+        vetorizaveis = []
+        for k, (planos, idades) in enumerate(bloco):
+            if not planos or not idades:
+                saida[k] = []
+            elif all(0 <= idade <= IDADE_MAXIMA for idade in idades):
+                vetorizaveis.append(k)
+            else:
+                # Idades fora da tabela: caminho escalar, idêntico ao de sempre
+                saida[k] = [r for r in (p.cotar(idades) for p in planos) if r is not None]
+
+        if vetorizaveis:
+            # Segmentos das idades de cada família (F × M), completados com a coluna vazia
+            m = max(len(bloco[k][1]) for k in vetorizaveis)
+            segmentos = np.full((len(vetorizaveis), m), self.coluna_vazia, dtype=np.intp)
+            for f, k in enumerate(vetorizaveis):
+                idades = bloco[k][1]
+                segmentos[f, :len(idades)] = self.idade_segmento[idades]
+
+            # Um único gather para todos os planos candidatos do bloco: P × F × M
+            linhas_bloco = sorted({self.linha_por_id[p.id] for k in vetorizaveis for p in bloco[k][0]})
+            posicao = {linha: i for i, linha in enumerate(linhas_bloco)}
+            linhas = np.asarray(linhas_bloco, dtype=np.intp)
+            precos = self.precos[linhas[:, None, None], segmentos[None, :, :]]
+
+            # Soma na mesma ordem do laço Python (pessoa por pessoa) para dar o mesmo float
+            totais = precos[:, :, 0].copy()
+            for j in range(1, m):
+                totais += precos[:, :, j]
+            validos = ~np.isnan(totais)
+
+            for f, k in enumerate(vetorizaveis):
+                planos, idades = bloco[k]
+                n = len(idades)
+                pos = np.fromiter((posicao[self.linha_por_id[p.id]] for p in planos), dtype=np.intp, count=len(planos))
+                ok = np.flatnonzero(validos[pos, f])
+                pos_ok = pos[ok]
+                faixas = self.faixas[linhas[pos_ok][:, None], segmentos[f, :n]].tolist()
+                valores = precos[pos_ok, f, :n].tolist()
+                totais_ok = totais[pos_ok, f].tolist()
+
+                saida[k] = [
+                    planos[plano_idx].montar_resultado(total, [
+                        {"idade": idade, "faixa_etaria_usada": faixa, "valor": valor}
+                        for idade, faixa, valor in zip(idades, faixas_plano, valores_plano)
+                    ])
+                    for plano_idx, total, faixas_plano, valores_plano in zip(ok.tolist(), totais_ok, faixas, valores)
+                ]
+
+        for (planos, _), resultados in zip(bloco, saida):
+            planos_precificados.observar(len(planos))
+            planos_retornados.observar(len(resultados))
+        return saida
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# Teste de carga: rotas com AsyncSession contra as rotas síncronas (threadpool).
+#
+# O caminho síncrono é a revisão anterior às rotas async (REVISAO_SINCRONA),
+# extraída do git para um diretório temporário. As duas versões sobem no
+# uvicorn sobre o mesmo SQLite temporário e recebem a mesma carga: N clientes
+# simultâneos em GET /planos/ (banco a cada requisição) e POST /cotacao/
+# (catálogo em memória). Nas rotas síncronas a concorrência fica presa às 40
+# threads do AnyIO; nas async, ao pool de conexões do engine.
+
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+_db_path = os.path.join(tempfile.mkdtemp(), "bench_async_db.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+
+import httpx
+
+from app.db import database
+from app.models import operadora_model, plano_model, faixa_preco_model, hospital_model, carencia_model, coparticipacao_model
+
+REVISAO_SINCRONA = "841cf9e"  # último commit com as rotas síncronas
+FAIXAS_ANS = ["0-18", "19-23", "24-28", "29-33", "34-38", "39-43", "44-48", "49-53", "54-58", "59+"]
+N_PLANOS = 20
+HOSPITAIS_POR_PLANO = 10
+CONCORRENCIAS = [1, 16, 64, 128]
+REQUISICOES_POR_CLIENTE = 5
+ROTAS = [
+    ("GET", "/api/v1/planos/", None),
+    ("POST", "/api/v1/cotacao/", {"idades": [8, 34, 36, 61]}),
+]
+
+
+def popular():
+    database.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    op = operadora_model.Operadora(nome="Operadora Teste")
+    db.add(op)
+    db.flush()
+    for p in range(N_PLANOS):
+        plano = plano_model.Plano(operadora_id=op.id, nome=f"Plano {p}", tipo_contratacao="PF",
+                                  acomodacao="Apartamento", abrangencia="Nacional", coparticipacao=False)
+        db.add(plano)
+        db.flush()
+        db.add_all([faixa_preco_model.FaixaPreco(plano_id=plano.id, faixa_etaria=f, valor=150.0 + 40 * k) for k, f in enumerate(FAIXAS_ANS)])
+        db.add_all([hospital_model.Hospital(plano_id=plano.id, nome=f"Hospital {i}", endereco="Av. Paulista, 1000 - São Paulo") for i in range(HOSPITAIS_POR_PLANO)])
+        db.add_all([carencia_model.Carencia(plano_id=plano.id, descricao=f"Carência {i}", dias=30 * (i + 1)) for i in range(6)])
+        db.add_all([coparticipacao_model.Coparticipacao(plano_id=plano.id, nome=f"Consulta {i}", tipo_servico="Consulta", percentual=20.0) for i in range(6)])
+    db.commit()
+    db.close()
+
+
+def extrair_revisao(revisao):
+    """Extrai app/ da revisão para um diretório temporário (None se o git não tiver a revisão)."""
+    destino = tempfile.mkdtemp()
+    arquivo = os.path.join(destino, "app.tar")
+    try:
+        subprocess.run(["git", "archive", "-o", arquivo, revisao, "app"], check=True, stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    with tarfile.open(arquivo) as tar:
+        tar.extractall(destino)
+    return destino
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def subir_servidor(diretorio):
+    porta = porta_livre()
+    env = dict(os.environ, PDF_WORKERS="0", PYTHONPATH=diretorio)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(porta), "--log-level", "critical"],
+        env=env, cwd=diretorio, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{porta}"
+    for _ in range(100):
+        try:
+            httpx.get(url + "/", timeout=1)
+            return proc, url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("uvicorn não subiu")
+
+
+async def cliente(client, metodo, rota, corpo, tempos, erros):
+    for _ in range(REQUISICOES_POR_CLIENTE):
+        inicio = time.perf_counter()
+        try:
+            resp = await client.request(metodo, rota, json=corpo)
+        except httpx.HTTPError:
+            erros.append(None)
+            continue
+        if resp.status_code != 200:
+            # Ex.: 500 por timeout do pool de conexões (30 s) sob carga
+            erros.append(resp.status_code)
+            continue
+        tempos.append(time.perf_counter() - inicio)
+
+
+async def carga(url, metodo, rota, corpo, concorrencia):
+    limites = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=limites) as client:
+        await cliente(client, metodo, rota, corpo, [], [])  # aquece catálogo e conexões
+        tempos, erros = [], []
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente(client, metodo, rota, corpo, tempos, erros) for _ in range(concorrencia)))
+        duracao = time.perf_counter() - inicio
+    return tempos, erros, duracao
+
+
+def resumo(tempos, erros, duracao):
+    texto = f"{len(tempos) / duracao:7.0f} req/s"
+    if tempos:
+        ordenados = sorted(tempos)
+        p99 = ordenados[max(int(len(ordenados) * 0.99) - 1, 0)]
+        texto += f"  p50 {statistics.median(tempos) * 1000:7.1f} ms  p99 {p99 * 1000:7.1f} ms"
+    if erros:
+        texto += f"  ({len(erros)} erros)"
+    return texto
+
+
+if __name__ == "__main__":
+    popular()
+    versoes = [("async (AsyncSession)", os.getcwd())]
+    anterior = extrair_revisao(REVISAO_SINCRONA)
+    if anterior is None:
+        print(f"Revisão {REVISAO_SINCRONA} indisponível; medindo só as rotas async", file=sys.stderr)
+    else:
+        versoes.insert(0, ("síncrono (threadpool)", anterior))
+
+    print(f"{N_PLANOS} planos com {HOSPITAIS_POR_PLANO} hospitais; {REQUISICOES_POR_CLIENTE} requisições por cliente")
+    for nome, diretorio in versoes:
+        proc, url = subir_servidor(diretorio)
+        try:
+            print(f"{nome}:")
+            for metodo, rota, corpo in ROTAS:
+                for concorrencia in CONCORRENCIAS:
+                    tempos, erros, duracao = asyncio.run(carga(url, metodo, rota, corpo, concorrencia))
+                    print(f"  {metodo:<4} {rota:<18} {concorrencia:>3} clientes: {resumo(tempos, erros, duracao)}")
+        finally:
+            proc.terminate()
+            proc.wait()
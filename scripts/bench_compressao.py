@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# Benchmark: cotação de 50 planos (com hospitais, carências,
+# coparticipações e municípios repetidos em cada plano) sem compressão,
+# com gzip e com brotli: bytes trafegados, tempo no servidor (incluindo a
+# compressão) e o tempo de ponta a ponta estimado em links móveis
+# (servidor + RTT + bytes / banda + descompressão no cliente).
+#
+# Usa um SQLite temporário, nunca o banco do .env.
+
+import gzip
+import os
+import statistics
+import tempfile
+import time
+
+_db_path = os.path.join(tempfile.mkdtemp(), "bench_compressao.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+os.environ["DB_ALERTA_REPETICOES"] = "0"
+
+from fastapi.testclient import TestClient
+
+from app.db import database
+from app.main import app
+from app.services.compressao import brotli
+
+FAIXAS_ANS = ["0-18", "19-23", "24-28", "29-33", "34-38", "39-43", "44-48", "49-53", "54-58", "59+"]
+N_PLANOS = 50
+RODADAS = 20
+FAMILIA = {"idades": [4, 9, 38, 41, 67]}
+
+# (nome, banda em bits/s, RTT em segundos)
+LINKS = (
+    ("3G (1,6 Mbps, RTT 300 ms)", 1.6e6, 0.300),
+    ("4G fraco (5 Mbps, RTT 80 ms)", 5e6, 0.080),
+    ("Wi-Fi (50 Mbps, RTT 20 ms)", 50e6, 0.020),
+)
+
+CODIFICACOES = ["identity", "gzip"] + (["br"] if brotli is not None else [])
+DESCOMPRIMIR = {"identity": lambda b: b, "gzip": gzip.decompress}
+if brotli is not None:
+    DESCOMPRIMIR["br"] = brotli.decompress
+
+
+def plano(i, operadora_id):
+    return {
+        "operadora_id": operadora_id, "nome": f"Plano {i} Apartamento Nacional", "tipo_contratacao": "PF",
+        "acomodacao": "Apartamento", "abrangencia": "Nacional", "coparticipacao": bool(i % 2),
+        "faixas_preco": [{"faixa_etaria": f, "valor": round(180.37 + 61.9 * k + i * 3.1, 2)} for k, f in enumerate(FAIXAS_ANS)],
+        "hospitais": [{"nome": f"Hospital e Maternidade {h}", "endereco": f"Rua das Acácias, {100 + h} - Centro"}
+                      for h in range(30 + i % 30)],
+        "carencias": [{"descricao": d, "dias": dias} for d, dias in (
+            ("Urgência e emergência", 1), ("Consultas", 30), ("Exames simples", 30), ("Exames complexos", 180),
+            ("Internações", 180), ("Cirurgias", 180), ("Parto a termo", 300), ("Doenças preexistentes", 720))],
+        "coparticipacoes": [{"nome": n, "tipo_servico": n, "percentual": 30, "valor_minimo": 15, "valor_maximo": 150}
+                            for n in ("Consulta eletiva", "Pronto-socorro", "Exames simples", "Exames especiais", "Terapias", "Internação")],
+        "municipios": [{"nome": f"Município da Região {m}"} for m in range(20 + i % 25)],
+    }
+
+
+if __name__ == "__main__":
+    database.Base.metadata.create_all(bind=database.engine)
+    resultados = {}
+    with TestClient(app) as client:
+        op = client.post("/api/v1/operadoras/", json={"nome": "Operadora Saúde Brasil"}).json()["id"]
+        resp = client.post("/api/v1/planos/lote", json=[plano(i, op) for i in range(N_PLANOS)])
+        assert resp.status_code == 201, resp.text
+
+        corpo_original = None
+        for codificacao in CODIFICACOES:
+            tempos = []
+            for _ in range(RODADAS):
+                inicio = time.perf_counter()
+                resp = client.post("/api/v1/cotacao/", json=FAMILIA, headers={"Accept-Encoding": codificacao})
+                tempos.append(time.perf_counter() - inicio)
+                assert resp.status_code == 200, resp.text
+            assert resp.headers.get("content-encoding", "identity") == codificacao
+            assert len(resp.json()) == N_PLANOS
+            if corpo_original is None:
+                corpo_original = resp.content
+            assert resp.content == corpo_original, codificacao
+
+            # Bytes como saíram do servidor, antes do httpx descomprimir
+            with client.stream("POST", "/api/v1/cotacao/", json=FAMILIA, headers={"Accept-Encoding": codificacao}) as bruto:
+                comprimido = b"".join(bruto.iter_raw())
+            no_fio = len(comprimido)
+            assert DESCOMPRIMIR[codificacao](comprimido) == corpo_original, codificacao
+            inicio = time.perf_counter()
+            for _ in range(RODADAS):
+                DESCOMPRIMIR[codificacao](comprimido)
+            descompressao = (time.perf_counter() - inicio) / RODADAS
+            resultados[codificacao] = (no_fio, statistics.median(tempos), descompressao)
+
+    print(f"Cotação de {N_PLANOS} planos ({len(corpo_original) / 1024:.0f} KB de JSON), mediana de {RODADAS} rodadas:")
+    for codificacao, (no_fio, servidor, descompressao) in resultados.items():
+        print(f"  {codificacao:<9} {no_fio / 1024:8.1f} KB no fio  servidor {servidor * 1000:6.1f} ms  "
+              f"descompressão {descompressao * 1000:5.2f} ms")
+    print("Ponta a ponta estimado (servidor + RTT + bytes / banda + descompressão):")
+    for nome, banda, rtt in LINKS:
+        linha = "  ".join(
+            f"{codificacao} {(servidor + rtt + no_fio * 8 / banda + descompressao) * 1000:7.0f} ms"
+            for codificacao, (no_fio, servidor, descompressao) in resultados.items()
+        )
+        print(f"  {nome:<30} {linha}")
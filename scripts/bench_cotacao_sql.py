@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# Benchmark: POST /api/v1/cotacao/ com 1.000, 5.000 e 20.000 planos pelo
+# MotorPrecos (catálogo em memória já carregado, e sem cache, lendo os
+# candidatos do banco a cada cotação) contra COTACAO_SQL (faixas × idades
+# agregadas no banco). Confere que o corpo é byte a byte o mesmo.
+#
+# Usa um SQLite temporário, nunca o banco do .env.
+
+import os
+import statistics
+import tempfile
+import time
+
+_db_path = os.path.join(tempfile.mkdtemp(), "bench_cotacao_sql.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+os.environ["DB_DEBUG"] = "1"
+os.environ["DB_ALERTA_REPETICOES"] = "0"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app.db import database
+from app.main import app
+from app.models import operadora_model, plano_model, faixa_preco_model, hospital_model, carencia_model
+from app.routers.v1 import cotacao as rotas_cotacao
+from app.services import catalog_cache
+from app.services.price_index import validar_faixas
+
+FAIXAS_ANS = ["0-18", "19-23", "24-28", "29-33", "34-38", "39-43", "44-48", "49-53", "54-58", "59+"]
+LIMITES = validar_faixas(FAIXAS_ANS)
+TAMANHOS = (1_000, 5_000, 20_000)
+RODADAS = 5
+# Metade dos planos é PJ (fora do filtro) e 1 em 4 não tem a faixa 59+ (não precificado)
+FAMILIA = {"idades": [7, 35, 38, 64], "tipo_contratacao": "PF"}
+MODOS = (
+    ("memória (cache)", True, False),
+    ("memória (sem cache)", False, False),
+    ("COTACAO_SQL", True, True),
+)
+
+
+def popular(db, inicio, fim):
+    op = db.scalars(insert(operadora_model.Operadora).returning(operadora_model.Operadora.id), [{"nome": f"Operadora {inicio}"}]).all()[0]
+    ids = db.scalars(
+        insert(plano_model.Plano).returning(plano_model.Plano.id, sort_by_parameter_order=True),
+        [{"operadora_id": op, "nome": f"Plano {i}", "tipo_contratacao": "PF" if i % 2 else "PJ", "acomodacao": "Apartamento",
+          "abrangencia": "Nacional", "coparticipacao": False} for i in range(inicio, fim)],
+    ).all()
+    db.execute(insert(faixa_preco_model.FaixaPreco), [
+        {"plano_id": pid, "faixa_etaria": f, "valor": round(89.9 + 41.7 * k + pid / 13, 2), "idade_min": minimo, "idade_max": maximo}
+        for pid in ids for k, (f, (minimo, maximo)) in enumerate(zip(FAIXAS_ANS, LIMITES)) if pid % 4 or f != "59+"
+    ])
+    db.execute(insert(hospital_model.Hospital), [
+        {"plano_id": pid, "nome": f"Hospital {h}", "endereco": f"Rua {h}"} for pid in ids for h in range(15)
+    ])
+    db.execute(insert(carencia_model.Carencia), [
+        {"plano_id": pid, "descricao": f"Carência {c}", "dias": 30 * c} for pid in ids for c in range(5)
+    ])
+    db.execute(insert(hospital_model.Municipio), [
+        {"plano_id": pid, "nome": f"Município {m}"} for pid in ids for m in range(8)
+    ])
+    db.commit()
+
+
+def medir(client):
+    tempos = []
+    for _ in range(RODADAS):
+        inicio = time.perf_counter()
+        resp = client.post("/api/v1/cotacao/", json=FAMILIA)
+        tempos.append(time.perf_counter() - inicio)
+        assert resp.status_code == 200, resp.text
+    return resp, statistics.median(tempos) * 1000
+
+
+if __name__ == "__main__":
+    database.Base.metadata.create_all(bind=database.engine)
+    with TestClient(app) as client:
+        total = 0
+        for tamanho in TAMANHOS:
+            db = database.SessionLocal()
+            popular(db, total, tamanho)
+            db.close()
+            total = tamanho
+            # Inserts diretos não passam pelo registro de alterações: recarrega o catálogo
+            client.post("/api/v1/catalogo/recarregar").raise_for_status()
+
+            corpos = []
+            print(f"{tamanho} planos, família de {len(FAMILIA['idades'])}, mediana de {RODADAS}:")
+            for nome, cache, sql in MODOS:
+                catalog_cache.CACHE_ATIVO = cache
+                rotas_cotacao.COTACAO_SQL = sql
+                client.post("/api/v1/cotacao/", json=FAMILIA)  # aquece (carga do catálogo)
+                resp, ms = medir(client)
+                corpos.append(resp.content)
+                print(f"  {nome:<22} {ms:8.1f} ms  {resp.headers['X-DB-Queries']:>2} statements  {len(resp.json())} planos cotados")
+            assert all(corpo == corpos[0] for corpo in corpos), "corpos diferentes entre os modos"
+    print("Corpos idênticos nos três modos")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# Benchmark: tabela de 500 planos de uma operadora importada por
+# POST /planos/importar (CSV, uma transação, um INSERT executemany por tabela)
+# vs. um POST /planos/ por plano (medido numa amostra e extrapolado).
+# Confere que os dois caminhos gravam as mesmas coleções.
+#
+# Usa um SQLite temporário, nunca o banco do .env.
+
+import csv
+import io
+import os
+import tempfile
+import time
+
+_db_path = os.path.join(tempfile.mkdtemp(), "bench_importacao.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+os.environ["DB_ALERTA_REPETICOES"] = "0"
+
+from fastapi.testclient import TestClient
+
+from app.db import database
+from app.main import app
+
+FAIXAS_ANS = ["0-18", "19-23", "24-28", "29-33", "34-38", "39-43", "44-48", "49-53", "54-58", "59+"]
+N_PLANOS = 500
+AMOSTRA_CRIAR_PLANO = 50
+N_HOSPITAIS = 100
+N_CARENCIAS = 6
+N_COPARTICIPACOES = 5
+N_MUNICIPIOS = 30
+
+
+def plano(i, operadora):
+    return {
+        "operadora": operadora,
+        "nome": f"Plano {i}",
+        "tipo_contratacao": ("PF", "PJ", "Adesão")[i % 3],
+        "acomodacao": ("Enfermaria", "Apartamento")[i % 2],
+        "abrangencia": "Regional",
+        "coparticipacao": "sim" if i % 2 else "não",
+        "faixas": {f: round(150 + 45 * k + i * 0.37, 2) for k, f in enumerate(FAIXAS_ANS)},
+        "hospitais": [(f"Hospital {h}", f"Rua {h}, {i}") for h in range(N_HOSPITAIS)],
+        "carencias": [(f"Carência {c}", 30 * c) for c in range(N_CARENCIAS)],
+        "coparticipacoes": [(f"Serviço {c}", 20, 10, 100 + c) for c in range(N_COPARTICIPACOES)],
+        "municipios": [f"Município {m}" for m in range(N_MUNICIPIOS)],
+    }
+
+
+def tabela_csv(planos):
+    saida = io.StringIO()
+    escritor = csv.writer(saida, delimiter=";")
+    escritor.writerow(["operadora", "nome", "tipo_contratacao", "acomodacao", "abrangencia", "coparticipacao",
+                       *FAIXAS_ANS, "hospitais", "carencias", "coparticipacoes", "municipios"])
+    for p in planos:
+        escritor.writerow([
+            p["operadora"], p["nome"], p["tipo_contratacao"], p["acomodacao"], p["abrangencia"], p["coparticipacao"],
+            *(str(p["faixas"][f]).replace(".", ",") for f in FAIXAS_ANS),
+            "|".join(f"{n}:{e}" for n, e in p["hospitais"]),
+            "|".join(f"{d}:{dias}" for d, dias in p["carencias"]),
+            "|".join(":".join(map(str, c)) for c in p["coparticipacoes"]),
+            "|".join(p["municipios"]),
+        ])
+    return saida.getvalue().encode("utf-8")
+
+
+def plano_create(p, operadora_id):
+    return {
+        "operadora_id": operadora_id, "nome": p["nome"], "tipo_contratacao": p["tipo_contratacao"],
+        "acomodacao": p["acomodacao"], "abrangencia": p["abrangencia"], "coparticipacao": p["coparticipacao"] == "sim",
+        "faixas_preco": [{"faixa_etaria": f, "valor": v} for f, v in p["faixas"].items()],
+        "hospitais": [{"nome": n, "endereco": e} for n, e in p["hospitais"]],
+        "carencias": [{"descricao": d, "dias": dias} for d, dias in p["carencias"]],
+        "coparticipacoes": [{"nome": n, "tipo_servico": n, "percentual": pc, "valor_minimo": mn, "valor_maximo": mx}
+                            for n, pc, mn, mx in p["coparticipacoes"]],
+        "municipios": [{"nome": m} for m in p["municipios"]],
+    }
+
+
+def colecoes(resp_planos, nome):
+    p = next(p for p in resp_planos if p["nome"] == nome)
+    return (len(p["faixas"]), len(p["hospitais"]), len(p["carencias"]), len(p["coparticipacoes"]), len(p["municipios"]))
+
+
+if __name__ == "__main__":
+    database.Base.metadata.create_all(bind=database.engine)
+    with TestClient(app) as client:
+        op_importacao = client.post("/api/v1/operadoras/", json={"nome": "Operadora Importação"}).json()
+        op_laco = client.post("/api/v1/operadoras/", json={"nome": "Operadora Laço"}).json()
+
+        corpo = tabela_csv([plano(i, op_importacao["nome"]) for i in range(N_PLANOS)])
+        inicio = time.perf_counter()
+        resp = client.post("/api/v1/planos/importar", content=corpo, headers={"Content-Type": "text/csv"})
+        t_importacao = time.perf_counter() - inicio
+        assert resp.status_code == 201, resp.text
+        assert resp.json()["importados"] == N_PLANOS, resp.json()["erros"][:5]
+
+        inicio = time.perf_counter()
+        for i in range(AMOSTRA_CRIAR_PLANO):
+            r = client.post("/api/v1/planos/", json=plano_create(plano(i, op_laco["nome"]), op_laco["id"]))
+            assert r.status_code == 201, r.text
+        t_laco = (time.perf_counter() - inicio) / AMOSTRA_CRIAR_PLANO * N_PLANOS
+
+        planos = client.get("/api/v1/planos/").json()
+        esperado = (len(FAIXAS_ANS), N_HOSPITAIS, N_CARENCIAS, N_COPARTICIPACOES, N_MUNICIPIOS)
+        for nome in ("Plano 0", f"Plano {AMOSTRA_CRIAR_PLANO - 1}"):
+            por_operadora = [p for p in planos if p["nome"] == nome]
+            assert len(por_operadora) == 2 and all(colecoes([p], nome) == esperado for p in por_operadora), nome
+
+    linhas = N_PLANOS * (1 + sum(esperado))
+    print(f"{N_PLANOS} planos, {linhas} linhas no total ({len(corpo) / 1024 / 1024:.1f} MB de CSV)")
+    print(f"  POST /planos/importar:      {t_importacao:7.2f} s")
+    print(f"  POST /planos/ por plano:    {t_laco:7.2f} s (estimado de {AMOSTRA_CRIAR_PLANO} planos)")
+    print(f"  {t_laco / t_importacao:.1f}× mais rápido")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# Benchmark: varredura das faixas com parse de string (caminho antigo)
+# vs. índice de preços pré-compilado por plano (caminho novo), e a montagem
+# do índice interpretando o texto das faixas vs. lendo idade_min/idade_max
+
+import random
+import time
+from types import SimpleNamespace
+
+from app.services.price_index import IndicePrecos, faixas_do_plano, parse_faixa, indice_do_plano, validar_faixas
+
+FAIXAS_ANS = ["0-18", "19-23", "24-28", "29-33", "34-38", "39-43", "44-48", "49-53", "54-58", "59+"]
+N_PLANOS = 3000
+N_FAMILIAS = 50
+REPETICOES = 3
+
+
+def verificar_faixa(idade, faixa_string):
+    limites = parse_faixa(faixa_string)
+    return limites is not None and limites[0] <= idade <= limites[1]
+
+
+def catalogo_sintetico(n_planos):
+    planos = []
+    for i in range(n_planos):
+        faixas = [
+            SimpleNamespace(faixa_etaria=f, valor=round(100 + 35 * k + random.random() * 50, 2), idade_min=minimo, idade_max=maximo)
+            for k, (f, (minimo, maximo)) in enumerate(zip(FAIXAS_ANS, validar_faixas(FAIXAS_ANS)))
+        ]
+        planos.append(SimpleNamespace(id=i + 1, faixas=faixas))
+    return planos
+
+
+def cotar_antigo(planos, idades):
+    totais = []
+    for plano in planos:
+        total = 0.0
+        for idade in idades:
+            preco = None
+            for faixa in plano.faixas:
+                if verificar_faixa(idade, faixa.faixa_etaria):
+                    preco = faixa.valor
+                    break
+            if preco is None:
+                break
+            total += preco
+        else:
+            totais.append(round(total, 2))
+    return totais
+
+
+def cotar_novo(planos, idades):
+    totais = []
+    for plano in planos:
+        indice = indice_do_plano(plano)
+        total = 0.0
+        for idade in idades:
+            encontrado = indice.preco(idade)
+            if encontrado is None:
+                break
+            total += encontrado[1]
+        else:
+            totais.append(round(total, 2))
+    return totais
+
+
+def medir(funcao, planos, familias):
+    melhor = float("inf")
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        for idades in familias:
+            funcao(planos, idades)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+if __name__ == "__main__":
+    random.seed(42)
+    planos = catalogo_sintetico(N_PLANOS)
+    familias = [[random.randint(0, 80) for _ in range(random.randint(5, 10))] for _ in range(N_FAMILIAS)]
+
+    # Os dois caminhos precisam concordar antes de comparar tempos
+    for idades in familias:
+        assert cotar_antigo(planos, idades) == cotar_novo(planos, idades)
+
+    t_antigo = medir(cotar_antigo, planos, familias)
+    t_novo = medir(cotar_novo, planos, familias)
+
+    print(f"Catálogo: {N_PLANOS} planos, {N_FAMILIAS} famílias de 5-10 pessoas")
+    print(f"Caminho antigo (parse por idade): {t_antigo / N_FAMILIAS * 1000:.2f} ms/cotação")
+    print(f"Índice pré-compilado:             {t_novo / N_FAMILIAS * 1000:.2f} ms/cotação")
+    print(f"Ganho: {t_antigo / t_novo:.1f}x")
+
+    # Montagem dos índices (recarga do catálogo): texto das faixas vs. colunas gravadas
+    def montar(faixas_de):
+        melhor = float("inf")
+        for _ in range(REPETICOES):
+            inicio = time.perf_counter()
+            indices = [IndicePrecos(faixas_de(p)) for p in planos]
+            melhor = min(melhor, time.perf_counter() - inicio)
+        return indices, melhor
+
+    por_texto, t_texto = montar(lambda p: [(f.faixa_etaria, f.valor) for f in p.faixas])
+    por_coluna, t_coluna = montar(faixas_do_plano)
+    assert all(a.tabela == b.tabela for a, b in zip(por_texto, por_coluna))
+    print(f"Montagem dos {N_PLANOS} índices: parse do texto {t_texto * 1000:.1f} ms, idade_min/idade_max {t_coluna * 1000:.1f} ms")
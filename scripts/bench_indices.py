@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# Benchmark: leitura, edição e exclusão de um plano num catálogo grande,
+# antes (tabelas filhas sem índice em plano_id, como nos bancos criados
+# antes das migrações) e depois de aplicar_migracoes, com o plano do
+# SQLite para o DELETE por plano_id.
+#
+# Usa um SQLite temporário, nunca o banco do .env.
+
+import os
+import random
+import statistics
+import tempfile
+import time
+
+_db_path = os.path.join(tempfile.mkdtemp(), "bench_indices.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+os.environ["DB_ALERTA_REPETICOES"] = "0"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, text
+
+from app.db import database
+from app.db.migracoes import aplicar_migracoes
+from app.main import app
+from app.models import operadora_model, plano_model, faixa_preco_model, hospital_model, carencia_model, coparticipacao_model
+
+FAIXAS_ANS = ["0-18", "19-23", "24-28", "29-33", "34-38", "39-43", "44-48", "49-53", "54-58", "59+"]
+N_PLANOS = 5_000
+RODADAS = 20
+# Índices que os bancos antigos não tinham (os novos saem do create_all com eles)
+INDICES = [f"ix_{t}_plano_id" for t in ("faixas_preco", "hospitais", "carencias", "coparticipacoes", "municipios_abrangidos")] + [
+    "ix_planos_operadora_id", "ix_operadoras_nome_lower",
+]
+
+
+def popular(db):
+    op = db.scalars(insert(operadora_model.Operadora).returning(operadora_model.Operadora.id), [{"nome": "Operadora Teste"}]).all()[0]
+    ids = db.scalars(
+        insert(plano_model.Plano).returning(plano_model.Plano.id, sort_by_parameter_order=True),
+        [{"operadora_id": op, "nome": f"Plano {i}", "tipo_contratacao": "PF", "acomodacao": "Apartamento",
+          "abrangencia": "Nacional", "coparticipacao": False} for i in range(N_PLANOS)],
+    ).all()
+    db.execute(insert(faixa_preco_model.FaixaPreco), [
+        {"plano_id": pid, "faixa_etaria": f, "valor": 100.0 + k} for pid in ids for k, f in enumerate(FAIXAS_ANS)
+    ])
+    db.execute(insert(hospital_model.Hospital), [
+        {"plano_id": pid, "nome": f"Hospital {h}", "endereco": f"Rua {h}"} for pid in ids for h in range(40)
+    ])
+    db.execute(insert(carencia_model.Carencia), [
+        {"plano_id": pid, "descricao": f"Carência {c}", "dias": 30} for pid in ids for c in range(8)
+    ])
+    db.execute(insert(coparticipacao_model.Coparticipacao), [
+        {"plano_id": pid, "nome": f"Copart {c}", "percentual": 30.0} for pid in ids for c in range(5)
+    ])
+    db.execute(insert(hospital_model.Municipio), [
+        {"plano_id": pid, "nome": f"Município {m}"} for pid in ids for m in range(30)
+    ])
+    db.commit()
+    return ids
+
+
+def mediana_ms(funcao, argumentos):
+    tempos = []
+    for argumento in argumentos:
+        inicio = time.perf_counter()
+        funcao(argumento)
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos) * 1000
+
+
+def medir(client, ids):
+    def ler(pid):
+        assert client.get(f"/api/v1/planos/{pid}").status_code == 200
+
+    def editar(pid):
+        plano = client.get(f"/api/v1/planos/{pid}").json()
+        plano["faixas_preco"] = [dict(f, valor=f["valor"] + 1) for f in plano.pop("faixas")]
+        assert client.put(f"/api/v1/planos/{pid}", json=plano).status_code == 200
+
+    def excluir(pid):
+        assert client.delete(f"/api/v1/planos/{pid}").status_code == 200
+
+    amostra = random.sample(ids, 3 * RODADAS)
+    # Os excluídos saem da lista para a próxima medição
+    for pid in amostra[2 * RODADAS:]:
+        ids.remove(pid)
+    return {
+        "GET /planos/{id}": mediana_ms(ler, amostra[:RODADAS]),
+        "GET + PUT /planos/{id}": mediana_ms(editar, amostra[RODADAS:2 * RODADAS]),
+        "DELETE /planos/{id}": mediana_ms(excluir, amostra[2 * RODADAS:]),
+    }
+
+
+def plano_delete():
+    with database.engine.connect() as conn:
+        return " / ".join(r[-1] for r in conn.execute(text("EXPLAIN QUERY PLAN DELETE FROM hospitais WHERE plano_id = 1")))
+
+
+if __name__ == "__main__":
+    random.seed(7)
+    database.Base.metadata.create_all(bind=database.engine)
+    with database.engine.begin() as conn:
+        for indice in INDICES:
+            conn.execute(text(f"DROP INDEX {indice}"))
+    db = database.SessionLocal()
+    ids = popular(db)
+    db.close()
+
+    with TestClient(app) as client:
+        antes, plano_antes = medir(client, ids), plano_delete()
+        inicio = time.perf_counter()
+        aplicadas = aplicar_migracoes(database.engine)
+        t_migracao = time.perf_counter() - inicio
+        depois, plano_depois = medir(client, ids), plano_delete()
+
+    print(f"{N_PLANOS} planos (10 faixas, 40 hospitais, 8 carências, 5 coparticipações, 30 municípios cada), mediana de {RODADAS}:")
+    for rota in antes:
+        print(f"  {rota:<24} sem índice {antes[rota]:8.1f} ms  com índice {depois[rota]:7.1f} ms  ({antes[rota] / depois[rota]:.1f}×)")
+    print(f"Migrações {', '.join(str(m.versao) for m in aplicadas)} aplicadas em {t_migracao:.2f} s")
+    print(f"DELETE FROM hospitais WHERE plano_id = ?: antes '{plano_antes}', depois '{plano_depois}'")
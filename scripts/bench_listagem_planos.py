@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# Benchmark: GET /planos/ com o catálogo crescendo. A listagem completa
+# cresce com o catálogo; uma página (limit/after_id) e a listagem enxuta
+# (fields/include) ficam no mesmo tempo e tamanho, no começo ou no fim.
+#
+# Usa um SQLite temporário, nunca o banco do .env.
+
+import os
+import statistics
+import tempfile
+import time
+
+_db_path = os.path.join(tempfile.mkdtemp(), "bench_listagem.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+os.environ["DB_ALERTA_REPETICOES"] = "0"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, insert, select
+
+from app.db import database
+from app.main import app
+from app.models import operadora_model, plano_model, faixa_preco_model, hospital_model
+
+FAIXAS_ANS = ["0-18", "19-23", "24-28", "29-33", "34-38", "39-43", "44-48", "49-53", "54-58", "59+"]
+TAMANHOS = (1_000, 5_000, 20_000)
+# A listagem completa só até aqui: acima disso ela é o problema, não a medida
+COMPLETA_ATE = 5_000
+N_HOSPITAIS = 10
+PAGINA = 50
+RODADAS = 5
+
+CONSULTAS = {
+    "página completa": f"/api/v1/planos/?limit={PAGINA}",
+    "página id/nome/operadora": f"/api/v1/planos/?limit={PAGINA}&fields=id,nome,operadora_id",
+    "página com faixas": f"/api/v1/planos/?limit={PAGINA}&fields=id,nome&include=faixas,operadora",
+}
+
+
+def crescer(db, ate):
+    """Insere planos (com faixas e hospitais) até o catálogo ter `ate`."""
+    inicio = db.scalar(select(func.count()).select_from(plano_model.Plano))
+    if inicio == 0:
+        db.execute(insert(operadora_model.Operadora), [{"nome": "Operadora Bench"}])
+    op_id = db.scalar(select(operadora_model.Operadora.id))
+    ids = db.scalars(
+        insert(plano_model.Plano).returning(plano_model.Plano.id, sort_by_parameter_order=True),
+        [{"operadora_id": op_id, "nome": f"Plano {i}", "tipo_contratacao": "PF", "acomodacao": "Apartamento",
+          "abrangencia": "Nacional", "coparticipacao": False} for i in range(inicio, ate)],
+    ).all()
+    db.execute(insert(faixa_preco_model.FaixaPreco), [
+        {"plano_id": pid, "faixa_etaria": f, "valor": 100.0 + k} for pid in ids for k, f in enumerate(FAIXAS_ANS)
+    ])
+    db.execute(insert(hospital_model.Hospital), [
+        {"plano_id": pid, "nome": f"Hospital {h}", "endereco": f"Rua {h}"} for pid in ids for h in range(N_HOSPITAIS)
+    ])
+    db.commit()
+    return ids[-1]
+
+
+def medir(client, url):
+    tempos = []
+    for _ in range(RODADAS):
+        inicio = time.perf_counter()
+        resp = client.get(url)
+        tempos.append(time.perf_counter() - inicio)
+        assert resp.status_code == 200, resp.text
+    return statistics.median(tempos) * 1000, len(resp.content)
+
+
+if __name__ == "__main__":
+    database.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    with TestClient(app) as client:
+        for tamanho in TAMANHOS:
+            ultimo_id = crescer(db, tamanho)
+            print(f"{tamanho} planos:")
+            linhas = []
+            if tamanho <= COMPLETA_ATE:
+                linhas.append(("listagem completa", "/api/v1/planos/"))
+            for nome, url in CONSULTAS.items():
+                linhas.append((f"{nome} (início)", url))
+                linhas.append((f"{nome} (fim)", f"{url}&after_id={ultimo_id - PAGINA}"))
+            for nome, url in linhas:
+                ms, tamanho_resp = medir(client, url)
+                print(f"  {nome:<36} {ms:8.1f} ms  {tamanho_resp / 1024:9.1f} KB")
+    db.close()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# Custo da instrumentação de /metrics no caminho quente de /cotacao/.
+#
+# Monta a app sem o middleware (METRICAS_ATIVAS=0) e a mesma app embrulhada
+# em MiddlewareMetricas, e chama POST /api/v1/cotacao/ em processo (httpx +
+# ASGITransport, sem rede) alternando as duas. Mede também o custo isolado do
+# middleware sobre uma app ASGI vazia e o dos contadores de domínio por cotação.
+
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+_db_path = os.path.join(tempfile.mkdtemp(), "bench_metricas.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+os.environ["METRICAS_ATIVAS"] = "0"
+
+import httpx
+
+from app.db import database
+from app.main import app
+from app.models import operadora_model, plano_model, faixa_preco_model
+from app.services.metricas import MiddlewareMetricas, planos_precificados, planos_retornados
+
+FAIXAS_ANS = ["0-18", "19-23", "24-28", "29-33", "34-38", "39-43", "44-48", "49-53", "54-58", "59+"]
+N_PLANOS = 50
+RODADAS = 5
+REQUISICOES_POR_RODADA = 400
+COTACAO = {"idades": [8, 34, 36, 61]}
+
+
+def popular():
+    database.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    op = operadora_model.Operadora(nome="Operadora Teste")
+    db.add(op)
+    db.flush()
+    for p in range(N_PLANOS):
+        plano = plano_model.Plano(operadora_id=op.id, nome=f"Plano {p}", tipo_contratacao="PF",
+                                  acomodacao="Apartamento", abrangencia="Nacional", coparticipacao=False)
+        db.add(plano)
+        db.flush()
+        db.add_all([faixa_preco_model.FaixaPreco(plano_id=plano.id, faixa_etaria=f, valor=150.0 + 40 * k) for k, f in enumerate(FAIXAS_ANS)])
+    db.commit()
+    db.close()
+
+
+async def rodada(client, n):
+    tempos = []
+    for _ in range(n):
+        inicio = time.perf_counter()
+        resp = await client.post("/api/v1/cotacao/", json=COTACAO)
+        tempos.append(time.perf_counter() - inicio)
+        assert resp.status_code == 200, resp.text
+    return tempos
+
+
+async def comparar():
+    medidas = {"sem métricas": [], "com métricas": []}
+    apps = {"sem métricas": app, "com métricas": MiddlewareMetricas(app)}
+    clientes = {nome: httpx.AsyncClient(transport=httpx.ASGITransport(app=a), base_url="http://teste") for nome, a in apps.items()}
+    try:
+        for cliente in clientes.values():
+            await rodada(cliente, 50)  # aquece catálogo, motor e conexões
+        for _ in range(RODADAS):
+            for nome, cliente in clientes.items():
+                medidas[nome].extend(await rodada(cliente, REQUISICOES_POR_RODADA))
+    finally:
+        for cliente in clientes.values():
+            await cliente.aclose()
+    return medidas
+
+
+async def custo_middleware(n=200_000):
+    async def vazia(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def enviar(_):
+        pass
+
+    scope = {"type": "http", "method": "POST", "path": "/api/v1/cotacao/"}
+    tempos = {}
+    for nome, alvo in (("vazia", vazia), ("middleware", MiddlewareMetricas(vazia))):
+        inicio = time.perf_counter()
+        for _ in range(n):
+            await alvo(scope, None, enviar)
+        tempos[nome] = (time.perf_counter() - inicio) / n
+    return tempos["middleware"] - tempos["vazia"]
+
+
+def custo_dominio(n=200_000):
+    inicio = time.perf_counter()
+    for _ in range(n):
+        planos_precificados.observar(N_PLANOS)
+        planos_retornados.observar(N_PLANOS)
+    return (time.perf_counter() - inicio) / n
+
+
+if __name__ == "__main__":
+    popular()
+    medidas = asyncio.run(comparar())
+    print(f"POST /cotacao/ ({N_PLANOS} planos, {RODADAS} × {REQUISICOES_POR_RODADA} requisições em processo):")
+    for nome, tempos in medidas.items():
+        print(f"  {nome}:  média {statistics.fmean(tempos) * 1e6:7.1f} µs  p50 {statistics.median(tempos) * 1e6:7.1f} µs")
+    delta = statistics.median(medidas["com métricas"]) - statistics.median(medidas["sem métricas"])
+    print(f"  diferença na mediana: {delta * 1e6:+.1f} µs ({delta / statistics.median(medidas['sem métricas']) * 100:+.1f}%)")
+    print(f"Middleware isolado: {asyncio.run(custo_middleware()) * 1e6:.2f} µs por requisição")
+    print(f"Contadores de domínio: {custo_dominio() * 1e6:.2f} µs por cotação")
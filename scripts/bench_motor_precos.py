@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# Benchmark: cotação plano a plano (laço Python sobre o índice de preços)
+# vs. MotorPrecos (matriz NumPy planos × segmentos de idade).
+# Antes de medir, confere que os dois caminhos devolvem exatamente o mesmo resultado.
+
+import os
+import random
+import time
+from types import SimpleNamespace
+
+# Só para importar os models; nenhum acesso ao banco é feito
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.services.catalog_cache import PlanoCatalogo
+from app.services.price_index import IndicePrecos
+from app.services.rule_engine import MotorPrecos
+
+FAIXAS_ANS = ["0-18", "19-23", "24-28", "29-33", "34-38", "39-43", "44-48", "49-53", "54-58", "59+"]
+FAIXAS_ALTERNATIVAS = ["0-29", "30-59", "60+"]
+N_PLANOS = 3000
+N_FAMILIAS = 200
+REPETICOES = 3
+
+
+def plano_sintetico(i):
+    sorteio = random.random()
+    if sorteio < 0.8:
+        rotulos = list(FAIXAS_ANS)
+    elif sorteio < 0.9:
+        rotulos = list(FAIXAS_ALTERNATIVAS)
+    else:
+        # Plano com uma faixa faltando: deve ser rejeitado quando alguém cair nela
+        rotulos = list(FAIXAS_ANS)
+        rotulos.pop(random.randrange(len(rotulos)))
+    faixas = [SimpleNamespace(faixa_etaria=f, valor=round(100 + 35 * k + random.random() * 50, 2)) for k, f in enumerate(rotulos)]
+    operadora = SimpleNamespace(nome=f"Operadora {i % 20}", rede_credenciada_url=None)
+    plano = SimpleNamespace(
+        id=i + 1, operadora_id=i % 20, nome=f"Plano {i}", tipo_contratacao="PF", acomodacao="Enfermaria",
+        abrangencia="Nacional", elegibilidade=False, coparticipacao=False, imagem_coparticipacao_url=None,
+        operadora_rel=operadora, faixas=faixas, hospitais=[], carencias=[], coparticipacoes=[], municipios=[],
+    )
+    return PlanoCatalogo(plano, IndicePrecos((f.faixa_etaria, f.valor) for f in faixas), 1)
+
+
+def cotar_laco(planos, idades):
+    return [r for r in (p.cotar(idades) for p in planos) if r is not None]
+
+
+def totais_laco(planos, idades):
+    totais = []
+    for p in planos:
+        total = 0.0
+        for idade in idades:
+            encontrado = p.indice.preco(idade)
+            if encontrado is None:
+                break
+            total += encontrado[1]
+        else:
+            totais.append(total)
+    return totais
+
+
+def medir(funcao, familias):
+    melhor = float("inf")
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        funcao(familias)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+if __name__ == "__main__":
+    random.seed(7)
+    planos = [plano_sintetico(i) for i in range(N_PLANOS)]
+    familias = [[random.randint(0, 90) for _ in range(random.randint(1, 10))] for _ in range(N_FAMILIAS)]
+    familias.append([30, 130])  # idade fora da tabela: cai no caminho escalar
+
+    inicio = time.perf_counter()
+    motor = MotorPrecos(planos)
+    t_montagem = time.perf_counter() - inicio
+
+    for idades in familias:
+        assert motor.cotar(planos, idades) == cotar_laco(planos, idades), idades
+
+    # Só a precificação (totais e rejeição de planos sem faixa)
+    dentro_da_tabela = familias[:-1]
+    t_totais_laco = medir(lambda fs: [totais_laco(planos, idades) for idades in fs], dentro_da_tabela)
+    t_totais_motor = medir(lambda fs: [motor.precificar(planos, idades) for idades in fs], dentro_da_tabela)
+
+    # Cotação completa, incluindo montar os dicts de resultado de cada plano
+    t_laco = medir(lambda fs: [cotar_laco(planos, idades) for idades in fs], familias)
+    t_motor = medir(lambda fs: [motor.cotar(planos, idades) for idades in fs], familias)
+    t_lote = medir(lambda fs: list(motor.cotar_lote((planos, idades) for idades in fs)), familias)
+
+    n = len(familias)
+    print(f"Catálogo: {N_PLANOS} planos, {motor.coluna_vazia} segmentos de idade; {n} famílias de 1-10 pessoas")
+    print(f"Montagem do motor:           {t_montagem * 1000:.1f} ms (uma vez por versão do catálogo)")
+    print("Precificação (totais + rejeição):")
+    print(f"  Laço Python por plano:     {t_totais_laco / (n - 1) * 1000:.3f} ms/família")
+    print(f"  MotorPrecos.precificar:    {t_totais_motor / (n - 1) * 1000:.3f} ms/família ({t_totais_laco / t_totais_motor:.0f}x)")
+    print("Cotação completa (com montagem dos resultados):")
+    print(f"  Laço Python por plano:     {t_laco / n * 1000:.2f} ms/família")
+    print(f"  MotorPrecos.cotar:         {t_motor / n * 1000:.2f} ms/família ({t_laco / t_motor:.1f}x)")
+    print(f"  MotorPrecos.cotar_lote:    {t_lote / n * 1000:.2f} ms/família ({t_laco / t_lote:.1f}x)")
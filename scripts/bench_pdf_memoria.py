@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# Pico de memória (tracemalloc) ao gerar o PDF de comparativos grandes.
+#
+# "Lista completa" é o jeito antigo: todos os flowables de todos os planos numa
+# lista, build num BytesIO e getvalue() para responder. "Por seção" é o modo
+# arquivo: seções montadas conforme o layout avança, saída num
+# SpooledTemporaryFile. O ReportLab ainda monta o PDF final em memória ao
+# salvar, então o que sobra cresce com o tamanho do PDF, não com os flowables.
+
+import time
+import tracemalloc
+from io import BytesIO
+
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import SimpleDocTemplate
+
+from app.services.pdf_generator import data_por_extenso, gerar_pdf_cotacao_arquivo, obter_template
+from scripts.bench_pdf_template import IDADES, cotacao_sintetica
+
+TAMANHOS = [10, 40, 80]
+LIMITE_SPOOL = 4 * 1024 * 1024
+
+
+def lista_completa(dados):
+    template = obter_template()
+    elementos = [f for secao in template.secoes(dados, data_por_extenso()) for f in secao]
+    buffer = BytesIO()
+    SimpleDocTemplate(buffer, pagesize=A4, topMargin=20, bottomMargin=20, leftMargin=20, rightMargin=20).build(elementos)
+    return len(buffer.getvalue())
+
+
+def por_secao(dados):
+    with gerar_pdf_cotacao_arquivo(dados, IDADES, LIMITE_SPOOL) as arquivo:
+        tamanho = 0
+        while True:
+            pedaco = arquivo.read(64 * 1024)
+            if not pedaco:
+                return tamanho
+            tamanho += len(pedaco)
+
+
+def medir(funcao, dados):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    tamanho = funcao(dados)
+    duracao = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return pico, tamanho, duracao
+
+
+if __name__ == "__main__":
+    obter_template()
+    base = cotacao_sintetica()
+    print("Planos  PDF       Lista completa (pico)  Por seção (pico)")
+    for n in TAMANHOS:
+        dados = {**base, "resultados": [dict(base["resultados"][i % len(base["resultados"])], plano_id=i + 1) for i in range(n)]}
+        pico_lista, tamanho, t_lista = medir(lista_completa, dados)
+        pico_secao, _, t_secao = medir(por_secao, dados)
+        print(f"{n:>6}  {tamanho / 1024:6.0f} KiB  {pico_lista / 2**20:8.1f} MiB ({t_lista:4.1f}s)  {pico_secao / 2**20:8.1f} MiB ({t_secao:4.1f}s)")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# Teste de carga: latência de /cotacao/ enquanto vários PDFs são gerados ao mesmo tempo.
+#
+# Sobe o uvicorn duas vezes sobre o mesmo SQLite temporário: com PDF_WORKERS=0
+# (ReportLab no threadpool, como era antes) e com o pool de processos. Em cada
+# rodada mede a latência das cotações sem carga e com PDFS_SIMULTANEOS clientes
+# pedindo PDF sem parar.
+
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+_db_path = os.path.join(tempfile.mkdtemp(), "bench_pdf_pool.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+
+import httpx
+
+from app.db import database
+from app.models import operadora_model, plano_model, faixa_preco_model, hospital_model, carencia_model, coparticipacao_model
+
+FAIXAS_ANS = ["0-18", "19-23", "24-28", "29-33", "34-38", "39-43", "44-48", "49-53", "54-58", "59+"]
+N_PLANOS = 20
+HOSPITAIS_POR_PLANO = 60
+PDFS_SIMULTANEOS = 4
+N_COTACOES = 200
+COTACAO = {"idades": [8, 34, 36, 61]}
+POOLS = [("threadpool (PDF_WORKERS=0)", "0"), ("processos (PDF_WORKERS=2)", "2")]
+
+
+def popular():
+    database.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    op = operadora_model.Operadora(nome="Operadora Teste")
+    db.add(op)
+    db.flush()
+    for p in range(N_PLANOS):
+        plano = plano_model.Plano(operadora_id=op.id, nome=f"Plano {p}", tipo_contratacao="PF",
+                                  acomodacao="Apartamento", abrangencia="Nacional", coparticipacao=False)
+        db.add(plano)
+        db.flush()
+        db.add_all([faixa_preco_model.FaixaPreco(plano_id=plano.id, faixa_etaria=f, valor=150.0 + 40 * k) for k, f in enumerate(FAIXAS_ANS)])
+        db.add_all([hospital_model.Hospital(plano_id=plano.id, nome=f"Hospital {i}", endereco="Av. Paulista, 1000 - São Paulo") for i in range(HOSPITAIS_POR_PLANO)])
+        db.add_all([carencia_model.Carencia(plano_id=plano.id, descricao=f"Carência {i}", dias=30 * (i + 1)) for i in range(6)])
+        db.add_all([coparticipacao_model.Coparticipacao(plano_id=plano.id, nome=f"Consulta {i}", tipo_servico="Consulta", percentual=20.0) for i in range(6)])
+    db.commit()
+    db.close()
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def subir_servidor(pdf_workers):
+    porta = porta_livre()
+    env = dict(os.environ, PDF_WORKERS=pdf_workers, PYTHONPATH=os.getcwd())
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(porta), "--log-level", "warning"],
+        env=env,
+    )
+    url = f"http://127.0.0.1:{porta}"
+    for _ in range(100):
+        try:
+            httpx.get(url + "/", timeout=1)
+            return proc, url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("uvicorn não subiu")
+
+
+async def latencias_cotacao(client, n):
+    tempos = []
+    for _ in range(n):
+        inicio = time.perf_counter()
+        resp = await client.post("/api/v1/cotacao/", json=COTACAO)
+        tempos.append(time.perf_counter() - inicio)
+        assert resp.status_code == 200, resp.text
+    return tempos
+
+
+async def gerar_pdfs(client, parar, contagem):
+    while not parar.is_set():
+        resp = await client.post("/api/v1/cotacao/pdf", json=COTACAO)
+        assert resp.status_code == 200, resp.text
+        contagem.append(len(resp.content))
+
+
+async def rodada(url):
+    async with httpx.AsyncClient(base_url=url, timeout=120) as client:
+        await latencias_cotacao(client, 20)  # aquece catálogo e motor
+        await client.post("/api/v1/cotacao/pdf", json=COTACAO)  # aquece o pool
+        sem_carga = await latencias_cotacao(client, N_COTACOES)
+
+        parar = asyncio.Event()
+        pdfs = []
+        inicio = time.perf_counter()
+        geradores = [asyncio.create_task(gerar_pdfs(client, parar, pdfs)) for _ in range(PDFS_SIMULTANEOS)]
+        com_carga = await latencias_cotacao(client, N_COTACOES)
+        parar.set()
+        await asyncio.gather(*geradores)
+        duracao = time.perf_counter() - inicio
+    return sem_carga, com_carga, len(pdfs) / duracao
+
+
+def resumo(tempos):
+    ordenados = sorted(tempos)
+    p95 = ordenados[int(len(ordenados) * 0.95) - 1]
+    return f"p50 {statistics.median(tempos) * 1000:6.1f} ms  p95 {p95 * 1000:6.1f} ms"
+
+
+if __name__ == "__main__":
+    popular()
+    print(f"{N_PLANOS} planos com {HOSPITAIS_POR_PLANO} hospitais; {PDFS_SIMULTANEOS} clientes pedindo PDF em paralelo")
+    for nome, workers in POOLS:
+        proc, url = subir_servidor(workers)
+        try:
+            sem_carga, com_carga, pdfs_por_s = asyncio.run(rodada(url))
+        finally:
+            proc.terminate()
+            proc.wait()
+        print(f"{nome}:")
+        print(f"  /cotacao/ sem PDFs:  {resumo(sem_carga)}")
+        print(f"  /cotacao/ com PDFs:  {resumo(com_carga)}  ({pdfs_por_s:.1f} PDFs/s)")
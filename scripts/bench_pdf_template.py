@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# Microbenchmark: tempo por PDF de uma cotação com 20 planos e 100 hospitais por plano.
+#
+# Compara o gerador atual (template compilado uma vez por processo) com a
+# versão anterior, que remontava estilos e blocos fixos a cada chamada. A
+# versão anterior é lida do git (REVISAO_ANTERIOR) e carregada como módulo.
+
+import subprocess
+import sys
+import time
+import types
+
+from app.services.pdf_generator import gerar_pdf_cotacao, obter_template
+
+REVISAO_ANTERIOR = "3979de9"  # último commit antes do template compilado
+N_PLANOS = 20
+HOSPITAIS_POR_PLANO = 100
+REPETICOES = 5
+IDADES = [8, 34, 36, 61]
+
+
+def cotacao_sintetica():
+    resultados = []
+    for p in range(N_PLANOS):
+        beneficiarios = [{"idade": i, "faixa_etaria_usada": "34-38", "valor": 320.5 + i} for i in IDADES]
+        resultados.append({
+            "plano_id": p + 1,
+            "operadora": f"Operadora {p % 4}",
+            "plano": f"Plano {p}",
+            "preco_total": round(sum(b["valor"] for b in beneficiarios), 2),
+            "beneficiarios": beneficiarios,
+            "imagem_coparticipacao_url": None,
+            "hospitais": [{"id": h, "nome": f"Hospital {h}", "endereco": "Av. Paulista, 1000 - São Paulo"} for h in range(HOSPITAIS_POR_PLANO)],
+            "carencias": [{"id": c, "descricao": f"Carência {c}", "dias": 30 * (c + 1)} for c in range(6)],
+            "coparticipacoes": [{"id": c, "nome": f"Consulta {c}", "tipo_servico": "Consulta", "percentual": 20.0} for c in range(6)],
+            "municipios": [{"id": m, "nome": f"Município {m}"} for m in range(30)],
+            "rede_credenciada_url": "https://exemplo.com.br/rede",
+        })
+    return {"resultados": resultados, "desconto_percentual": 10.0}
+
+
+def gerador_anterior():
+    try:
+        fonte = subprocess.check_output(["git", "show", f"{REVISAO_ANTERIOR}:app/services/pdf_generator.py"], stderr=subprocess.DEVNULL)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    modulo = types.ModuleType("pdf_generator_anterior")
+    exec(compile(fonte, "pdf_generator_anterior.py", "exec"), modulo.__dict__)
+    return modulo.gerar_pdf_cotacao
+
+
+def medir(funcao, dados):
+    tempos = []
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        tamanho = len(funcao(dados, IDADES).getvalue())
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), tamanho
+
+
+if __name__ == "__main__":
+    dados = cotacao_sintetica()
+
+    inicio = time.perf_counter()
+    obter_template()
+    t_compilacao = time.perf_counter() - inicio
+
+    print(f"Cotação: {N_PLANOS} planos, {HOSPITAIS_POR_PLANO} hospitais por plano, desconto de 10%")
+    print(f"Compilação do template:  {t_compilacao * 1000:.1f} ms (uma vez por processo)")
+
+    anterior = gerador_anterior()
+    if anterior is None:
+        print(f"Revisão {REVISAO_ANTERIOR} indisponível; medindo só o gerador atual", file=sys.stderr)
+    else:
+        t_antes, bytes_antes = medir(anterior, dados)
+        print(f"Antes (estilos por PDF): {t_antes * 1000:.0f} ms/PDF ({bytes_antes / 1024:.0f} KiB)")
+
+    t_depois, bytes_depois = medir(gerar_pdf_cotacao, dados)
+    print(f"Template compilado:      {t_depois * 1000:.0f} ms/PDF ({bytes_depois / 1024:.0f} KiB)", end="")
+    print(f" ({t_antes / t_depois:.2f}x)" if anterior else "")
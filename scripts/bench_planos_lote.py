@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# Benchmark: lançar uma linha de produtos (30 planos com coleções) com
+# POST /planos/lote (uma transação, um INSERT por tabela) vs. um POST
+# /planos/ por plano, como a tela do admin faz hoje. Conta os statements de
+# cada caminho (X-DB-Queries) e confere que os planos gravados são iguais.
+#
+# Usa um SQLite temporário, nunca o banco do .env.
+
+import os
+import statistics
+import tempfile
+import time
+
+_db_path = os.path.join(tempfile.mkdtemp(), "bench_planos_lote.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+os.environ["DB_DEBUG"] = "1"
+os.environ["DB_ALERTA_REPETICOES"] = "0"
+
+from fastapi.testclient import TestClient
+
+from app.db import database
+from app.main import app
+
+FAIXAS_ANS = ["0-18", "19-23", "24-28", "29-33", "34-38", "39-43", "44-48", "49-53", "54-58", "59+"]
+N_PLANOS = 30
+RODADAS = 5
+
+
+def plano(i, operadora_id):
+    return {
+        "operadora_id": operadora_id, "nome": f"Linha Nova {i}", "tipo_contratacao": ("PF", "PJ", "Adesão")[i % 3],
+        "acomodacao": ("Enfermaria", "Apartamento")[i % 2], "abrangencia": "Regional", "coparticipacao": bool(i % 2),
+        "faixas_preco": [{"faixa_etaria": f, "valor": round(150 + 45 * k + i, 2)} for k, f in enumerate(FAIXAS_ANS)],
+        "hospitais": [{"nome": f"Hospital {h}", "endereco": f"Rua {h}"} for h in range(40)],
+        "carencias": [{"descricao": f"Carência {c}", "dias": 30 * c} for c in range(6)],
+        "coparticipacoes": [{"nome": f"Serviço {c}", "tipo_servico": f"Serviço {c}", "percentual": 20} for c in range(4)],
+        "municipios": [{"nome": f"Município {m}"} for m in range(20)],
+    }
+
+
+def sem_ids(p):
+    return (
+        p["nome"], [(f["faixa_etaria"], f["valor"]) for f in p["faixas"]],
+        [(h["nome"], h["endereco"]) for h in p["hospitais"]], [(c["descricao"], c["dias"]) for c in p["carencias"]],
+        [(c["nome"], c["percentual"]) for c in p["coparticipacoes"]], [m["nome"] for m in p["municipios"]],
+    )
+
+
+if __name__ == "__main__":
+    database.Base.metadata.create_all(bind=database.engine)
+    tempos = {"laço de POST /planos/": [], "POST /planos/lote": []}
+    statements = {}
+    with TestClient(app) as client:
+        for rodada in range(RODADAS):
+            op_laco = client.post("/api/v1/operadoras/", json={"nome": f"Laço {rodada}"}).json()["id"]
+            op_lote = client.post("/api/v1/operadoras/", json={"nome": f"Lote {rodada}"}).json()["id"]
+
+            inicio = time.perf_counter()
+            criados_laco, n_laco = [], 0
+            for i in range(N_PLANOS):
+                resp = client.post("/api/v1/planos/", json=plano(i, op_laco))
+                assert resp.status_code == 201, resp.text
+                criados_laco.append(resp.json())
+                n_laco += int(resp.headers["X-DB-Queries"])
+            tempos["laço de POST /planos/"].append(time.perf_counter() - inicio)
+            statements["laço de POST /planos/"] = n_laco
+
+            inicio = time.perf_counter()
+            resp = client.post("/api/v1/planos/lote", json=[plano(i, op_lote) for i in range(N_PLANOS)])
+            tempos["POST /planos/lote"].append(time.perf_counter() - inicio)
+            assert resp.status_code == 201, resp.text
+            statements["POST /planos/lote"] = int(resp.headers["X-DB-Queries"])
+
+            assert [sem_ids(p) for p in resp.json()] == [sem_ids(p) for p in criados_laco]
+
+    print(f"{N_PLANOS} planos com coleções, mediana de {RODADAS} rodadas:")
+    for nome, ts in tempos.items():
+        print(f"  {nome:<24} {statistics.median(ts) * 1000:8.1f} ms  {statements[nome]:5d} statements")
+    laco, lote = (statistics.median(ts) for ts in tempos.values())
+    print(f"  {laco / lote:.1f}× mais rápido")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# Benchmark: serialização das respostas grandes (cotação com milhares de
+# planos, listagem completa) pelo response_model do FastAPI contra o caminho
+# rápido (RESPOSTA_JSON_RAPIDA: orjson, sem revalidar o que o servidor montou).
+# Confere que o corpo é byte a byte o mesmo em /cotacao/, /api/cotacao/ e /planos/.
+#
+# Usa um SQLite temporário, nunca o banco do .env.
+
+import os
+import statistics
+import tempfile
+import time
+
+_db_path = os.path.join(tempfile.mkdtemp(), "bench_resposta_json.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+os.environ["DB_ALERTA_REPETICOES"] = "0"
+
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+
+from app.db import database
+from app.main import app
+from app.models import operadora_model, plano_model, faixa_preco_model, hospital_model, carencia_model, coparticipacao_model
+from app.schemas import cotacao_schema
+from app.services import resposta_json
+
+FAIXAS_ANS = ["0-18", "19-23", "24-28", "29-33", "34-38", "39-43", "44-48", "49-53", "54-58", "59+"]
+N_PLANOS = 2_000
+RODADAS = 5
+FAMILIA = {"idades": [8, 34, 36, 61]}
+ROTAS = (
+    ("POST", "/api/v1/cotacao/", FAMILIA),
+    ("POST", "/api/cotacao/", FAMILIA),
+    ("GET", "/api/v1/planos/", None),
+)
+
+
+def popular(db):
+    op = db.scalars(insert(operadora_model.Operadora).returning(operadora_model.Operadora.id),
+                    [{"nome": "Operadora São João", "rede_credenciada_url": "https://exemplo.com.br/rede"}]).all()[0]
+    ids = db.scalars(
+        insert(plano_model.Plano).returning(plano_model.Plano.id, sort_by_parameter_order=True),
+        [{"operadora_id": op, "nome": f"Plano Ação {i}", "tipo_contratacao": "PF", "acomodacao": "Apartamento",
+          "abrangencia": "Nacional", "coparticipacao": bool(i % 2)} for i in range(N_PLANOS)],
+    ).all()
+    db.execute(insert(faixa_preco_model.FaixaPreco), [
+        {"plano_id": pid, "faixa_etaria": f, "valor": round(99.9 + 37.13 * k + pid / 7, 2)}
+        for pid in ids for k, f in enumerate(FAIXAS_ANS)
+    ])
+    db.execute(insert(hospital_model.Hospital), [
+        {"plano_id": pid, "nome": f"Hospital {h}", "endereco": f"Av. Paulista, {h}"} for pid in ids for h in range(20)
+    ])
+    db.execute(insert(carencia_model.Carencia), [
+        {"plano_id": pid, "descricao": f"Carência {c}", "dias": 30 * c} for pid in ids for c in range(6)
+    ])
+    db.execute(insert(coparticipacao_model.Coparticipacao), [
+        {"plano_id": pid, "nome": f"Consulta {c}", "tipo_servico": "Consulta", "percentual": 30.0,
+         "valor_minimo": 10.5 if c else None, "valor_maximo": 120.0} for pid in ids for c in range(3)
+    ])
+    db.execute(insert(hospital_model.Municipio), [
+        {"plano_id": pid, "nome": f"Município {m}"} for pid in ids for m in range(10)
+    ])
+    db.commit()
+
+
+def medir(funcao):
+    tempos = []
+    for _ in range(RODADAS):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return resultado, statistics.median(tempos) * 1000
+
+
+def requisicao(client, metodo, url, corpo):
+    resp = client.request(metodo, url, json=corpo)
+    assert resp.status_code == 200, resp.text
+    return resp
+
+
+if __name__ == "__main__":
+    database.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    popular(db)
+    db.close()
+
+    with TestClient(app) as client:
+        resultados = None
+        print(f"{N_PLANOS} planos, mediana de {RODADAS} rodadas (requisição inteira):")
+        for metodo, url, corpo in ROTAS:
+            corpos, tempos = [], []
+            for rapida in (False, True):
+                resposta_json.RESPOSTA_JSON_RAPIDA = rapida
+                resp, ms = medir(lambda: requisicao(client, metodo, url, corpo))
+                corpos.append(resp.content)
+                tempos.append(ms)
+                if metodo == "POST":
+                    assert resp.headers.get("X-Cotacao-Id"), f"{url}: sem X-Cotacao-Id"
+            assert corpos[0] == corpos[1], f"{url}: corpo diferente no caminho rápido"
+            print(f"  {metodo:<5}{url:<20} response_model {tempos[0]:8.1f} ms  rápido {tempos[1]:8.1f} ms  "
+                  f"({tempos[0] / tempos[1]:.1f}×, {len(corpos[0]) / 1024 / 1024:.1f} MB, corpos iguais)")
+            if url == "/api/v1/cotacao/":
+                resultados = requisicao(client, metodo, url, corpo).json()
+
+    # Só a serialização, com os mesmos dicts: o que o response_model faz
+    # (validar + dump + json.dumps) contra o render do caminho rápido
+    adaptador = TypeAdapter(list[cotacao_schema.CotacaoResultado])
+    _, t_modelo = medir(lambda: JSONResponse(adaptador.dump_python(adaptador.validate_python(resultados), mode="json")).body)
+    _, t_rapido = medir(lambda: resposta_json.RespostaJSONRapida(resultados).body)
+    print(f"Só a serialização de {len(resultados)} resultados de cotação:")
+    print(f"  validação + json.dumps         {t_modelo:8.1f} ms")
+    print(f"  RespostaJSONRapida             {t_rapido:8.1f} ms  ({t_modelo / t_rapido:.1f}×, "
+          f"orjson {'instalado' if resposta_json.orjson else 'ausente: json.dumps'})")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# Benchmark: o que a tela do admin precisa (lista de planos com operadora e
+# totais, e o detalhe de um plano) via GET /planos/ (grafo completo pelo ORM)
+# contra GET /planos/resumo (um SELECT agregado), uma página de 50 dele e GET /planos/{id}.
+# Confere que os totais do resumo batem com as coleções da listagem.
+#
+# Usa um SQLite temporário, nunca o banco do .env.
+
+import os
+import statistics
+import tempfile
+import time
+
+_db_path = os.path.join(tempfile.mkdtemp(), "bench_resumo.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+os.environ["DB_DEBUG"] = "1"
+os.environ["DB_ALERTA_REPETICOES"] = "0"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from app.db import database
+from app.main import app
+from app.models import operadora_model, plano_model, faixa_preco_model, hospital_model
+
+FAIXAS_ANS = ["0-18", "19-23", "24-28", "29-33", "34-38", "39-43", "44-48", "49-53", "54-58", "59+"]
+N_OPERADORAS = 20
+N_PLANOS = 5_000
+RODADAS = 3
+
+
+def popular(db):
+    ops = db.scalars(
+        insert(operadora_model.Operadora).returning(operadora_model.Operadora.id, sort_by_parameter_order=True),
+        [{"nome": f"Operadora {o}"} for o in range(N_OPERADORAS)],
+    ).all()
+    ids = db.scalars(
+        insert(plano_model.Plano).returning(plano_model.Plano.id, sort_by_parameter_order=True),
+        [{"operadora_id": ops[i % N_OPERADORAS], "nome": f"Plano {i}", "tipo_contratacao": "PF",
+          "acomodacao": "Apartamento", "abrangencia": "Nacional", "coparticipacao": False} for i in range(N_PLANOS)],
+    ).all()
+    db.execute(insert(faixa_preco_model.FaixaPreco), [
+        {"plano_id": pid, "faixa_etaria": f, "valor": 100.0 + k} for pid in ids for k, f in enumerate(FAIXAS_ANS)
+    ])
+    # Tamanhos variados, e alguns planos sem hospital ou município
+    db.execute(insert(hospital_model.Hospital), [
+        {"plano_id": pid, "nome": f"Hospital {h}", "endereco": f"Rua {h}"} for pid in ids for h in range(pid % 40)
+    ])
+    db.execute(insert(hospital_model.Municipio), [
+        {"plano_id": pid, "nome": f"Município {m}"} for pid in ids for m in range(pid % 25)
+    ])
+    db.commit()
+    return ids
+
+
+def medir(client, url):
+    tempos = []
+    for _ in range(RODADAS):
+        inicio = time.perf_counter()
+        resp = client.get(url)
+        tempos.append(time.perf_counter() - inicio)
+        assert resp.status_code == 200, resp.text
+    return resp, statistics.median(tempos) * 1000
+
+
+if __name__ == "__main__":
+    database.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    ids = popular(db)
+    db.close()
+
+    with TestClient(app) as client:
+        completo, t_completo = medir(client, "/api/v1/planos/")
+        resumo, t_resumo = medir(client, "/api/v1/planos/resumo")
+        # Uma página: as contagens são feitas só para os 50 planos dela
+        pagina, t_pagina = medir(client, f"/api/v1/planos/resumo?limit=50&after_id={ids[len(ids) // 2]}")
+        detalhe, t_detalhe = medir(client, f"/api/v1/planos/{ids[len(ids) // 2]}")
+
+    totais = {p["id"]: (len(p["hospitais"]), len(p["municipios"])) for p in completo.json()}
+    assert {p["id"]: (p["total_hospitais"], p["total_municipios"]) for p in resumo.json()} == totais
+    assert all(totais[p["id"]] == (p["total_hospitais"], p["total_municipios"]) for p in pagina.json())
+    assert len(pagina.json()) == 50
+    assert detalhe.json() == next(p for p in completo.json() if p["id"] == ids[len(ids) // 2])
+
+    print(f"{N_PLANOS} planos, mediana de {RODADAS} rodadas:")
+    for nome, resp, ms in (
+        ("GET /planos/ (grafo completo)", completo, t_completo),
+        ("GET /planos/resumo", resumo, t_resumo),
+        ("GET /planos/resumo?limit=50", pagina, t_pagina),
+        ("GET /planos/{id}", detalhe, t_detalhe),
+    ):
+        print(f"  {nome:<30} {ms:8.1f} ms  {len(resp.content) / 1024:8.1f} KB  {resp.headers['X-DB-Queries']} statements")
+    print(f"  resumo {t_completo / t_resumo:.1f}× mais rápido que a listagem completa")
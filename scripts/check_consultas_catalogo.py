@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# Verifica que listar_planos, calcular_cotacao e o PDF emitem um número fixo
+# de SELECTs e que as linhas retornadas crescem com a SOMA das coleções
+# (e não com o produto, como no joinedload encadeado).
+#
+# Usa um SQLite temporário, nunca o banco do .env.
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+_db_path = os.path.join(tempfile.mkdtemp(), "check_consultas.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+# Mede o carregamento do banco, não o catálogo em memória
+os.environ["CATALOGO_CACHE_ATIVO"] = "0"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.db import database
+from app.main import app
+from app.models import operadora_model, plano_model, faixa_preco_model, hospital_model, carencia_model, coparticipacao_model
+from app.services.price_index import validar_faixas
+
+FAIXAS_ANS = ["0-18", "19-23", "24-28", "29-33", "34-38", "39-43", "44-48", "49-53", "54-58", "59+"]
+N_PLANOS = 5
+
+# (hospitais, carências, coparticipações, municípios) por plano
+TAMANHOS = [(2, 2, 1, 2), (40, 10, 10, 30)]
+
+ROTAS = [
+    ("GET", "/api/v1/planos/", None),
+    ("POST", "/api/v1/cotacao/", {"idades": [10, 30, 65]}),
+    ("POST", "/api/v1/cotacao/pdf", {"idades": [10, 30, 65], "plano_id": 1}),
+]
+
+
+def popular(n_hosp, n_car, n_cop, n_mun):
+    database.Base.metadata.drop_all(bind=database.engine)
+    database.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    op = operadora_model.Operadora(nome="Operadora Teste")
+    db.add(op)
+    db.flush()
+    for p in range(N_PLANOS):
+        plano = plano_model.Plano(operadora_id=op.id, nome=f"Plano {p}", tipo_contratacao="PF",
+                                  acomodacao="Apartamento", abrangencia="Nacional", coparticipacao=False)
+        db.add(plano)
+        db.flush()
+        # Com idade_min/idade_max, como gravam as rotas de escrita (a COTACAO_SQL usa só elas)
+        db.add_all([faixa_preco_model.FaixaPreco(plano_id=plano.id, faixa_etaria=f, valor=100.0 + k, idade_min=minimo, idade_max=maximo)
+                    for k, (f, (minimo, maximo)) in enumerate(zip(FAIXAS_ANS, validar_faixas(FAIXAS_ANS)))])
+        db.add_all([hospital_model.Hospital(plano_id=plano.id, nome=f"Hospital {i}") for i in range(n_hosp)])
+        db.add_all([carencia_model.Carencia(plano_id=plano.id, descricao=f"Carência {i}", dias=30) for i in range(n_car)])
+        db.add_all([coparticipacao_model.Coparticipacao(plano_id=plano.id, nome=f"Copart {i}") for i in range(n_cop)])
+        db.add_all([hospital_model.Municipio(plano_id=plano.id, nome=f"Município {i}") for i in range(n_mun)])
+    db.commit()
+    db.close()
+
+
+def medir(client, metodo, url, corpo):
+    capturados = []
+
+    def _captura(conn, cursor, statement, parameters, context, executemany):
+        # WITH: a consulta de preços da COTACAO_SQL começa pela CTE
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            capturados.append((statement, parameters))
+
+    # As rotas usam o engine async; os eventos de cursor ficam no sync_engine dele
+    event.listen(database.async_engine.sync_engine, "before_cursor_execute", _captura)
+    try:
+        resp = client.request(metodo, url, json=corpo)
+        assert resp.status_code == 200, resp.text
+    finally:
+        event.remove(database.async_engine.sync_engine, "before_cursor_execute", _captura)
+
+    # Reexecuta os SELECTs capturados só para contar as linhas retornadas
+    conn = sqlite3.connect(_db_path)
+    linhas = sum(len(conn.execute(sql, params).fetchall()) for sql, params in capturados)
+    conn.close()
+    return len(capturados), linhas
+
+
+if __name__ == "__main__":
+    # Como contexto: o shutdown da app fecha o pool async (conexões aiosqlite)
+    with TestClient(app) as client:
+        medidas = {}
+        for tamanho in TAMANHOS:
+            popular(*tamanho)
+            filhos_por_plano = len(FAIXAS_ANS) + sum(tamanho)
+            for metodo, url, corpo in ROTAS:
+                consultas, linhas = medir(client, metodo, url, corpo)
+                medidas.setdefault(url, []).append(consultas)
+                # plano + operadora (1 linha por plano) + soma das coleções,
+                # e nos GETs a linha da versão do catálogo (ETag)
+                limite = N_PLANOS * (1 + filhos_por_plano) + (1 if metodo == "GET" else 0)
+                print(f"{url:<24} coleções={tamanho}: {consultas} SELECTs, {linhas} linhas (limite {limite})")
+                if linhas > limite:
+                    print(f"❌ {url} retornou {linhas} linhas, acima do limite de {limite}")
+                    sys.exit(1)
+
+        for url, consultas in medidas.items():
+            if len(set(consultas)) != 1:
+                print(f"❌ {url} variou o número de SELECTs com o tamanho das coleções: {consultas}")
+                sys.exit(1)
+
+        print("✅ Número de SELECTs constante e linhas proporcionais à soma das coleções")
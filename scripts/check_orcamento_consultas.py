@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# Fixa o orçamento de SQL das rotas principais: quantos statements cada uma
+# pode executar (cabeçalho X-DB-Queries, com DB_DEBUG=1), com coleções
+# pequenas e grandes. As leituras do catálogo com If-None-Match respondem 304
+# sem ir ao banco e mudam de ETag depois de uma escrita. O PUT /planos/{id} também tem orçamento, não pode
+# disparar o aviso de N+1 e, ao mudar uma faixa, só pode escrever uma linha filha. O POST /planos/
+# tem orçamento e também não pode disparar o aviso.
+#
+# Usa um SQLite temporário, nunca o banco do .env.
+
+import logging
+import os
+import sys
+import tempfile
+
+_db_path = os.path.join(tempfile.mkdtemp(), "check_orcamento.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+os.environ["DB_DEBUG"] = "1"
+os.environ["DB_ALERTA_REPETICOES"] = "5"
+# O catálogo só é conferido quando uma escrita o marca como alterado
+os.environ["CATALOGO_INTERVALO_VERIFICACAO"] = "3600"
+
+from fastapi.testclient import TestClient
+
+from app.db import database
+from app.main import app
+from app.models import operadora_model, plano_model, faixa_preco_model, hospital_model, carencia_model, coparticipacao_model
+from app.services.price_index import validar_faixas
+
+FAIXAS_ANS = ["0-18", "19-23", "24-28", "29-33", "34-38", "39-43", "44-48", "49-53", "54-58", "59+"]
+N_PLANOS = 5
+
+# (hospitais, carências, coparticipações, municípios) por plano
+TAMANHOS = [(2, 2, 1, 2), (40, 10, 10, 30)]
+
+# Em ordem: o catálogo em memória é recarregado no primeiro passo e as
+# cotações seguintes não vão ao banco. (método, url, corpo, máximo de statements)
+ORCAMENTO = [
+    # versão + planos (com a operadora no JOIN) + 5 coleções + operadoras
+    ("POST", "/api/v1/catalogo/recarregar", None, 8),
+    ("POST", "/api/v1/cotacao/", {"idades": [10, 30, 65]}, 0),
+    ("POST", "/api/cotacao/", {"idades": [10, 30, 65]}, 0),
+    ("POST", "/api/v1/cotacao/pdf", {"idades": [10, 30, 65], "plano_id": 1}, 0),
+    # planos (com a operadora no JOIN) + 5 coleções
+    ("GET", "/api/v1/planos/", None, 6),
+    ("GET", "/api/v1/planos/?limit=2&after_id=1", None, 6),
+    # só as colunas pedidas, sem coleções
+    ("GET", "/api/v1/planos/?fields=id,nome,operadora_id", None, 1),
+    # planos + faixas + operadoras
+    ("GET", "/api/v1/planos/?limit=2&fields=nome&include=faixas,operadora", None, 3),
+    # um SELECT agregado; um plano com a operadora no JOIN + 5 coleções
+    ("GET", "/api/v1/planos/resumo", None, 1),
+    ("GET", "/api/v1/planos/1", None, 6),
+    ("GET", "/api/v1/operadoras/", None, 1),
+    ("GET", "/api/v1/operadoras/1", None, 1),
+]
+
+# Leituras com ETag da versão do catálogo: com o ETag anterior, 304 e nenhum statement
+CONDICIONAIS = ["/api/v1/operadoras/", "/api/v1/operadoras/1", "/api/v1/planos/", "/api/v1/planos/resumo", "/api/v1/planos/1"]
+
+# plano + 5 coleções (diff) + UPDATE planos + catalogo_versao + INSERT
+# catalogo_alteracoes + plano recarregado com as coleções; cada coleção
+# alterada soma até 3 (DELETE, UPDATE e INSERT em lote)
+ORCAMENTO_PUT = 15
+
+# operadora + INSERT planos + um INSERT por tabela filha + catalogo_versao
+# + catalogo_alteracoes + plano recarregado com as coleções
+ORCAMENTO_POST = 15
+
+# Mudar uma faixa: o UPDATE dessa faixa, o contador de catalogo_versao e a
+# linha de catalogo_alteracoes
+LINHAS_PUT_UMA_FAIXA = 3
+
+# Depois de uma escrita: catalogo_alteracoes + o plano alterado e suas coleções
+ORCAMENTO_APOS_ESCRITA = ("POST", "/api/v1/cotacao/", {"idades": [10, 30, 65]}, 7)
+
+
+class _Avisos(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.mensagens = []
+
+    def emit(self, record):
+        self.mensagens.append(record.getMessage())
+
+
+def popular(n_hosp, n_car, n_cop, n_mun):
+    database.Base.metadata.drop_all(bind=database.engine)
+    database.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    op = operadora_model.Operadora(nome="Operadora Teste")
+    db.add(op)
+    db.flush()
+    for p in range(N_PLANOS):
+        plano = plano_model.Plano(operadora_id=op.id, nome=f"Plano {p}", tipo_contratacao="PF",
+                                  acomodacao="Apartamento", abrangencia="Nacional", coparticipacao=False)
+        db.add(plano)
+        db.flush()
+        # Com idade_min/idade_max, como gravam as rotas de escrita
+        db.add_all([faixa_preco_model.FaixaPreco(plano_id=plano.id, faixa_etaria=f, valor=100.0 + k, idade_min=minimo, idade_max=maximo)
+                    for k, (f, (minimo, maximo)) in enumerate(zip(FAIXAS_ANS, validar_faixas(FAIXAS_ANS)))])
+        db.add_all([hospital_model.Hospital(plano_id=plano.id, nome=f"Hospital {i}") for i in range(n_hosp)])
+        db.add_all([carencia_model.Carencia(plano_id=plano.id, descricao=f"Carência {i}", dias=30) for i in range(n_car)])
+        db.add_all([coparticipacao_model.Coparticipacao(plano_id=plano.id, nome=f"Copart {i}") for i in range(n_cop)])
+        db.add_all([hospital_model.Municipio(plano_id=plano.id, nome=f"Município {i}") for i in range(n_mun)])
+    db.commit()
+    db.close()
+
+
+def corpo_atualizacao(client, plano_id):
+    plano = next(p for p in client.get("/api/v1/planos/").json() if p["id"] == plano_id)
+    return {
+        "operadora_id": plano["operadora_id"],
+        "nome": plano["nome"] + " (editado)",
+        "tipo_contratacao": plano["tipo_contratacao"],
+        "acomodacao": plano["acomodacao"],
+        "abrangencia": plano["abrangencia"],
+        "coparticipacao": plano["coparticipacao"],
+        "faixas_preco": plano["faixas"],
+        "hospitais": [{"nome": h["nome"], "endereco": h["endereco"]} for h in plano["hospitais"]],
+        "carencias": [{"descricao": c["descricao"], "dias": c["dias"]} for c in plano["carencias"]],
+        "coparticipacoes": plano["coparticipacoes"],
+        "municipios": [{"nome": m["nome"]} for m in plano["municipios"]],
+    }
+
+
+def consultas(client, metodo, url, corpo):
+    resp = client.request(metodo, url, json=corpo)
+    assert resp.status_code == 200, f"{metodo} {url}: {resp.status_code} {resp.text}"
+    return int(resp.headers["X-DB-Queries"])
+
+
+if __name__ == "__main__":
+    avisos = _Avisos()
+    logging.getLogger("app.services.consultas_sql").addHandler(avisos)
+    falhas = []
+
+    # Como contexto: o shutdown da app fecha o pool async (conexões aiosqlite)
+    with TestClient(app) as client:
+        for tamanho in TAMANHOS:
+            popular(*tamanho)
+            for metodo, url, corpo, limite in ORCAMENTO:
+                n = consultas(client, metodo, url, corpo)
+                print(f"{metodo:<5}{url:<62} coleções={tamanho}: {n} statements (orçamento {limite})")
+                if n > limite:
+                    falhas.append(f"{metodo} {url} com coleções {tamanho}: {n} statements, orçamento {limite}")
+
+            etags = {}
+            for url in CONDICIONAIS:
+                etags[url] = client.get(url).headers["ETag"]
+                resp = client.get(url, headers={"If-None-Match": etags[url]})
+                n = int(resp.headers["X-DB-Queries"])
+                print(f"GET  {url:<62} If-None-Match: {resp.status_code}, {n} statements")
+                if resp.status_code != 304 or n > 0:
+                    falhas.append(f"GET {url} com If-None-Match: {resp.status_code} e {n} statements (esperado 304 e 0)")
+
+            avisos.mensagens.clear()
+            corpo = corpo_atualizacao(client, 1)
+            resp = client.put("/api/v1/planos/1", json=corpo)
+            assert resp.status_code == 200, resp.text
+            n = int(resp.headers["X-DB-Queries"])
+            print(f"PUT  /api/v1/planos/1                coleções={tamanho}: {n} statements (orçamento {ORCAMENTO_PUT})")
+            if n > ORCAMENTO_PUT:
+                falhas.append(f"PUT /planos/1 com coleções {tamanho}: {n} statements, orçamento {ORCAMENTO_PUT}")
+
+            corpo["faixas_preco"][3]["valor"] += 10
+            resp = client.put("/api/v1/planos/1", json=corpo)
+            assert resp.status_code == 200, resp.text
+            linhas = int(resp.headers["X-DB-Rows-Written"])
+            print(f"PUT  /api/v1/planos/1 (uma faixa)    coleções={tamanho}: {resp.headers['X-DB-Queries']} statements, {linhas} linhas escritas")
+            if linhas > LINHAS_PUT_UMA_FAIXA:
+                falhas.append(f"PUT /planos/1 mudando uma faixa escreveu {linhas} linhas (máximo {LINHAS_PUT_UMA_FAIXA})")
+            if resp.json()["faixas"][3]["valor"] != corpo["faixas_preco"][3]["valor"]:
+                falhas.append("PUT /planos/1 não gravou a faixa alterada")
+
+            resp = client.get("/api/v1/planos/", headers={"If-None-Match": etags["/api/v1/planos/"]})
+            if resp.status_code != 200 or resp.headers["ETag"] == etags["/api/v1/planos/"]:
+                falhas.append(f"GET /planos/ depois do PUT com o ETag antigo: {resp.status_code} (esperado 200 com ETag novo)")
+
+            metodo, url, corpo, limite = ORCAMENTO_APOS_ESCRITA
+            n = consultas(client, metodo, url, corpo)
+            print(f"{metodo:<5}{url:<30} após escrita: {n} statements (orçamento {limite})")
+            if n > limite:
+                falhas.append(f"{metodo} {url} após escrita: {n} statements, orçamento {limite}")
+
+            novo = corpo_atualizacao(client, 1)
+            novo["nome"] = f"Plano novo {tamanho}"
+            resp = client.post("/api/v1/planos/", json=novo)
+            assert resp.status_code == 201, resp.text
+            n = int(resp.headers["X-DB-Queries"])
+            print(f"POST /api/v1/planos/                 coleções={tamanho}: {n} statements (orçamento {ORCAMENTO_POST})")
+            if n > ORCAMENTO_POST:
+                falhas.append(f"POST /planos/ com coleções {tamanho}: {n} statements, orçamento {ORCAMENTO_POST}")
+
+            for m in avisos.mensagens:
+                falhas.append(f"Aviso de N+1: {m[:160]}")
+
+    for falha in falhas:
+        print(f"❌ {falha}")
+    if falhas:
+        sys.exit(1)
+    print("✅ Rotas principais dentro do orçamento de SQL")
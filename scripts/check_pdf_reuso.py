@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# Verifica que o template do PDF, compilado uma vez por processo, gera
+# cotações diferentes em sequência e em threads (PDF_WORKERS=0) sem levar
+# estado de layout de um documento para o outro: cada PDF tem que sair e
+# ter o mesmo número de páginas que o gerado por um template novo.
+
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.pdf_generator import TemplateCotacao, obter_template
+
+# Famílias de tamanhos diferentes mudam a altura das seções e, com ela,
+# onde cada frame quebra: é o que deixava os títulos de seção com estado
+FAMILIAS = [[10, 30, 65], [8, 34, 61], [40], [5, 36, 70], [29, 33]]
+THREADS = 8
+
+
+def cotacao(idades: list[int], n_planos: int) -> dict:
+    resultados = []
+    for p in range(n_planos):
+        beneficiarios = [{"idade": i, "faixa_etaria_usada": "34-38", "valor": 250.0 + i} for i in idades]
+        resultados.append({
+            "plano_id": p + 1,
+            "operadora": f"Operadora {p}",
+            "plano": f"Plano {p}",
+            "preco_total": round(sum(b["valor"] for b in beneficiarios), 2),
+            "beneficiarios": beneficiarios,
+            "imagem_coparticipacao_url": None,
+            "hospitais": [{"id": h, "nome": f"Hospital {h}", "endereco": "Rua A, 10"} for h in range(4 + 3 * len(idades))],
+            "carencias": [{"id": c, "descricao": f"Carência {c}", "dias": 30} for c in range(3)],
+            "coparticipacoes": [{"id": 1, "nome": "Consulta", "tipo_servico": "Consulta", "percentual": 20.0}],
+            "municipios": [{"id": m, "nome": f"Município {m}"} for m in range(20)],
+            "rede_credenciada_url": "https://exemplo.com.br/rede",
+        })
+    return {"resultados": resultados, "desconto_percentual": 5.0 * len(idades)}
+
+
+def paginas(pdf: bytes) -> int:
+    return len(re.findall(rb"/Type /Page[^s]", pdf))
+
+
+def gerar(template: TemplateCotacao, idades: list[int]) -> bytes:
+    return template.gerar(cotacao(idades, len(idades)), idades).getvalue()
+
+
+if __name__ == "__main__":
+    esperado = {tuple(idades): paginas(gerar(TemplateCotacao(), idades)) for idades in FAMILIAS}
+    compartilhado = obter_template()
+    falhas = []
+
+    def conferir(rodada: int, idades: list[int]) -> None:
+        try:
+            obtido = paginas(gerar(compartilhado, idades))
+        except Exception as e:  # LayoutError e afins: o PDF não saiu
+            falhas.append(f"rodada {rodada}, idades {idades}: {type(e).__name__}: {e}"[:200])
+            return
+        if obtido != esperado[tuple(idades)]:
+            falhas.append(f"rodada {rodada}, idades {idades}: {obtido} páginas, esperado {esperado[tuple(idades)]}")
+
+    for rodada, idades in enumerate(FAMILIAS * 2):
+        conferir(rodada, idades)
+    print(f"Em sequência: {len(FAMILIAS) * 2} PDFs")
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(conferir, range(THREADS * 4), (FAMILIAS * THREADS)[: THREADS * 4]))
+    print(f"Em {THREADS} threads: {THREADS * 4} PDFs")
+
+    if falhas:
+        for falha in falhas:
+            print(f"❌ {falha}")
+        sys.exit(1)
+    print("✅ Template compartilhado gera todas as cotações como um template novo")
@@ -3,6 +3,7 @@ sys.path.insert(0, 'C:/Users/mimid/Desktop/cotacao-assistente/backend')
 
 from app.db.database import SessionLocal
 from app.models import plano_model, faixa_preco_model, hospital_model, carencia_model, coparticipacao_model
+from app.services.catalog_cache import registrar_alteracao
 
 db = SessionLocal()
 
@@ -38,6 +39,8 @@ try:
     planos_count = db.query(plano_model.Plano).delete()
     print(f"  ✅ Deletados {planos_count} planos")
     
+    # Recarga completa nos workers no ar: senão seguem cotando os planos excluídos
+    registrar_alteracao(db)
     db.commit()
     
     print("\n✅ TODOS OS PLANOS FORAM EXCLUÍDOS COM SUCESSO!")
@@ -14,7 +14,15 @@ load_dotenv(r'C:\Users\mimid\Desktop\cotacao-assistente\backend\.env')
 sys.path.insert(0, r'C:\Users\mimid\Desktop\cotacao-assistente\backend')
 
 from sqlalchemy import text
+from sqlalchemy.orm import Session
 from app.db.database import engine
+from app.services.catalog_cache import registrar_alteracao
+
+def registrar_recarga(connection):
+    """Marca recarga completa do catálogo na transação da conexão (antes do commit)"""
+    with Session(bind=connection) as db:
+        registrar_alteracao(db)
+        db.flush()
 
 def limpar_coparticipacoes_vazias():
     """Remove todas as coparticipações com nome NULL ou vazio"""
@@ -45,6 +53,7 @@ def limpar_coparticipacoes_vazias():
             connection.execute(
                 text("DELETE FROM coparticipacoes WHERE nome IS NULL OR nome = ''")
             )
+            registrar_recarga(connection)
             connection.commit()
             print("[OK] Deletadas com sucesso!")
             
@@ -83,6 +92,7 @@ def limpar_tudo():
             
             # Deletar TODAS
             connection.execute(text("DELETE FROM coparticipacoes"))
+            registrar_recarga(connection)
             connection.commit()
             
             print("[OK] Todas as coparticipacoes removidas!")
@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+# Aplica as migrações pendentes (app/db/migracoes.py) no banco do .env.
+#
+#   python scripts/migrar.py           aplica o que falta
+#   python scripts/migrar.py --status  só lista aplicadas e pendentes
+
+import logging
+import sys
+
+from app.db.database import engine
+from app.db.migracoes import MIGRACOES, aplicar_migracoes, versoes_aplicadas
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if "--status" in sys.argv[1:]:
+        aplicadas = versoes_aplicadas(engine)
+        for m in MIGRACOES:
+            print(f"  {'✓' if m.versao in aplicadas else '·'} {m.versao:>3} {m.nome}")
+        print(f"Versão do schema: {max(aplicadas, default=0)} de {MIGRACOES[-1].versao}")
+        sys.exit(0)
+
+    try:
+        aplicadas = aplicar_migracoes(engine)
+    except Exception as e:
+        print(f"❌ Erro na migração: {e}")
+        sys.exit(1)
+    if aplicadas:
+        print(f"✅ {len(aplicadas)} migração(ões) aplicada(s): " + ", ".join(f"{m.versao} {m.nome}" for m in aplicadas))
+    else:
+        print("✅ Banco já está na última versão")
@@ -4,6 +4,7 @@
 from sqlalchemy.orm import Session
 from app.db.database import SessionLocal, engine, Base
 from app.models import operadora_model
+from app.services.catalog_cache import registrar_alteracao
 
 # Criar tabelas se não existirem
 Base.metadata.create_all(bind=engine)
@@ -39,6 +40,8 @@ try:
         else:
             print(f"⊘ Operadora já existe: {op_dados['nome']}")
     
+    # Sem isso os workers no ar seguem com o catálogo em memória antigo
+    registrar_alteracao(db)
     db.commit()
     print("\n✅ Banco de dados populado com sucesso!")
     
@@ -4,6 +4,8 @@
 from sqlalchemy.orm import Session
 from app.db.database import SessionLocal
 from app.models import operadora_model, plano_model, faixa_preco_model, hospital_model, carencia_model, coparticipacao_model
+from app.services.catalog_cache import registrar_alteracao
+from app.services.price_index import validar_faixas
 
 db: Session = SessionLocal()
 
@@ -37,14 +39,16 @@ try:
     faixas_pf = [
         {"faixa_etaria": "0-18", "valor": 150.00},
         {"faixa_etaria": "19-30", "valor": 180.00},
-        {"faixa_etaria": "31-59", "valor": 250.00},
+        {"faixa_etaria": "31-58", "valor": 250.00},
         {"faixa_etaria": "59+", "valor": 400.00}
     ]
-    for f in faixas_pf:
+    for f, (idade_min, idade_max) in zip(faixas_pf, validar_faixas(f["faixa_etaria"] for f in faixas_pf)):
         db.add(faixa_preco_model.FaixaPreco(
             plano_id=plano_pf.id,
             faixa_etaria=f["faixa_etaria"],
-            valor=f["valor"]
+            valor=f["valor"],
+            idade_min=idade_min,
+            idade_max=idade_max
         ))
     
     # Hospitais para PF
@@ -100,6 +104,8 @@ try:
             nome=m
         ))
     
+    # Sem isso os workers no ar seguem com o catálogo em memória antigo
+    registrar_alteracao(db)
     db.commit()
     print("✓ Plano PF criado com sucesso (ID: {})".format(plano_pf.id))
     
@@ -121,14 +127,16 @@ try:
     faixas_adesao = [
         {"faixa_etaria": "0-18", "valor": 100.00},
         {"faixa_etaria": "19-30", "valor": 130.00},
-        {"faixa_etaria": "31-59", "valor": 170.00},
+        {"faixa_etaria": "31-58", "valor": 170.00},
         {"faixa_etaria": "59+", "valor": 300.00}
     ]
-    for f in faixas_adesao:
+    for f, (idade_min, idade_max) in zip(faixas_adesao, validar_faixas(f["faixa_etaria"] for f in faixas_adesao)):
         db.add(faixa_preco_model.FaixaPreco(
             plano_id=plano_adesao.id,
             faixa_etaria=f["faixa_etaria"],
-            valor=f["valor"]
+            valor=f["valor"],
+            idade_min=idade_min,
+            idade_max=idade_max
         ))
     
     # Carências para Adesão (diferentes do PF)
@@ -169,6 +177,7 @@ try:
             nome=m
         ))
     
+    registrar_alteracao(db)
     db.commit()
     print("✓ Plano Adesão criado com sucesso (ID: {})".format(plano_adesao.id))
     
@@ -73,6 +73,7 @@ export default function QuotePage() {
   )
 
   const [resultados, setResultados] = useState([])
+  const [cotacaoId, setCotacaoId] = useState(null)
   const [loadingCotacao, setLoadingCotacao] = useState(false)
   const [erro, setErro] = useState('')
 
@@ -144,6 +145,7 @@ export default function QuotePage() {
 
     setLoadingCotacao(true)
     setResultados([])
+    setCotacaoId(null)
 
     const payload = {
       idades: idadesNumeros,
@@ -165,6 +167,7 @@ export default function QuotePage() {
       if (!resp.ok) throw new Error('Erro na cotação')
       const data = await resp.json()
       setResultados(data)
+      setCotacaoId(resp.headers.get('X-Cotacao-Id'))
     } catch (e) {
       console.error(e)
       setErro('Erro ao calcular cotação. Verifique filtros ou o backend.')
@@ -195,11 +198,25 @@ export default function QuotePage() {
     }
 
     try {
-      const resp = await fetch(`${apiBase}/cotacao/pdf`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(payload)
-      })
+      let resp = null
+
+      // Cotação já calculada: o backend gera o PDF sem recalcular
+      if (cotacaoId) {
+        const params = new URLSearchParams({ plano_id: String(planoId) })
+        if (typeof payload.desconto_percentual === 'number') {
+          params.set('desconto_percentual', String(payload.desconto_percentual))
+        }
+        resp = await fetch(`${apiBase}/cotacao/${cotacaoId}/pdf?${params}`)
+      }
+
+      // Sem id ou cotação expirada: recalcula só o plano escolhido
+      if (!resp || resp.status === 404) {
+        resp = await fetch(`${apiBase}/cotacao/pdf`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify(payload)
+        })
+      }
 
       if (!resp.ok) throw new Error('Erro ao gerar PDF')
 